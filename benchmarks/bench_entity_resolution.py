@@ -0,0 +1,61 @@
+# benchmarks/bench_entity_resolution.py
+# Runtime of the blocked entity-resolution stage as the number of entities grows.
+# Run from the repository root:  python -m benchmarks.bench_entity_resolution [--sizes 10000 100000 1000000]
+import argparse
+import random
+import time
+from typing import List, Tuple
+
+from utils.entity_resolution import cluster_ids
+
+SYLLABLES = ["stat", "fjord", "gull", "faks", "tro", "ll", "ose", "berg", "sleip", "ner", "ek", "ofisk",
+             "val", "hall", "hod", "snor", "re", "hei", "drun", "grane", "kris", "tin", "aasta", "han", "steen"]
+
+
+def _base_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize() + f" {rng.randint(1, 999)}"
+
+def _noisy(name: str, rng: random.Random) -> str:
+    variant = rng.randrange(4)
+    if variant == 0:
+        return name.upper()
+    if variant == 1:
+        return name + " Field"
+    if variant == 2 and len(name) > 6:
+        cut = rng.randrange(1, len(name) - 1)
+        return name[:cut] + name[cut + 1:] # dropped character
+    return name.lower()
+
+def synthetic_ids(size: int, duplicate_rate: float = 0.3, seed: int = 0) -> Tuple[List[str], List[str]]:
+    rng = random.Random(seed)
+    field_ids, well_ids = [], []
+    while len(field_ids) < size:
+        name = _base_name(rng)
+        field_ids.append(name)
+        if rng.random() < duplicate_rate:
+            field_ids.append(_noisy(name, rng))
+    while len(well_ids) < size:
+        well = f"{rng.randint(1, 36)}_{rng.randint(1, 12)}-{rng.choice('ABCDEFG')}-{rng.randint(1, 60)}"
+        well_ids.append(well)
+        if rng.random() < duplicate_rate:
+            well_ids.append(well + rng.choice(["_H", "_T2", "_A"]))
+    return field_ids[:size], well_ids[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entity resolution scaling benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    args = parser.parse_args()
+
+    print(f"{'entities':>10} {'type':>6} {'seconds':>9} {'clusters':>10} {'comparisons':>13} {'us/entity':>10}")
+    for size in args.sizes:
+        field_ids, well_ids = synthetic_ids(size)
+        for node_type, ids in (("Field", field_ids), ("Well", well_ids)):
+            start = time.perf_counter()
+            roots, comparisons = cluster_ids(ids, node_type)
+            elapsed = time.perf_counter() - start
+            print(f"{size:>10} {node_type:>6} {elapsed:>9.2f} {len(set(roots)):>10} {comparisons:>13,} {elapsed / size * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_llm_extraction.py
+# Throughput and latency percentiles of the async LLM extraction engine against a fake client
+# with realistic per-request latency, for a range of concurrency limits (1 = sequential calls).
+# Run from the repository root:  python -m benchmarks.bench_llm_extraction [--chunks 200 --latency 0.5]
+# --skip-resolved answers chunks the rule-based NER fully resolves without a request; --resolvable
+# sets the share of synthetic chunks it can resolve (the rest carry attributes only the LLM extracts).
+import argparse
+import re
+
+from utils.llm_extraction import FakeLLMClient, extract_kg
+
+WELL_RE = re.compile(r"\d+/\d+-[A-Z]-\d+")
+
+
+def fake_response(text: str):
+    wells = WELL_RE.findall(text)
+    return {
+        "nodes": [{"id": well, "type": "Well", "attributes": {"purpose": "Production"}} for well in wells]
+        + [{"id": "Brent Formation", "type": "Formation", "attributes": {}}],
+        "relationships": [
+            {"source_id": well, "source_type": "Well", "target_id": "Brent Formation", "target_type": "Formation",
+             "relationship_type": "TARGETS_FORMATION", "properties": {}}
+            for well in wells
+        ],
+    }
+
+def synthetic_chunks(count: int, resolvable: float = 0.0):
+    resolvable_count = round(count * resolvable)
+    return [f"Well 33/9-A-{i} targets the Brent Formation within licence PL037." if i < resolvable_count
+            else f"Well 33/9-A-{i} targets the Brent Formation. It was completed in 1984." for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async LLM extraction benchmark (fake client).")
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="Mean simulated request latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--rate", type=float, default=0.0, help="Requests/second limit (0 = unlimited).")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--skip-resolved", action="store_true", help="Pre-extract with utils/domain_ner.py first.")
+    parser.add_argument("--resolvable", type=float, default=0.5, help="Share of chunks the rules can resolve.")
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks, args.resolvable)
+    if args.skip_resolved:
+        from utils.resources import get_domain_nlp
+
+        get_domain_nlp() # pipeline build is a one-off
+    print(f"{'concurrency':>11} {'seconds':>8} {'req/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'retries':>8} {'failed':>7} "
+          f"{'nodes':>6} {'by rules':>8}")
+    for concurrency in args.concurrency:
+        client = FakeLLMClient(fake_response, latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate)
+        kg_data, _, stats = extract_kg(chunks, client=client, max_concurrency=concurrency, requests_per_sec=args.rate,
+                                       skip_resolved=args.skip_resolved)
+        print(
+            f"{concurrency:>11} {stats.seconds:>8.2f} {stats.requests_per_sec:>7.1f} {stats.percentile(50) * 1000:>7.0f} "
+            f"{stats.percentile(95) * 1000:>7.0f} {stats.percentile(99) * 1000:>7.0f} {stats.retries:>8} {stats.failed:>7} "
+            f"{len(kg_data.nodes):>6} {stats.rule_resolved:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
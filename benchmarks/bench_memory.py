@@ -0,0 +1,70 @@
+# benchmarks/bench_memory.py
+# Memory held by a validated graph as KnowledgeGraphData (lists of Pydantic models) versus
+# ColumnarGraphData (utils/kg_columnar.py), plus the cost of converting between them.
+#
+#   python -m benchmarks.bench_memory --fields 100 500 2000
+#
+# Retained memory = tracemalloc (Python heap, NumPy buffers) + Arrow's own allocator, measured
+# after the build with the input still alive, so only what the container itself keeps counts.
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Tuple
+
+import pyarrow as pa
+
+from benchmarks.synthetic import generate_payload
+from utils.kg_columnar import ColumnarGraphData
+from utils.kg_validation import KGValidator
+
+
+def retained(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """(result, bytes the result keeps alive). Tracing slows allocation down, so time separately."""
+    gc.collect()
+    tracemalloc.start()
+    arrow_before = pa.total_allocated_bytes()
+    result = build()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] + pa.total_allocated_bytes() - arrow_before
+    tracemalloc.stop()
+    return result, held
+
+def timed(fn: Callable[[], Any]) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of KnowledgeGraphData vs ColumnarGraphData.")
+    parser.add_argument("--fields", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--wells-per-field", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    validator = KGValidator()
+    ColumnarGraphData.from_kg_data(validator.validate(generate_payload(2, 2))).to_kg_data() # imports, caches
+    print(f"{'elements':>10} {'pydantic MB':>12} {'columnar MB':>12} {'ratio':>7} {'B/elem':>8} "
+          f"{'json MB':>8} {'to col s':>9} {'back s':>7}")
+    for fields in args.fields:
+        payload = generate_payload(fields, args.wells_per_field, seed=args.seed)
+        kg_data, kg_bytes = retained(lambda: validator.validate(payload))
+        del payload
+        columnar, columnar_bytes = retained(lambda: ColumnarGraphData.from_kg_data(kg_data))
+        _, to_columnar_s = timed(lambda: ColumnarGraphData.from_kg_data(kg_data))
+        back, back_s = timed(columnar.to_kg_data)
+        assert back == kg_data, "round trip changed the graph"
+        del back
+        # What the "View Validated Data" expander serialises with st.json on every rerun.
+        json_bytes = len(json.dumps({"nodes": [n.model_dump() for n in kg_data.nodes],
+                                     "relationships": [r.model_dump() for r in kg_data.relationships]}, default=str))
+        elements = len(kg_data.nodes) + len(kg_data.relationships)
+        print(f"{elements:>10,} {kg_bytes / 1e6:>12.1f} {columnar_bytes / 1e6:>12.1f} {kg_bytes / columnar_bytes:>6.1f}x "
+              f"{columnar_bytes / elements:>8.0f} {json_bytes / 1e6:>8.1f} {to_columnar_s:>9.2f} {back_s:>7.2f}")
+        del kg_data, columnar
+
+
+if __name__ == "__main__":
+    main()
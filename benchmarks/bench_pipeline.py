@@ -0,0 +1,196 @@
+# benchmarks/bench_pipeline.py
+# Stage-by-stage timings of the extract -> validate -> resolve -> upload pipeline on synthetic
+# Norwegian-shelf data (benchmarks/synthetic.py), written as JSON so runs can be compared.
+#
+#   python -m benchmarks.bench_pipeline --fields 200 --output before.json
+#   python -m benchmarks.bench_pipeline --fields 200 --output after.json --compare before.json
+#
+# Upload goes to an in-memory driver stand-in (benchmarks/memory_neo4j.py) unless --neo4j-uri
+# is given; the admin_export stage writes neo4j-admin import CSVs to a temporary directory instead.
+# Extraction is recorded as skipped when the spaCy model isn't installed.
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.memory_neo4j import MemoryDriver
+from benchmarks.synthetic import generate_payload, payload_text
+from utils.admin_export import AdminImportExporter
+from utils.entity_resolution import resolve_entities
+from utils.kg_validation import KGValidator
+from utils.neo4j_uploader import DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, Neo4jUploader
+
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout
+        return out.stdout.strip() + ("-dirty" if dirty.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def time_stage(fn: Callable[[], int], repeat: int) -> Dict[str, Any]:
+    """Run fn `repeat` times; fn returns the number of items it processed."""
+    samples: List[float] = []
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = fn()
+        samples.append(time.perf_counter() - start)
+    best = min(samples)
+    return {
+        "items": items,
+        "seconds_min": round(best, 6),
+        "seconds_median": round(statistics.median(samples), 6),
+        "items_per_sec": round(items / best, 1) if best > 0 else None,
+        "samples": [round(s, 6) for s in samples],
+    }
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    payload = generate_payload(args.fields, args.wells_per_field, relationship_density=args.density,
+                               duplicate_rate=args.duplicate_rate, seed=args.seed)
+    stages: Dict[str, Any] = {}
+
+    texts = payload_text(payload)[:args.text_docs]
+    try:
+        from utils.nlp_utils import extract_triples
+        from utils.resources import get_nlp
+
+        get_nlp() # model load is a one-off, not part of the per-document cost
+        stages["extraction"] = time_stage(lambda: sum(1 for _ in extract_triples(texts, skip_empty=False)), args.repeat)
+        stages["extraction"]["unit"] = "sentences"
+    except (ImportError, OSError) as e:
+        stages["extraction"] = {"skipped": f"{type(e).__name__}: {e}"}
+
+    # Rule-based NER needs no statistical model, so it always runs.
+    from utils.domain_ner import extract_domain
+    from utils.resources import get_domain_nlp
+
+    get_domain_nlp()
+    resolved: List[bool] = []
+    def domain_ner() -> int:
+        resolved[:] = [extraction.resolved for extraction in extract_domain(texts)]
+        return len(resolved)
+    stages["domain_ner"] = time_stage(domain_ner, args.repeat)
+    stages["domain_ner"]["unit"] = "documents"
+    stages["domain_ner"]["resolved_share"] = round(sum(resolved) / len(resolved), 3) if resolved else None
+
+    validator = KGValidator()
+    kg_data = validator.validate(payload)
+    stages["validation"] = time_stage(lambda: len(validator.validate(payload).nodes), args.repeat)
+    stages["validation"]["unit"] = "nodes"
+
+    stages["entity_resolution"] = time_stage(lambda: len(resolve_entities(kg_data).kg_data.nodes), args.repeat)
+    stages["entity_resolution"]["unit"] = "nodes"
+
+    if args.neo4j_uri:
+        uploader = Neo4jUploader(args.neo4j_uri, args.neo4j_user, args.neo4j_password)
+    else:
+        uploader = Neo4jUploader("memory://", "", "", driver=MemoryDriver(tx_latency=args.tx_latency))
+    try:
+        def upload() -> int:
+            stats = uploader.upload_kg_data(kg_data, mode=args.upload_mode, batch_size=args.batch_size, workers=args.workers)
+            return stats.nodes + stats.relationships
+        stages["upload"] = time_stage(upload, args.repeat)
+        stages["upload"]["unit"] = "elements"
+        stages["upload"]["target"] = args.neo4j_uri or f"in-memory (tx latency {args.tx_latency * 1000:.1f} ms)"
+    finally:
+        uploader.close()
+
+    # Offline alternative to the upload stage: neo4j-admin import CSVs in a scratch directory.
+    export_dir = Path(tempfile.mkdtemp(prefix="kg-admin-export-"))
+    try:
+        def export() -> int:
+            shutil.rmtree(export_dir, ignore_errors=True)
+            with AdminImportExporter(export_dir) as exporter:
+                stats = exporter.upload_kg_data(kg_data)
+            return stats.nodes + stats.relationships
+        stages["admin_export"] = time_stage(export, args.repeat)
+        stages["admin_export"]["unit"] = "elements"
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "nodes": len(payload["nodes"]),
+            "relationships": len(payload["relationships"]),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "threshold", "neo4j_password")},
+        },
+        "stages": stages,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print per-stage ratios against a baseline run; return the stages that regressed."""
+    regressions = []
+    print(f"\n{'stage':<18} {'baseline s':>11} {'current s':>10} {'ratio':>7}")
+    for stage, result in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage, {})
+        if "seconds_min" not in result or "seconds_min" not in before:
+            print(f"{stage:<18} {'-':>11} {'-':>10} {'n/a':>7}")
+            continue
+        ratio = result["seconds_min"] / before["seconds_min"] if before["seconds_min"] else float("inf")
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{stage:<18} {before['seconds_min']:>11.4f} {result['seconds_min']:>10.4f} {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(stage)
+    if baseline.get("meta", {}).get("params") != current["meta"]["params"]:
+        print("Note: baseline was run with different parameters; ratios may not be comparable.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmark with JSON output.")
+    parser.add_argument("--fields", type=int, default=200, help="Synthetic fields; ~wells-per-field + 3 nodes each.")
+    parser.add_argument("--wells-per-field", type=int, default=20)
+    parser.add_argument("--density", type=float, default=1.0, help="Relationship density multiplier.")
+    parser.add_argument("--duplicate-rate", type=float, default=0.2, help="Share of fields with a noisy duplicate mention.")
+    parser.add_argument("--text-docs", type=int, default=2000, help="Documents fed to the spaCy extraction stage.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--upload-mode", choices=["batch", "row"], default="batch")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--tx-latency", type=float, default=0.002, help="Simulated seconds per transaction (in-memory upload).")
+    parser.add_argument("--neo4j-uri", help="Upload to a real Neo4j instead of the in-memory stand-in.")
+    parser.add_argument("--neo4j-user", default="neo4j")
+    parser.add_argument("--neo4j-password")
+    parser.add_argument("--output", type=Path, default=Path("bench-results.json"))
+    parser.add_argument("--compare", type=Path, help="Baseline JSON from an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown ratio that counts as a regression.")
+    args = parser.parse_args()
+
+    result = run_suite(args)
+    meta = result["meta"]
+    print(f"{meta['nodes']:,} nodes, {meta['relationships']:,} relationships @ {meta['git_revision']}")
+    print(f"{'stage':<18} {'items':>9} {'min s':>9} {'median s':>9} {'items/s':>12}")
+    for stage, stats in result["stages"].items():
+        if "skipped" in stats:
+            print(f"{stage:<18} skipped ({stats['skipped']})")
+            continue
+        print(f"{stage:<18} {stats['items']:>9,} {stats['seconds_min']:>9.4f} {stats['seconds_median']:>9.4f} {stats['items_per_sec']:>12,.0f}")
+
+    args.output.write_text(json.dumps(result, indent=2))
+    print(f"Results written to {args.output}")
+    if args.compare:
+        regressions = compare(result, json.loads(args.compare.read_text()), args.threshold)
+        if regressions:
+            print(f"Regressed stages: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_startup.py
+# Cold-start and page-switch latency of the Streamlit pages, measured in bare mode.
+#
+#   python -m benchmarks.bench_startup                  # current working tree
+#   python -m benchmarks.bench_startup --rev HEAD~1     # compare against an earlier commit
+#
+# Cold start: a fresh interpreter imports streamlit and executes one page (imports included).
+# Page switch: after every page has run once, each page is executed again in the same process,
+# which is what Streamlit does on navigation and on every rerun.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+
+PAGES = ["pages/Home.py", "pages/Dashboard.py", "pages/Analysis.py", "pages/Knowledge_Generation.py", "pages/Neo4j_KG.py"]
+
+_RUNNER = r"""
+import json, logging, os, runpy, sys, time, warnings
+warnings.simplefilter("ignore")
+logging.disable(logging.WARNING)
+sys.path.insert(0, os.getcwd())
+pages = sys.argv[1:]
+
+def run(page):
+    start = time.perf_counter()
+    try:
+        runpy.run_path(page, run_name="__page__")
+    except Exception as e:
+        # Bare mode has no browser session (e.g. widget keys missing from st.session_state);
+        # keep the time spent up to the failure but flag it.
+        return f"{(time.perf_counter() - start) * 1000:.1f}* ({type(e).__name__})"
+    return round((time.perf_counter() - start) * 1000, 1)
+
+start = time.perf_counter()
+import streamlit
+result = {"import_streamlit_ms": round((time.perf_counter() - start) * 1000, 1)}
+result["first_run_ms"] = {page: run(page) for page in pages}
+result["rerun_ms"] = {page: run(page) for page in pages}
+print(json.dumps(result))
+"""
+
+
+def measure(tree: Path, pages, repeats: int):
+    cold = {}
+    for page in pages:
+        samples = []
+        for _ in range(repeats):
+            out = subprocess.run([sys.executable, "-c", _RUNNER, page], cwd=tree, capture_output=True, text=True)
+            data = json.loads(out.stdout.strip().splitlines()[-1])
+            value = data["first_run_ms"][page]
+            samples.append(value if isinstance(value, str) else round(value + data["import_streamlit_ms"], 1))
+        numeric = [s for s in samples if not isinstance(s, str)]
+        cold[page] = min(numeric) if numeric else samples[0]
+
+    out = subprocess.run([sys.executable, "-c", _RUNNER, *pages], cwd=tree, capture_output=True, text=True)
+    switch = json.loads(out.stdout.strip().splitlines()[-1])["rerun_ms"]
+    return {"cold_start_ms": cold, "page_switch_ms": switch}
+
+
+def export_rev(rev: str, target: Path) -> Path:
+    archive = target / "tree.tar"
+    subprocess.run(["git", "archive", "--format=tar", "-o", str(archive), rev], check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(target / "tree")
+    return target / "tree"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit page cold-start / page-switch benchmark.")
+    parser.add_argument("--rev", help="Also measure this git revision for comparison.")
+    parser.add_argument("--repeats", type=int, default=3, help="Cold starts per page (minimum is reported).")
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON.")
+    args = parser.parse_args()
+
+    results = {"current": measure(Path(os.getcwd()), args.pages, args.repeats)}
+    if args.rev:
+        with tempfile.TemporaryDirectory() as tmp:
+            results[args.rev] = measure(export_rev(args.rev, Path(tmp)), args.pages, args.repeats)
+
+    print("(* = the page raised in bare mode; time until the error is shown)")
+    for metric in ("cold_start_ms", "page_switch_ms"):
+        print(f"\n{metric}")
+        print(f"{'page':<32}" + "".join(f"{label:>20}" for label in results))
+        for page in args.pages:
+            print(f"{page:<32}" + "".join(f"{str(results[label][metric][page])[:19]:>20}" for label in results))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
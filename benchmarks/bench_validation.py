@@ -0,0 +1,98 @@
+# benchmarks/bench_validation.py
+# Compares KGValidator against the original per-node parse_and_validate_llm_output.
+# Run from the repository root:  python -m benchmarks.bench_validation [--sizes 1000 10000 100000]
+import argparse
+import copy
+import random
+import time
+from typing import Dict, Any, List
+
+from pydantic import ValidationError
+from utils.kg_models import BaseNode, Well, Formation, Field, License, Company, Relationship, KnowledgeGraphData
+from utils.kg_validation import KGValidator
+
+
+def legacy_parse_and_validate(llm_json_output: Dict) -> KnowledgeGraphData:
+    # The pre-KGValidator implementation, minus the st.* reporting. Mutates its input.
+    parsed_nodes = []
+    for node_data in llm_json_output.get("nodes", []):
+        node_type = node_data.get("type")
+        attributes = node_data.get("attributes", {})
+        node_id = node_data.get("id")
+        common_data = {"id": node_id, "attributes": attributes}
+        specific_model_map = {
+            "Well": Well, "Formation": Formation, "Field": Field,
+            "License": License, "Company": Company
+        }
+        model_class = specific_model_map.get(node_type, BaseNode)
+        specific_fields_data = {}
+        if model_class != BaseNode:
+            for field_name in model_class.model_fields:
+                if field_name in attributes and field_name not in BaseNode.model_fields:
+                    specific_fields_data[field_name] = attributes.pop(field_name)
+        if model_class == BaseNode and node_type not in specific_model_map:
+            parsed_nodes.append(BaseNode(id=node_id, type=node_type or "Unknown", attributes=attributes))
+        else:
+            parsed_nodes.append(model_class(**common_data, **specific_fields_data))
+    parsed_relationships = [Relationship(**rel_data) for rel_data in llm_json_output.get("relationships", [])]
+    return KnowledgeGraphData(nodes=parsed_nodes, relationships=parsed_relationships)
+
+
+def synthetic_payload(n_nodes: int, seed: int = 0) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    nodes: List[Dict[str, Any]] = []
+    for i in range(n_nodes):
+        kind = i % 6
+        if kind == 0:
+            nodes.append({"id": f"{rng.randint(1, 36)}/{rng.randint(1, 12)}-{i}", "type": "Well", "attributes": {
+                "wellbore_name": f"W-{i}", "purpose": "Exploration", "total_depth_m": rng.uniform(1000, 5000),
+                "water_depth_m": rng.uniform(60, 400), "spud_class": "WILDCAT"}})
+        elif kind == 1:
+            nodes.append({"id": f"Formation {i}", "type": "Formation", "attributes": {"geologic_age": "Middle Jurassic"}})
+        elif kind == 2:
+            nodes.append({"id": f"Field {i}", "type": "Field", "attributes": {"discovery_year": rng.randint(1965, 2020), "status": "Producing"}})
+        elif kind == 3:
+            nodes.append({"id": f"PL{i:04d}", "type": "License", "attributes": {"awarded_date": "1975-01-01"}})
+        elif kind == 4:
+            nodes.append({"id": f"Company {i}", "type": "Company", "attributes": {"country_of_registration": "Norway"}})
+        else:
+            nodes.append({"id": f"Rig {i}", "type": "Rig", "attributes": {"rig_type": "SEMI-SUB."}})
+    relationships = [
+        {"source_id": nodes[i]["id"], "source_type": nodes[i]["type"], "target_id": nodes[i + 1]["id"],
+         "target_type": nodes[i + 1]["type"], "relationship_type": "RELATED_TO", "properties": {"confidence_score": 0.9}}
+        for i in range(n_nodes - 1)
+    ]
+    return {"nodes": nodes, "relationships": relationships}
+
+
+def _time(fn, payload) -> float:
+    start = time.perf_counter()
+    fn(payload)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    validator = KGValidator()
+    print(f"{'nodes':>8} {'legacy s':>10} {'compiled s':>11} {'fast s':>8} {'speedup':>8}")
+    for size in args.sizes:
+        payload = synthetic_payload(size)
+        legacy_input = copy.deepcopy(payload) # the legacy path pops from its input
+        legacy = _time(legacy_parse_and_validate, legacy_input)
+        compiled = _time(validator.validate, payload)
+        # Fast mode on an already-validated batch, e.g. re-checking session state before upload.
+        prebuilt = validator.validate(payload)
+        fast = _time(lambda p: validator.validate(p, fast=True),
+                     {"nodes": prebuilt.nodes, "relationships": prebuilt.relationships})
+        try:
+            assert validator.validate(payload) == legacy_parse_and_validate(copy.deepcopy(payload))
+        except (AssertionError, ValidationError):
+            print(f"warning: outputs differ for size {size}")
+        print(f"{size:>8} {legacy:>10.3f} {compiled:>11.3f} {fast:>8.3f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/memory_neo4j.py
+# In-memory stand-in for a neo4j Driver, enough for Neo4jUploader: sessions, execute_write,
+# begin_transaction and tx.run. Rows sent with UNWIND queries are kept in dicts keyed like the
+# MERGE would key them, so the benchmark measures the uploader's own grouping/serialisation work
+# plus an optional simulated round-trip latency per transaction, without a database.
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Tuple
+
+_LABEL_RE = re.compile(r"MERGE \(n:(\w+)")
+_REL_RE = re.compile(r"\[r:(\w+)\]")
+_ENDPOINT_RE = re.compile(r"MATCH \((source|target):(\w+)")
+
+
+class MemoryGraph:
+    def __init__(self):
+        self.nodes: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        self.relationships: Dict[Tuple, Dict[str, Any]] = {}
+        self.transactions = 0
+        self.lock = threading.Lock()
+
+
+class _Result:
+    def __init__(self, written: int = 0):
+        self.written = written
+
+    def consume(self):
+        return SimpleNamespace(counters=SimpleNamespace(constraints_added=0))
+
+    def single(self):
+        return {"written": self.written}
+
+
+class MemoryTransaction:
+    def __init__(self, graph: MemoryGraph):
+        self.graph = graph
+
+    def run(self, query: str, **params):
+        # Batched queries send `rows`; row mode sends a single element's parameters.
+        rows = params.get("rows")
+        if "DELETE" in query:
+            return self._delete(query, params)
+        if rows is None:
+            if "id" in params:
+                rows = [{"id": params["id"], "props": params.get("node_props")}]
+            elif "source_id" in params:
+                rows = [{"source_id": params["source_id"], "target_id": params["target_id"], "props": params.get("properties")}]
+            else:
+                return _Result()
+        with self.graph.lock:
+            if "MERGE (source)-" in query:
+                rel_type = _REL_RE.search(query).group(1)
+                labels = dict(_ENDPOINT_RE.findall(query))
+                written = 0
+                for row in rows:
+                    # Like MATCH: no relationship unless both endpoint nodes exist.
+                    if (labels["source"], row["source_id"]) not in self.graph.nodes or \
+                            (labels["target"], row["target_id"]) not in self.graph.nodes:
+                        continue
+                    key = (rel_type, row["source_id"], row["target_id"])
+                    self.graph.relationships.setdefault(key, {}).update(row.get("props") or {})
+                    written += 1
+                return _Result(written)
+            elif "MERGE (n:" in query:
+                label = _LABEL_RE.search(query).group(1)
+                for row in rows:
+                    self.graph.nodes.setdefault((label, row["id"]), {}).update(row.get("props") or {})
+        return _Result()
+
+    def _delete(self, query: str, params: Dict[str, Any]):
+        with self.graph.lock:
+            if "DETACH DELETE n" in query: # nodes, with every relationship attached to them
+                label = re.search(r"MATCH \(n:(\w+)", query).group(1)
+                for node_id in params["ids"]:
+                    self.graph.nodes.pop((label, node_id), None)
+                    for key in [key for key in self.graph.relationships if node_id in key[1:]]:
+                        del self.graph.relationships[key]
+            else:
+                rel_type = _REL_RE.search(query).group(1)
+                for row in params["rows"]:
+                    self.graph.relationships.pop((rel_type, row["source_id"], row["target_id"]), None)
+        return _Result()
+
+    # Explicit transactions (session.begin_transaction); writes apply immediately, there is no rollback.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class MemorySession:
+    def __init__(self, graph: MemoryGraph, tx_latency: float):
+        self.graph = graph
+        self.tx_latency = tx_latency
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, tx_function, *args, **kwargs):
+        if self.tx_latency:
+            time.sleep(self.tx_latency)
+        with self.graph.lock:
+            self.graph.transactions += 1
+        return tx_function(MemoryTransaction(self.graph), *args, **kwargs)
+
+    def begin_transaction(self, **kwargs):
+        if self.tx_latency:
+            time.sleep(self.tx_latency)
+        with self.graph.lock:
+            self.graph.transactions += 1
+        return MemoryTransaction(self.graph)
+
+    def close(self):
+        pass
+
+
+class MemoryDriver:
+    def __init__(self, tx_latency: float = 0.0):
+        self.graph = MemoryGraph()
+        self.tx_latency = tx_latency
+
+    def session(self, **kwargs):
+        return MemorySession(self.graph, self.tx_latency)
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
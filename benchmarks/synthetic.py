@@ -0,0 +1,129 @@
+# benchmarks/synthetic.py
+# Synthetic Norwegian-shelf knowledge graphs shaped like MOCK_LLM_OUTPUT / the notebook's LLM_OUTPUT:
+# fields with wells drilled in licences, targeting formations, licences operated by companies.
+# Sizes scale with n_fields; relationship density and the share of near-duplicate entity
+# mentions (what entity resolution has to clean up) are tunable.
+import random
+from typing import Any, Dict, List
+
+FIELD_STEMS = ["Statfjord", "Gullfaks", "Troll", "Oseberg", "Ekofisk", "Snorre", "Heidrun", "Draugen", "Grane",
+               "Kristin", "Aasta Hansteen", "Johan Sverdrup", "Valhall", "Sleipner", "Brage", "Njord", "Norne",
+               "Visund", "Gjoa", "Ivar Aasen", "Edvard Grieg", "Martin Linge", "Goliat", "Alvheim", "Skarv"]
+FORMATIONS = [("Brent", "Middle Jurassic", "Sandstone"), ("Statfjord", "Early Jurassic", "Sandstone"),
+              ("Cook", "Early Jurassic", "Sandstone"), ("Tarbert", "Middle Jurassic", "Sandstone"),
+              ("Ness", "Middle Jurassic", "Sandstone, shale and coal"), ("Etive", "Middle Jurassic", "Sandstone"),
+              ("Heather", "Late Jurassic", "Shale"), ("Draupne", "Late Jurassic", "Organic-rich shale"),
+              ("Ekofisk", "Paleocene", "Chalk"), ("Tor", "Late Cretaceous", "Chalk"),
+              ("Garn", "Middle Jurassic", "Sandstone"), ("Ile", "Middle Jurassic", "Sandstone"),
+              ("Tilje", "Early Jurassic", "Sandstone"), ("Hugin", "Middle Jurassic", "Sandstone"),
+              ("Sleipner", "Middle Jurassic", "Sandstone")]
+COMPANIES = [("Equinor ASA", "Norway"), ("Aker BP ASA", "Norway"), ("Vår Energi ASA", "Norway"),
+             ("Petoro AS", "Norway"), ("ConocoPhillips Skandinavia AS", "Norway"), ("TotalEnergies EP Norge AS", "Norway"),
+             ("Harbour Energy Norge AS", "Norway"), ("OMV (Norge) AS", "Norway"), ("Wintershall Dea Norge AS", "Norway"),
+             ("DNO Norge AS", "Norway"), ("Lundin Energy Norway AS", "Norway"), ("Shell Norge AS", "Norway")]
+AREAS = ["North Sea", "Norwegian Sea", "Barents Sea"]
+PURPOSES = ["Production", "Injection", "Observation", "Wildcat", "Appraisal"]
+
+
+def _field_name(index: int) -> str:
+    stem = FIELD_STEMS[index % len(FIELD_STEMS)]
+    return stem if index < len(FIELD_STEMS) else f"{stem} {index // len(FIELD_STEMS) + 1}"
+
+def _letters(index: int) -> str:
+    # 0 -> A, 25 -> Z, 26 -> AA, ... (the slot letter in NPD wellbore names such as 33/9-A-12)
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def _noisy_mention(name: str, rng: random.Random) -> str:
+    # The kind of variants different documents / LLM calls produce for the same entity.
+    return rng.choice([name.upper(), name.lower(), name + " Field", name.replace(" ", "-")])
+
+
+def generate_payload(n_fields: int = 100, wells_per_field: int = 20, licenses_per_field: int = 2,
+                     relationship_density: float = 1.0, duplicate_rate: float = 0.0, seed: int = 0) -> Dict[str, Any]:
+    """An LLM-output-shaped payload with roughly n_fields * (wells_per_field + 3) nodes.
+
+    relationship_density scales the optional edges (extra formations per well, partner companies
+    per licence); duplicate_rate adds noisy duplicate Field mentions with their own edges.
+    """
+    rng = random.Random(seed)
+    nodes: List[Dict[str, Any]] = []
+    relationships: List[Dict[str, Any]] = []
+
+    def rel(source, target, rel_type, **properties):
+        relationships.append({
+            "source_id": source["id"], "source_type": source["type"], "target_id": target["id"],
+            "target_type": target["type"], "relationship_type": rel_type, "properties": properties,
+        })
+
+    formations = []
+    for name, age, lithology in FORMATIONS:
+        formations.append({"id": f"{name} Formation", "type": "Formation",
+                           "attributes": {"geologic_age": age, "lithology_description": lithology}})
+    companies = [{"id": name, "type": "Company", "attributes": {"country_of_registration": country}}
+                 for name, country in COMPANIES]
+    nodes.extend(formations)
+    nodes.extend(companies)
+
+    license_number = 1
+    for field_index in range(n_fields):
+        # Every field gets its own quadrant/block/slot range, so wellbore names stay unique at any size.
+        quadrant, block = 1 + field_index % 36, 1 + field_index // 36 % 12
+        slot_base = field_index // (36 * 12) * (wells_per_field // 60 + 1)
+        field = {"id": _field_name(field_index), "type": "Field", "attributes": {
+            "discovery_year": rng.randint(1967, 2022), "status": rng.choice(["Producing", "Shut down", "Approved for production"]),
+            "location": f"Norwegian {rng.choice(AREAS)}"}}
+        nodes.append(field)
+
+        licenses = []
+        for _ in range(licenses_per_field):
+            license = {"id": f"PL{license_number:03d}", "type": "License",
+                       "attributes": {"awarded_date": f"{rng.randint(1965, 2020)}-{rng.randint(1, 12):02d}-01"}}
+            license_number += 1
+            licenses.append(license)
+            nodes.append(license)
+            rel(field, license, "ASSOCIATED_WITH_LICENSE")
+            rel(license, rng.choice(companies), "OPERATED_BY", operator_share_percentage=round(rng.uniform(20, 70), 1))
+            for partner in rng.sample(companies, k=min(len(companies), int(round(2 * relationship_density)))):
+                rel(license, partner, "HAS_LICENSEE", share_percentage=round(rng.uniform(5, 30), 1))
+
+        for well_index in range(wells_per_field):
+            name = f"{quadrant}/{block}-{_letters(slot_base + well_index // 60)}-{well_index % 60 + 1}"
+            well = {"id": name, "type": "Well", "attributes": {
+                "wellbore_name": f"{name} {rng.choice(['H', 'T2', 'AH'])}", "purpose": rng.choice(PURPOSES),
+                "completion_date": f"{rng.randint(1975, 2023)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "total_depth_m": round(rng.uniform(1500, 6000), 1)}}
+            nodes.append(well)
+            rel(well, field, "IS_IN_FIELD")
+            rel(well, rng.choice(licenses), "DRILLED_IN_LICENSE")
+            target_count = max(1, int(relationship_density) + (rng.random() < relationship_density % 1))
+            for formation in rng.sample(formations, k=min(len(formations), target_count)):
+                rel(well, formation, "TARGETS_FORMATION", confidence_score=round(rng.uniform(0.6, 1.0), 2))
+
+        if rng.random() < duplicate_rate:
+            duplicate = {"id": _noisy_mention(field["id"], rng), "type": "Field", "attributes": dict(field["attributes"])}
+            nodes.append(duplicate)
+            rel(duplicate, licenses[0], "ASSOCIATED_WITH_LICENSE")
+
+    return {"nodes": nodes, "relationships": relationships}
+
+
+def payload_text(payload: Dict[str, Any]) -> List[str]:
+    """One short report-style paragraph per well, for the spaCy extraction stage."""
+    names = {(node["type"], node["id"]): node for node in payload["nodes"]}
+    texts = []
+    for rel in payload["relationships"]:
+        if rel["relationship_type"] != "IS_IN_FIELD":
+            continue
+        well = names[("Well", rel["source_id"])]
+        attributes = well["attributes"]
+        texts.append(
+            f"Well {well['id']} was completed on {attributes['completion_date']} in the {rel['target_id']} field. "
+            f"The well reached a total depth of {attributes['total_depth_m']} metres. "
+            f"{attributes['purpose']} wells like {well['id']} target the reservoir."
+        )
+    return texts
@@ -1,8 +1,7 @@
 # pages/Analysis.py
 import streamlit as st
-import spacy # Uncomment if you want to use NLP features
-from utils.nlp_utils import extract_entity_pairs,extract_relation  # Assuming you have a utility function to load your NLP model
-nlp = spacy.load("en_core_web_sm")  # Uncomment if you want to use NLP features
+# spaCy and its model are loaded on the first "Analyze Text" click (see utils/resources.py),
+# not every time Streamlit re-executes this page.
 
 def main():
     st.write("This page allows for some basic text input and analysis.")
@@ -20,12 +19,14 @@ def main():
             st.write("---")
             st.subheader("Your Input:")
             st.code(user_text)
-            doc = nlp(user_text)
             st.subheader("NLP Analysis Results:")
-            
-            for id, sent in enumerate(doc.sents):
-                entity_pair = extract_entity_pairs(sent)
-                st.write(f'Triple {id+1}: ({entity_pair[0]}, {extract_relation(sent)}, {entity_pair[1]})')
+            from utils.nlp_utils import extract_triples
+            from utils.resources import get_extraction_cache
+
+            cache = get_extraction_cache()
+            for triple in extract_triples([user_text], skip_empty=False, cache=cache):
+                st.write(f'Triple {triple.sent_idx+1}: ({triple.head}, {triple.relation}, {triple.tail})')
+            st.caption(f"Extraction cache: {cache.stats.hits} hits, {cache.stats.misses} misses")
         else:
             st.warning("Please enter some text to analyze.")
 
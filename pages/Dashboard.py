@@ -1,36 +1,141 @@
 # pages/Dashboard.py
+import json
 import streamlit as st
 import pandas as pd
-import numpy as np
+from utils.metrics import METRICS
+from utils.resources import get_graph_store
+# Aggregates over everything ingested so far come from the local Parquet/DuckDB graph store
+# (utils/graph_store.py), not from Neo4j; they are cached until the next ingest finishes.
+# Below them, a live view of the process-wide pipeline metrics (utils/metrics.py).
+
+REFRESH_SECONDS = 2.0
 
 def main():
-    st.write("This page shows some illustrative data and a simple chart.")
+    graph_overview()
+
+    st.header("Pipeline Metrics")
+    st.write("Live pipeline metrics: stage timings, Neo4j transactions, cache and LLM counters.")
 
-    # Create some mock data
-    data = {
-        'Category': ['A', 'B', 'C', 'D', 'E'],
-        'Value': np.random.randint(10, 100, 5),
-        'Growth': np.random.rand(5) * 10
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("Reset metrics"):
+            METRICS.reset()
+    with col2:
+        st.download_button("Prometheus text", METRICS.to_prometheus(), file_name="kg_metrics.prom", mime="text/plain")
+    with col3:
+        st.download_button("JSON snapshot", json.dumps(METRICS.snapshot()), file_name="kg_metrics.json", mime="application/json")
+
+    live_metrics()
+    show_profiles()
+
+# `version` is only the cache key: it changes when an ingest run finishes, which invalidates these.
+@st.cache_data(show_spinner=False)
+def store_aggregates(version: str, depth_bin_m: float):
+    store = get_graph_store()
+    return {
+        "counts": store.counts_by_type(),
+        "wells_per_field": store.wells_per_field(),
+        "operators_per_license": store.operators_per_license(),
+        "depths": store.depth_distribution(depth_bin_m),
+        "throughput": store.ingest_throughput(),
     }
-    df = pd.DataFrame(data)
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def graph_overview():
+    st.header("Ingested Graph")
+    store = get_graph_store()
+    aggregates = store_aggregates(store.version(), st.session_state.get("depth_bin_m", 500.0))
+    if aggregates["counts"].empty:
+        st.info("Nothing ingested yet. Upload a graph on the Knowledge Generation page or run kg-ingest.")
+        return
+
+    counts = aggregates["counts"].set_index("type")["nodes"]
+    columns = st.columns(min(len(counts), 5))
+    for column, (node_type, count) in zip(columns, counts.head(5).items()):
+        column.metric(node_type, f"{count:,}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Wells per field")
+        wells = aggregates["wells_per_field"]
+        if wells.empty:
+            st.caption("No IS_IN_FIELD relationships yet.")
+        else:
+            st.bar_chart(wells.set_index("field")["wells"])
+    with col2:
+        st.subheader("Well depth distribution")
+        st.selectbox("Bin size (m)", [100.0, 250.0, 500.0, 1000.0], index=2, key="depth_bin_m")
+        depths = aggregates["depths"]
+        if depths.empty:
+            st.caption("No wells with a total depth yet.")
+        else:
+            st.bar_chart(depths.set_index("depth_m")["wells"])
+
+    st.subheader("Operators per licence")
+    st.dataframe(aggregates["operators_per_license"], hide_index=True)
+
+    throughput = aggregates["throughput"]
+    if not throughput.empty:
+        st.subheader("Ingest throughput")
+        st.line_chart(throughput.set_index("finished_at")["elements_per_sec"])
+        st.dataframe(throughput, hide_index=True)
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def live_metrics():
+    snapshot = METRICS.snapshot()
+    counters = {_label(c["name"], c["labels"]): c["value"] for c in snapshot["counters"]}
+    timers = pd.DataFrame([
+        {"timer": _label(t["name"], t["labels"]), "count": t["count"], "total s": t["total_seconds"],
+         "mean ms": t["mean_seconds"] * 1000, "p50 ms": t["p50_seconds"] * 1000,
+         "p95 ms": t["p95_seconds"] * 1000, "max ms": t["max_seconds"] * 1000}
+        for t in snapshot["timers"]
+    ])
+    if not counters and timers.empty:
+        st.info("No metrics recorded yet. Validate, extract or upload something on the other pages.")
+        return
 
     st.subheader("Overview Metrics")
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total Sales", "$1,200K", "12%")
+        st.metric("Nodes written", f"{_total(counters, 'neo4j_nodes_written_total'):,.0f}")
+        st.metric("Relationships written", f"{_total(counters, 'neo4j_relationships_written_total'):,.0f}")
     with col2:
-        st.metric("New Users", "5,000", "-8%")
+        st.metric("Neo4j retries", f"{_total(counters, 'neo4j_retries_total'):,.0f}")
+        st.metric("Nodes validated", f"{_total(counters, 'validated_nodes_total'):,.0f}")
     with col3:
-        st.metric("Conversion Rate", "3.5%", "0.5%")
+        hits = counters.get(_label("cache_lookups_total", {"result": "hit"}), 0)
+        misses = counters.get(_label("cache_lookups_total", {"result": "miss"}), 0)
+        st.metric("Cache hit rate", f"{hits / (hits + misses):.0%}" if hits + misses else "n/a")
+        st.metric("LLM failed requests", f"{_total(counters, 'llm_failed_requests_total'):,.0f}")
+
+    if not timers.empty:
+        st.subheader("Where the time went")
+        st.bar_chart(timers.set_index("timer")["total s"])
+        st.dataframe(timers, hide_index=True)
+
+    st.subheader("Counters")
+    st.dataframe(pd.DataFrame([{"counter": k, "value": v} for k, v in counters.items()]), hide_index=True)
+    st.caption(f"Uptime {snapshot['uptime_seconds']:.0f}s, refreshed every {REFRESH_SECONDS:.0f}s.")
 
-    st.subheader("Data Table")
-    st.dataframe(df)
+def show_profiles():
+    if not METRICS.profiles:
+        return
+    st.subheader("Profiles")
+    for report in reversed(METRICS.profiles):
+        title = f"{report.name}: {report.seconds:.2f}s"
+        if report.peak_memory_bytes is not None:
+            title += f", peak {report.peak_memory_bytes / 1e6:.1f} MB traced"
+        with st.expander(title):
+            if report.cpu_top:
+                st.code(report.cpu_top, language="text")
+            if report.memory_top:
+                st.code("\n".join(report.memory_top), language="text")
 
-    st.subheader("Value Distribution Chart")
-    st.bar_chart(df.set_index('Category')['Value'])
+def _label(name, labels):
+    return name + ("{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}" if labels else "")
 
-    st.write("---")
-    st.info("This is a placeholder dashboard. You can integrate real data and more complex visualizations here.")
+def _total(counters, name):
+    return sum(v for k, v in counters.items() if k == name or k.startswith(name + "{"))
 
 if __name__ in ("__main__", "__page__"):
-    main()
\ No newline at end of file
+    main()
@@ -7,13 +7,26 @@
 # ///
 
 # main_streamlit_app.py
+import os
+from contextlib import nullcontext
 import streamlit as st
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field, field_validator, ValidationError
-from neo4j import GraphDatabase, basic_auth
+from typing import Optional, Dict, List, Tuple
+from pydantic import ValidationError
+from utils import metrics
+from utils.delta_sync import DeltaSyncer, SyncManifest, graph_name
+from utils.entity_resolution import resolve_entities
+from utils.graph_engine import GraphCheck, LocalGraph
+from utils.ingest_jobs import CANCELLED, DONE, FAILED, IngestJob, job_writer
+from utils.kg_integrity import IntegrityIndex, IntegrityReport, check_integrity
+from utils.kg_models import KnowledgeGraphData
+from utils.kg_preview import GraphPreview, NODES, RELATIONSHIPS
+from utils.kg_validation import get_validator
+from utils.llm_extraction import DEFAULT_LLM_MODEL, DEFAULT_MAX_CONCURRENCY, DEFAULT_REQUESTS_PER_SEC
+from utils.neo4j_uploader import DEFAULT_BATCH_SIZE, DEFAULT_POOL_SIZE, DEFAULT_WORKERS, Neo4jUploader
+from utils.resources import get_driver_registry, get_job_worker
 
 # --- 1. Conceptual Ontology & Pydantic Models ---
-# (Same Pydantic models as before)
+# (Defined in utils/kg_models.py)
 # --- Streamlit UI ---
 #st.set_page_config(page_title="Oil & Gas KG Pipeline (Norway Subsurface)", layout="wide")
 
@@ -21,58 +34,6 @@ st.title("🛢️ Oil & Gas Knowledge Graph Pipeline")
 st.caption("Norway Subsurface Domain - LLM, Pydantic, Neo4j Integration Demo")
 
 
-class BaseNode(BaseModel):
-    id: str = Field(..., description="Unique identifier for the node (e.g., name, official ID).")
-    type: str = Field(..., description="Type of the node (e.g., 'Well', 'Formation').")
-    attributes: Dict[str, Any] = Field(default_factory=dict, description="Key-value properties of the node.")
-
-    @field_validator('id', mode='before')
-    def sanitize_id(cls, v):
-        return str(v).replace(" ", "_").replace("/", "_").replace(":", "_")
-
-class Well(BaseNode):
-    type: str = "Well"
-    wellbore_name: Optional[str] = None
-    purpose: Optional[str] = None
-    completion_date: Optional[str] = None
-    total_depth_m: Optional[float] = None
-    water_depth_m: Optional[float] = None
-
-class Formation(BaseNode):
-    type: str = "Formation"
-    geologic_age: Optional[str] = None
-    lithology_description: Optional[str] = None
-
-class Field(BaseNode):
-    type: str = "Field"
-    discovery_year: Optional[int] = None
-    status: Optional[str] = None
-
-class License(BaseNode):
-    type: str = "License"
-    awarded_date: Optional[str] = None
-    valid_until_date: Optional[str] = None
-
-class Company(BaseNode):
-    type: str = "Company"
-    country_of_registration: Optional[str] = None
-
-class Relationship(BaseModel):
-    source_id: str
-    source_type: str
-    target_id: str
-    target_type: str
-    relationship_type: str
-    properties: Dict[str, Any] = {}#Field(default_factory=dict)
-
-    @field_validator('source_id', 'target_id', mode='before')
-    def sanitize_ids_in_relationship(cls, v):
-        return str(v).replace(" ", "_").replace("/", "_").replace(":", "_")
-
-class KnowledgeGraphData(BaseModel):
-    nodes: List[BaseNode]
-    relationships: List[Relationship]
-
 # --- 2. LLM-supported NER (Simulated Output) ---
 EXAMPLE_INPUT_TEXT = """
 The Statfjord field, discovered in 1974, is a major oil and gas field in the Norwegian sector of the North Sea.
@@ -98,45 +59,13 @@ MOCK_LLM_OUTPUT = {
 }
 
 # --- 3. Pydantic Validation Function ---
-def parse_and_validate_llm_output(llm_json_output: Dict) -> Optional[KnowledgeGraphData]:
+def parse_and_validate_llm_output(llm_json_output: Dict, fast: bool = False) -> Optional[KnowledgeGraphData]:
     try:
-        parsed_nodes = []
-        for node_data in llm_json_output.get("nodes", []):
-            node_type = node_data.get("type")
-            attributes = node_data.get("attributes", {})
-            node_id = node_data.get("id")
-            common_data = {"id": node_id, "attributes": attributes}
-
-            # Dynamically assign specific fields if they exist in Pydantic model and attributes
-            specific_model_map = {
-                "Well": Well, "Formation": Formation, "Field": Field,
-                "License": License, "Company": Company
-            }
-            model_class = specific_model_map.get(node_type, BaseNode)
-            
-            specific_fields_data = {}
-            # Iterate through fields of the specific model (e.g., Well)
-            # and pop them from 'attributes' if they are present, to avoid duplication.
-            if model_class != BaseNode:
-                for field_name in model_class.__fields__:
-                    if field_name in attributes and field_name not in BaseNode.__fields__:
-                        specific_fields_data[field_name] = attributes.pop(field_name)
-            
-            # Create the node instance
-            if model_class == BaseNode and node_type not in specific_model_map:
-                 st.warning(f"Unknown node type '{node_type}' for id '{node_id}'. Using BaseNode.")
-                 parsed_nodes.append(BaseNode(id=node_id, type=node_type or "Unknown", attributes=attributes))
-            else:
-                # Pass common_data, specific_fields_data, and remaining attributes
-                # Ensure 'type' is explicitly passed if model_class is BaseNode but type is known
-                if model_class == BaseNode:
-                     parsed_nodes.append(model_class(**common_data, type=node_type, **specific_fields_data))
-                else:
-                     parsed_nodes.append(model_class(**common_data, **specific_fields_data))
-
-
-        parsed_relationships = [Relationship(**rel_data) for rel_data in llm_json_output.get("relationships", [])]
-        kg_data = KnowledgeGraphData(nodes=parsed_nodes, relationships=parsed_relationships)
+        validator = get_validator()
+        kg_data = validator.validate(llm_json_output, fast=fast)
+        for node in kg_data.nodes:
+            if not validator.is_known_type(node.type):
+                st.warning(f"Unknown node type '{node.type}' for id '{node.id}'. Using BaseNode.")
         return kg_data
     except ValidationError as e:
         st.error(f"Pydantic Validation Error: {e}")
@@ -145,80 +74,234 @@ def parse_and_validate_llm_output(llm_json_output: Dict) -> Optional[KnowledgeGr
         st.error(f"An unexpected error occurred during parsing: {e}")
         return None
 
+def set_validated_kg_data(kg_data: Optional[KnowledgeGraphData]):
+    """Keep newly validated data with its integrity report, checked once here instead of on every rerun."""
+    st.session_state.validated_kg_data = kg_data
+    st.session_state.validated_integrity = check_integrity(kg_data)[1] if kg_data is not None else None
+
 # --- 4. Neo4j Integration ---
-class Neo4jUploader:
-    def __init__(self, uri, user, password):
-        try:
-            self._driver = GraphDatabase.driver(uri, auth=basic_auth(user, password))
-            self._driver.verify_connectivity() # Check connection
-            st.success("Successfully connected to Neo4j.")
-        except Exception as e:
-            st.error(f"Neo4j Connection Error: {e}")
-            self._driver = None # Ensure driver is None if connection fails
-            raise # Re-raise the exception to be caught by the caller
-
-    def close(self):
-        if self._driver:
-            self._driver.close()
-
-    def upload_kg_data(self, kg_data: KnowledgeGraphData):
-        if not self._driver:
-            st.error("Neo4j driver not initialized. Cannot upload data.")
-            return False
-        
-        uploaded_nodes_count = 0
-        uploaded_rels_count = 0
-        try:
-            with self._driver.session() as session:
-                for node in kg_data.nodes:
-                    session.execute_write(self._create_node_tx, node)
-                    uploaded_nodes_count +=1
-                for rel in kg_data.relationships:
-                    session.execute_write(self._create_relationship_tx, rel)
-                    uploaded_rels_count +=1
-            st.success(f"Data uploaded to Neo4j: {uploaded_nodes_count} nodes, {uploaded_rels_count} relationships.")
-            return True
-        except Exception as e:
-            st.error(f"Error during Neo4j upload: {e}")
-            return False
-
-    @staticmethod
-    def _create_node_tx(tx, node: BaseNode):
-        query = (
-            f"MERGE (n:{node.type} {{id: $id}}) "
-            "SET n += $node_props "
-        )
-        
-        # Prepare node properties for Neo4j
-        # Start with the generic 'attributes' field
-        node_props = node.attributes.copy() if node.attributes else {}
-        # Add specific Pydantic fields to the properties, overriding if necessary
-        for field_name, field_value in node.model_dump().items():
-            if field_name not in ['id', 'type', 'attributes'] and field_value is not None:
-                node_props[field_name] = field_value
-        
-        # Remove None values from final properties to avoid setting null properties explicitly
-        node_props = {k: v for k, v in node_props.items() if v is not None}
-        
-        params = {"id": node.id, "node_props": node_props}
-        # st.write(f"Executing Node Query: MERGE (n:{node.type} {{id: '{node.id}'}}) SET n += {json.dumps(node_props)}") # For debugging
-        tx.run(query, **params)
-
-    @staticmethod
-    def _create_relationship_tx(tx, rel: Relationship):
-        query = (
-            f"MATCH (source:{rel.source_type} {{id: $source_id}}) "
-            f"MATCH (target:{rel.target_type} {{id: $target_id}}) "
-            f"MERGE (source)-[r:{rel.relationship_type}]->(target) "
-            "SET r += $properties"
-        )
-        params = {
-            "source_id": rel.source_id,
-            "target_id": rel.target_id,
-            "properties": {k: v for k, v in rel.properties.items() if v is not None} # Clean None values
-        }
-        # st.write(f"Executing Relationship Query for type: {rel.relationship_type}") # For debugging
-        tx.run(query, **params)
+# (Uploader lives in utils/neo4j_uploader.py, the shared driver registry in utils/resources.py)
+def upload_to_neo4j(uploader: Neo4jUploader, kg_data: KnowledgeGraphData, mode: str, batch_size: int, workers: int,
+                    sync_graph: Optional[str] = None, delete_missing: bool = False,
+                    integrity: Optional[IntegrityIndex] = None) -> bool:
+    if integrity is not None:
+        kg_data, report = integrity.check(kg_data)
+        if not report.ok:
+            st.info(f"Integrity check: {report.summary()}.")
+    try:
+        if sync_graph:
+            syncer = DeltaSyncer(uploader, SyncManifest(), sync_graph)
+            delta_stats = syncer.sync(kg_data, delete_missing=delete_missing, mode=mode, batch_size=batch_size, workers=workers)
+            stats = delta_stats.upload
+            st.info(
+                f"Delta sync: {delta_stats.new} new, {delta_stats.changed} changed, {delta_stats.unchanged} unchanged; "
+                f"deleted {delta_stats.deleted_nodes} nodes, {delta_stats.deleted_relationships} relationships."
+            )
+        else:
+            stats = uploader.upload_kg_data(kg_data, mode=mode, batch_size=batch_size, workers=workers)
+    except Exception as e:
+        st.error(f"Error during Neo4j upload: {e}")
+        return False
+    if stats.constraints_created:
+        st.info(f"Created Neo4j constraints: {', '.join(stats.constraints_created)}")
+    st.success(f"Data uploaded to Neo4j: {stats.nodes} nodes, {stats.relationships} relationships.")
+    if stats.skipped_relationships:
+        st.warning(f"Neo4j skipped {stats.skipped_relationships} relationships whose endpoint nodes weren't found.")
+    st.info(
+        f"Throughput ({mode} mode, {workers} workers, batch size {batch_size}): "
+        f"{stats.nodes_per_sec:,.0f} nodes/sec, {stats.relationships_per_sec:,.0f} rels/sec."
+    )
+    record_in_graph_store(kg_data)
+    return True
+
+def submit_upload_job(uploader: Neo4jUploader, kg_data: KnowledgeGraphData, target: str, mode: str, batch_size: int,
+                      workers: int, sync_graph: Optional[str] = None, integrity: Optional[IntegrityIndex] = None,
+                      lease=None) -> str:
+    """Queue the upload as a checkpointed job on the background worker; returns the job id.
+
+    The job takes over lease (the uploader's driver) and releases it when it ends.
+    """
+    if integrity is not None:
+        kg_data, report = integrity.check(kg_data)
+        if not report.ok:
+            st.info(f"Integrity check: {report.summary()}.")
+    worker = get_job_worker()
+    job_id = worker.store.create(kg_data, source="streamlit", target=target, batch_size=batch_size, sync_graph=sync_graph)
+    worker.submit(job_id, job_writer(worker.store.get(job_id), uploader), on_done=_store_job_upload, lease=lease,
+                  mode=mode, workers=workers)
+    return job_id
+
+def _store_job_upload(job: IngestJob):
+    # Runs on the worker thread, where st.* calls don't reach the page; reads the graph back from the job.
+    from utils.resources import get_graph_store
+
+    with get_graph_store().writer("streamlit") as writer:
+        writer.write(get_job_worker().store.load_graph(job.job_id))
+
+@st.fragment(run_every=2.0)
+def show_upload_jobs(neo4j_uri: str, neo4j_user: str, neo4j_password: str, pool_size: int, mode: str, workers: int):
+    """Progress of recent upload jobs, polled from the checkpoint file; resume or cancel from here."""
+    worker = get_job_worker()
+    jobs = worker.store.list(limit=10)
+    if not jobs:
+        return
+    st.subheader("Upload Jobs")
+    for job in jobs:
+        active = worker.is_active(job.job_id)
+        status = job.status if active or job.status in (DONE, FAILED, CANCELLED) else "interrupted"
+        col1, col2 = st.columns([4, 1])
+        col1.progress(job.progress, text=f"{job.job_id} → {job.target}: {status}, batch {job.committed_batches}/"
+                      f"{job.total_batches}, {job.nodes} nodes, {job.relationships} relationships")
+        if job.error:
+            col1.caption(f"Last error: {job.error}")
+        if active:
+            if col2.button("Cancel", key=f"cancel_{job.job_id}"):
+                worker.cancel(job.job_id)
+        elif job.status != DONE and col2.button("Resume", key=f"resume_{job.job_id}"):
+            resume_upload_job(job, neo4j_uri, neo4j_user, neo4j_password, pool_size, mode, workers)
+
+def resume_upload_job(job: IngestJob, neo4j_uri: str, neo4j_user: str, neo4j_password: str, pool_size: int,
+                      mode: str, workers: int):
+    if job.target != neo4j_uri:
+        st.warning(f"Job {job.job_id} was started against {job.target}; set that URI in the sidebar to resume it.")
+        return
+    try:
+        lease = get_driver_registry().lease(neo4j_uri, neo4j_user, neo4j_password, max_pool_size=pool_size)
+    except Exception as e:
+        st.error(f"Neo4j Connection Error: {e}")
+        return
+    uploader = Neo4jUploader(neo4j_uri, neo4j_user, neo4j_password, driver=lease.driver)
+    # Same writer (plain or delta sync on the stored graph), batch size and graph-store callback as the
+    # original submit; the job holds the lease until it ends.
+    try:
+        get_job_worker().submit(job.job_id, job_writer(job, uploader), on_done=_store_job_upload, lease=lease,
+                                mode=mode, workers=workers)
+    except Exception as e:
+        lease.release()
+        st.error(f"Could not resume job {job.job_id}: {e}")
+        return
+    st.info(f"Resuming job {job.job_id} from batch {job.committed_batches + 1}.")
+
+def record_in_graph_store(kg_data: KnowledgeGraphData):
+    """Append the uploaded graph to the local Parquet store the Dashboard aggregates from."""
+    from utils.resources import get_graph_store
+
+    try:
+        with get_graph_store().writer("streamlit") as writer:
+            writer.write(kg_data)
+    except Exception as e: # the Neo4j upload already succeeded; the Dashboard copy is best-effort
+        st.warning(f"Could not record the upload in the local graph store: {e}")
+
+def run_llm_extraction(text: str, model: str, base_url: str, api_key: str, concurrency: int, rate: float,
+                       skip_resolved: bool = False):
+    from utils.documents import chunk_text
+    from utils.llm_extraction import OpenAIClient, extract_kg
+    from utils.resources import get_extraction_cache
+
+    try:
+        client = OpenAIClient(model=model, api_key=api_key or "unused", base_url=base_url or None)
+        with st.spinner("Sending chunks to the LLM..."):
+            kg_data, results, stats = extract_kg(
+                [chunk for _, chunk in chunk_text(text)], client=client, max_concurrency=concurrency,
+                requests_per_sec=rate, cache=get_extraction_cache(), skip_resolved=skip_resolved,
+            )
+    except Exception as e:
+        st.error(f"LLM extraction failed: {e}")
+        return
+    for result in results:
+        if result.error:
+            st.warning(f"Chunk(s) {result.chunk_ids} failed: {result.error}")
+    set_validated_kg_data(kg_data)
+    st.success(f"LLM extraction: {len(kg_data.nodes)} nodes, {len(kg_data.relationships)} relationships (already validated).")
+    st.caption(stats.summary())
+
+def local_graph(kg_data: KnowledgeGraphData) -> Tuple[LocalGraph, GraphCheck, List[Dict]]:
+    """In-memory graph for kg_data with its check and degree stats, built once per validated graph and kept in session state."""
+    cached = st.session_state.get("local_graph")
+    if cached is None or cached[0] is not kg_data:
+        with st.spinner("Indexing the graph for local queries..."):
+            graph = LocalGraph.from_kg_data(kg_data)
+            cached = st.session_state.local_graph = (kg_data, graph, graph.check(), graph.degree_stats())
+    return cached[1:]
+
+def show_local_graph(kg_data: KnowledgeGraphData, integrity: IntegrityReport):
+    """Pre-upload checks and Cypher-like queries on an in-memory copy of the graph (no Neo4j needed)."""
+    show_integrity_report(integrity)
+    graph, check, degree_stats = local_graph(kg_data)
+    st.caption(
+        f"Local graph: {check.nodes} nodes, {check.relationships} relationships, {check.isolated_nodes} isolated nodes, "
+        f"{check.duplicate_nodes} duplicate nodes and {check.duplicate_relationships} duplicate relationships merged."
+    )
+    with st.expander("Query the graph locally"):
+        # Patterns only run on submit; the last result is kept for the reruns in between.
+        with st.form("local_query"):
+            pattern = st.text_input("Path pattern", "MATCH (w:Well)-[:TARGETS_FORMATION]->(f:Formation) RETURN w, f")
+            submitted = st.form_submit_button("Run pattern")
+        if submitted:
+            try:
+                st.session_state.local_query_result = (kg_data, graph.count(pattern), graph.match(pattern, limit=200))
+            except ValueError as e:
+                st.session_state.local_query_result = None
+                st.error(f"Can't run that pattern: {e}")
+        query = st.session_state.get("local_query_result")
+        if query is not None and query[0] is kg_data:
+            _, count, rows = query
+            st.write(f"{count} matches")
+            st.dataframe([{f"{var}.{key}": value for var, element in row.items() for key, value in element.items()}
+                          for row in rows], hide_index=True)
+        st.dataframe(degree_stats, hide_index=True)
+
+def graph_preview(kg_data: KnowledgeGraphData) -> GraphPreview:
+    """Per-type preview tables for kg_data, built once per validated graph and kept in session state."""
+    cached = st.session_state.get("graph_preview")
+    if cached is None or cached[0] is not kg_data:
+        with st.spinner("Indexing the graph for preview..."):
+            cached = st.session_state.graph_preview = (kg_data, GraphPreview.from_kg_data(kg_data))
+    return cached[1]
+
+@st.fragment
+def show_preview(kg_data: KnowledgeGraphData):
+    """One page of one node/relationship type at a time; paging reruns only this fragment."""
+    preview = graph_preview(kg_data)
+    summary = preview.summary()
+    col1, col2 = st.columns(2)
+    col1.metric("Nodes", f"{sum(summary[NODES].values()):,}")
+    col2.metric("Relationships", f"{sum(summary[RELATIONSHIPS].values()):,}")
+    st.dataframe([{"kind": kind, "type": name, "count": count} for kind, counts in summary.items()
+                  for name, count in counts.items()], hide_index=True)
+
+    kind = st.radio("Show", [NODES, RELATIONSHIPS], horizontal=True, key="preview_kind")
+    if not summary[kind]:
+        st.info(f"No {kind.lower()} to show.")
+        return
+    col1, col2, col3 = st.columns([2, 3, 1])
+    type_name = col1.selectbox("Type", list(summary[kind]), key=f"preview_type_{kind}")
+    search = col2.text_input("Search", key="preview_search", placeholder="Substring of any text column")
+    page_size = col3.selectbox("Rows per page", [25, 50, 100, 250], index=1, key="preview_page_size")
+    pages = max(1, -(-preview.count(kind, type_name, search) // page_size))
+    # The page number lives only in session state (no value=), so it can be clamped before the widget exists.
+    st.session_state.setdefault("preview_page", 1)
+    if st.session_state.preview_page > pages: # the filter or page size changed
+        st.session_state.preview_page = pages
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="preview_page") - 1
+    frame, total, rows = preview.page(kind, type_name, page, page_size, search)
+    st.caption(f"Rows {page * page_size + 1 if total else 0}-{page * page_size + len(frame)} of {total:,}")
+    st.dataframe(frame, hide_index=True)
+    if st.toggle("Show this page as JSON", key="preview_json"):
+        st.json([element.model_dump() for element in preview.models(kind, type_name, rows)])
+
+def show_integrity_report(report: IntegrityReport):
+    if report.ok:
+        return
+    st.warning(
+        f"Integrity check: {len(report.dangling)} relationships point at nodes that aren't in the graph, "
+        f"{len(report.mistyped)} endpoints use the wrong node type and {report.duplicate_relationships} relationships "
+        "are duplicates. Neo4j would silently skip the first two on upload."
+    )
+    problems = [{"problem": "dangling", **rel.model_dump()} for rel in report.dangling[:100]]
+    problems += [{"problem": f"mistyped {m.side} (is {', '.join(m.actual_types)})", **m.relationship.model_dump()}
+                 for m in report.mistyped[:100]]
+    st.dataframe(problems, hide_index=True)
 
 
 # --- Sidebar for Configuration ---
@@ -237,7 +320,64 @@ with st.sidebar:
     st.session_state.neo4j_uri = neo4j_uri
     st.session_state.neo4j_user = neo4j_user
     st.session_state.neo4j_password = neo4j_password
+
+    st.subheader("Upload Settings")
+    upload_mode = st.radio(
+        "Upload mode", ["batch", "row"], horizontal=True,
+        help="'batch' sends one UNWIND query per label/relationship pattern; 'row' commits each element separately (debugging fallback).",
+    )
+    batch_size = st.number_input("Batch size", min_value=1, max_value=100_000, value=DEFAULT_BATCH_SIZE, step=500)
+    pool_size = st.number_input(
+        "Connection pool size", min_value=1, max_value=500, value=DEFAULT_POOL_SIZE,
+        help="Max connections kept warm in the shared driver pool.",
+    )
+    upload_workers = st.number_input(
+        "Parallel workers", min_value=1, max_value=32, value=DEFAULT_WORKERS,
+        help="Sessions writing hash-partitioned batches concurrently (batch mode only).",
+    )
+    delta_sync = st.checkbox(
+        "Delta sync", value=False,
+        help="Only write nodes/relationships whose content changed since the last sync to this database.",
+    )
+    delete_missing = st.checkbox(
+        "Delete elements missing from this snapshot", value=False, disabled=not delta_sync,
+        help="Removes previously synced nodes/relationships that are not part of the uploaded data.",
+    )
+    integrity_check = st.checkbox(
+        "Integrity check before upload", value=True,
+        help="Drops relationships whose endpoint nodes are missing or mistyped instead of sending them to Neo4j.",
+    )
+    create_stubs = st.checkbox(
+        "Create stub nodes for missing endpoints", value=False, disabled=not integrity_check,
+        help="Adds a placeholder node ({stub: true}) so the relationship is kept.",
+    )
+    repair_types = st.checkbox(
+        "Re-type mistyped endpoints", value=False, disabled=not integrity_check,
+        help="Points a relationship at the node's actual type when its id exists under exactly one other type.",
+    )
+    background_upload = st.checkbox(
+        "Run as a resumable background job", value=False,
+        help="Checkpoints every committed batch in a local SQLite file and uploads on a background thread; "
+             "a failed or interrupted upload resumes from the last committed batch. Delete-missing is not applied.",
+    )
+    profile_upload = st.checkbox(
+        "Profile upload (cProfile + tracemalloc)", value=False,
+        help="Captures a CPU and memory profile of the next upload; see the Dashboard page.",
+    )
     
+    st.header("🤖 LLM Extraction")
+    llm_model = st.text_input("Model", value=DEFAULT_LLM_MODEL)
+    llm_base_url = st.text_input("Base URL (optional)", value=os.environ.get("OPENAI_BASE_URL", ""),
+                                 help="Any OpenAI-compatible endpoint, e.g. a local server.")
+    llm_api_key = st.text_input("API key", type="password", value=os.environ.get("OPENAI_API_KEY", ""))
+    llm_concurrency = st.number_input("Concurrent requests", min_value=1, max_value=128, value=DEFAULT_MAX_CONCURRENCY)
+    llm_rate = st.number_input("Requests per second", min_value=0.1, max_value=1000.0, value=DEFAULT_REQUESTS_PER_SEC)
+    llm_skip_resolved = st.checkbox(
+        "Skip the LLM for rule-resolved chunks", value=True,
+        help="Chunks whose wells, licences, fields, formations and operators are all linked by the NPD rules "
+             "(utils/domain_ner.py) are answered without an LLM call.",
+    )
+
     st.markdown("---")
     st.header("ℹ️ About")
     st.markdown("""
@@ -292,26 +432,44 @@ def main():
 
     # Initialize validated_kg_data in session state
     if 'validated_kg_data' not in st.session_state:
-        st.session_state.validated_kg_data = None
+        set_validated_kg_data(None)
+
+    with st.expander("Run a real LLM extraction instead"):
+        llm_text = st.text_area("Text to extract from", EXAMPLE_INPUT_TEXT, height=150)
+        if st.button("🤖 Extract with LLM"):
+            if not llm_api_key and not llm_base_url:
+                st.warning("Provide an API key or a base URL in the sidebar.")
+            else:
+                run_llm_extraction(llm_text, llm_model, llm_base_url, llm_api_key, int(llm_concurrency), float(llm_rate),
+                                   llm_skip_resolved)
 
     # Section 3: Pydantic Validation
     st.header("3. Pydantic Validation")
     if st.button("🔍 Validate LLM Output"):
         with st.spinner("Validating data..."):
-            st.session_state.validated_kg_data = parse_and_validate_llm_output(MOCK_LLM_OUTPUT)
+            set_validated_kg_data(parse_and_validate_llm_output(MOCK_LLM_OUTPUT))
             if st.session_state.validated_kg_data:
                 st.success("Pydantic validation successful!")
             # Errors are handled within the function by st.error
 
     if st.session_state.validated_kg_data:
         st.subheader("Validated Knowledge Graph Data")
-        with st.expander("View Validated Data (Pydantic Models as JSON)"):
-            # Convert Pydantic models to dicts for JSON serialization
-            display_data = {
-                "nodes": [node.model_dump() for node in st.session_state.validated_kg_data.nodes],
-                "relationships": [rel.model_dump() for rel in st.session_state.validated_kg_data.relationships]
-            }
-            st.json(display_data)
+        with st.expander("View Validated Data"):
+            show_preview(st.session_state.validated_kg_data)
+
+        if st.button("🧩 Resolve Duplicate Entities"):
+            with st.spinner("Clustering near-duplicate entities..."):
+                result = resolve_entities(st.session_state.validated_kg_data)
+            set_validated_kg_data(result.kg_data)
+            st.success(
+                f"Entity resolution: merged {result.merged_nodes} nodes into {result.clusters} entities, "
+                f"{result.merged_relationships} duplicate relationships collapsed."
+            )
+            if result.id_map:
+                st.dataframe(
+                    [{"type": t, "id": old_id, "canonical_id": new_id} for (t, old_id), new_id in result.id_map.items()]
+                )
+        show_local_graph(st.session_state.validated_kg_data, st.session_state.validated_integrity)
     else:
         st.info("Click 'Validate LLM Output' to see results.")
 
@@ -323,12 +481,31 @@ def main():
             if not neo4j_uri or not neo4j_user or not neo4j_password:
                 st.warning("Please provide Neo4j connection details in the sidebar.")
             else:
-                uploader = None
+                lease = None
+                queued = False
                 try:
                     with st.spinner("Connecting to Neo4j and uploading data..."):
-                        uploader = Neo4jUploader(neo4j_uri, neo4j_user, neo4j_password)
-                        if uploader._driver: # Check if driver was successfully initialized
-                            success = uploader.upload_kg_data(st.session_state.validated_kg_data)
+                        lease = get_driver_registry().lease(neo4j_uri, neo4j_user, neo4j_password, max_pool_size=int(pool_size))
+                        uploader = Neo4jUploader(neo4j_uri, neo4j_user, neo4j_password, driver=lease.driver)
+                        if background_upload:
+                            job_id = submit_upload_job(
+                                uploader, st.session_state.validated_kg_data, target=neo4j_uri, mode=upload_mode,
+                                batch_size=int(batch_size), workers=int(upload_workers),
+                                sync_graph=graph_name(neo4j_uri) if delta_sync else None,
+                                integrity=IntegrityIndex(create_stubs=create_stubs, repair_types=repair_types)
+                                if integrity_check else None, lease=lease,
+                            )
+                            queued = True # the job releases the lease when it ends
+                            st.success(f"Upload queued as job {job_id}; progress is shown below.")
+                        else:
+                            with metrics.profile("Neo4j upload", memory=True) if profile_upload else nullcontext():
+                                success = upload_to_neo4j(
+                                    uploader, st.session_state.validated_kg_data, mode=upload_mode,
+                                    batch_size=int(batch_size), workers=int(upload_workers),
+                                    sync_graph=graph_name(neo4j_uri) if delta_sync else None, delete_missing=delete_missing,
+                                    integrity=IntegrityIndex(create_stubs=create_stubs, repair_types=repair_types)
+                                    if integrity_check else None,
+                                )
                             if success:
                                 st.balloons()
                                 st.markdown("---")
@@ -336,16 +513,18 @@ def main():
                                 st.code("MATCH (n) RETURN n LIMIT 25;", language="cypher")
                                 st.code("MATCH (w:Well)-[:TARGETS_FORMATION]->(f:Formation) RETURN w, f;", language="cypher")
                                 st.code("MATCH p=()-[r]->() RETURN p LIMIT 50;", language="cypher")
-                except Exception:
-                    # Error already displayed by Neo4jUploader init or upload_kg_data
-                    # st.error(f"An error occurred: {e}") # Redundant if already handled
-                    pass # Errors are displayed within Neo4jUploader
+                except Exception as e:
+                    # upload_to_neo4j reports its own errors; this catches the connection and job submission.
+                    if lease is None:
+                        st.error(f"Neo4j Connection Error: {e}")
+                    else:
+                        st.error(f"Error queuing the Neo4j upload: {e}")
                 finally:
-                    if uploader:
-                        uploader.close()
-                        # st.info("Neo4j connection closed.") # Can be a bit noisy
+                    if lease is not None and not queued:
+                        lease.release() # the registry keeps the driver for the next upload
     else:
         st.warning("Data must be validated successfully before it can be uploaded to Neo4j.")
+    show_upload_jobs(neo4j_uri, neo4j_user, neo4j_password, int(pool_size), upload_mode, int(upload_workers))
 
     st.markdown("---")
     st.markdown("End of Demo Application.")
@@ -1,28 +1,78 @@
 import streamlit as st
-import neo4j_graphrag
-from neo4j import GraphDatabase
-from pathlib import Path
-from neo4j_graphrag.experimental.components.pdf_loader import PdfLoader
-from neo4j_graphrag.experimental.pipeline.kg_builder import SimpleKGPipeline
+from utils.documents import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, iter_chunks
+from utils.resources import get_document_parser
+# PDFs are parsed from the uploaded bytes in a background process pool (utils/documents.py);
+# this page only submits files and polls their futures, so reruns never block on pypdf.
 
 def main():
     st.file_uploader(
-        "Upload a PDF file",
+        "Upload PDF files",
         type=["pdf"],
+        accept_multiple_files=True,
         on_change=load_pdf,
         key="pdf_uploader"
     )
-    
-    if st.session_state['pdf_uploader'] is not None:
-        pdf_path = Path(st.session_state['pdf_uploader'].name)
-        loader = PdfLoader()
-        text=loader.run(filepath=pdf_path)
-        st.write(text)  
+    chunk_size = st.number_input("Chunk size (characters)", min_value=200, max_value=20_000, value=DEFAULT_CHUNK_SIZE, step=100)
+    overlap = st.number_input("Chunk overlap (characters)", min_value=0, max_value=int(chunk_size) - 1,
+                              value=min(DEFAULT_CHUNK_OVERLAP, int(chunk_size) - 1), step=50)
+
+    if st.session_state.get('pdf_uploader'):
+        load_pdf() # no-op for files already submitted by the on_change callback
+        jobs = current_jobs()
+        if any(not future.done() for _, future in jobs):
+            wait_for_parsing()
+        else:
+            show_documents(jobs, int(chunk_size), int(overlap))
 
 def load_pdf():
-    uploaded_file = st.session_state.get("pdf_uploader")
-    if uploaded_file is not None:
-        pdf_path = Path(uploaded_file.name)
-        
+    # Submit every newly uploaded file once; futures live in session state across reruns.
+    jobs = st.session_state.setdefault("pdf_jobs", {})
+    parser = get_document_parser()
+    for uploaded_file in st.session_state.get("pdf_uploader") or []:
+        if uploaded_file.file_id not in jobs:
+            jobs[uploaded_file.file_id] = (uploaded_file.name, parser.submit(uploaded_file.name, uploaded_file.getvalue()))
+
+def current_jobs():
+    jobs = st.session_state.get("pdf_jobs", {})
+    return [jobs[f.file_id] for f in st.session_state.get("pdf_uploader") or [] if f.file_id in jobs]
+
+@st.fragment(run_every=1.0)
+def wait_for_parsing():
+    # Only this fragment re-runs while pypdf works; the full page reruns once everything is parsed.
+    pending = [name for name, future in current_jobs() if not future.done()]
+    if not pending:
+        st.rerun()
+    st.info(f"Parsing {len(pending)} file(s) in the background: {', '.join(pending)}")
+
+def show_documents(jobs, chunk_size: int, overlap: int):
+    documents = []
+    for name, future in jobs:
+        try:
+            documents.append(future.result())
+        except Exception as e:
+            st.error(f"Could not parse {name}: {e}")
+    if not documents:
+        return
+
+    chunks = list(iter_chunks(documents, chunk_size=chunk_size, overlap=overlap))
+    st.dataframe([
+        {"file": d.name, "pages": len(d.pages), "characters": len(d.text), "cached": d.cached}
+        for d in documents
+    ])
+    st.write(f"{len(chunks)} chunks of up to {chunk_size} characters ({overlap} overlap).")
+    with st.expander("Preview chunks"):
+        for chunk in chunks[:20]:
+            st.caption(f"{chunk.doc_id} (offset {chunk.start})")
+            st.text(chunk.text[:500])
+
+    if st.button("Extract triples from chunks"):
+        from utils.documents import extract_chunk_triples
+        from utils.resources import get_extraction_cache
+
+        with st.spinner("Extracting triples..."):
+            rows = [t._asdict() for t in extract_chunk_triples(chunks, cache=get_extraction_cache())]
+        st.success(f"Extracted {len(rows)} triples from {len(chunks)} chunks.")
+        st.dataframe(rows)
+
 if __name__ in ("__main__", "__page__"):
-    main()
\ No newline at end of file
+    main()
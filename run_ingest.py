@@ -0,0 +1,421 @@
+# run_ingest.py
+# Headless batch runner: extract -> validate -> upload for every input in a directory,
+# without starting Streamlit. Installed as the `kg-ingest` console script.
+#
+# With --resolve, each input is validated as a whole and near-duplicate entities are merged
+# (utils/entity_resolution.py) before anything is uploaded; that input is held in memory for it.
+# With --delta, a local manifest of content hashes (utils/delta_sync.py) limits writes to new/changed elements.
+# Every uploaded batch is also appended to the local Parquet graph store (utils/graph_store.py)
+# that the Dashboard aggregates from; --no-store turns that off. --dry-run and --export-admin runs
+# upload nothing and so leave the store alone.
+# With --export-admin DIR nothing is sent to Neo4j: batches are streamed into neo4j-admin import
+# CSVs (utils/admin_export.py) for an offline first-time load.
+# With --resume-jobs, unfinished checkpointed upload jobs (utils/ingest_jobs.py, e.g. queued from the
+# Streamlit app before it went down) are finished from their last committed batch instead.
+#
+# Supported inputs:
+#   *.json                 LLM output shaped like MOCK_LLM_OUTPUT ({"nodes": [...], "relationships": [...]})
+#   *.ndjson, *.ndjson.gz  one node/relationship record per line (see utils/kg_stream.py)
+#   *.txt                  raw text, run through the spaCy triple extraction in utils/nlp_utils.py
+#                          (or, with --extractor llm, the async LLM engine in utils/llm_extraction.py)
+#
+# Only light modules are imported at module level: the neo4j driver, pydantic models, spaCy and
+# friends are imported by the handler that needs them, so --help, argument errors and worker
+# startup don't pay for the whole utils stack.
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.extraction_cache import DEFAULT_CACHE_DIR # stdlib-only (plus utils.metrics)
+
+if TYPE_CHECKING:
+    from utils.entity_resolution import ResolutionResult
+    from utils.kg_stream import StreamStats
+    from utils.neo4j_uploader import Neo4jUploader
+
+logger = logging.getLogger("kg-ingest")
+
+INPUT_SUFFIXES = (".json", ".ndjson", ".ndjson.gz", ".txt")
+
+
+def find_inputs(input_dir: Path, recursive: bool = False) -> List[Path]:
+    paths = input_dir.rglob("*") if recursive else input_dir.iterdir()
+    return sorted(p for p in paths if p.is_file() and p.name.endswith(INPUT_SUFFIXES))
+
+def _relationship_type(relation: str) -> str:
+    # Cypher relationship types are interpolated into queries, so keep them to [A-Z0-9_].
+    return re.sub(r"[^A-Za-z0-9]+", "_", relation).strip("_").upper() or "RELATED_TO"
+
+def extract_text_records(text: str, cache=None) -> Iterator[Dict[str, Any]]:
+    # Imported lazily: loading spaCy and its model is only paid when a .txt input is present.
+    from utils.domain_ner import extract_domain
+    from utils.nlp_utils import extract_triples
+
+    # NPD identifiers and gazetteer names give typed nodes (Well, License, ...) and rule relationships;
+    # a triple entity ending in such a mention ("Well 33/9-A-12") becomes that node instead of an Entity.
+    domain = next(extract_domain([text]))
+    mentions = sorted({entity.text: (entity.type, entity.id) for entity in domain.entities}.items(),
+                      key=lambda mention: -len(mention[0]))
+
+    def typed(entity: str):
+        for mention, key in mentions:
+            if entity == mention or entity.endswith(" " + mention):
+                return key
+        return "Entity", entity
+
+    seen = set()
+    for entity in domain.entities:
+        if (entity.type, entity.id) not in seen:
+            seen.add((entity.type, entity.id))
+            yield {"kind": "node", "id": entity.id, "type": entity.type, "attributes": {}}
+    relationships = [{"kind": "relationship", **rel.model_dump()} for rel in domain.kg_data.relationships]
+    for head, relation, tail, _, _ in extract_triples([text], cache=cache):
+        (head_type, head_id), (tail_type, tail_id) = typed(head), typed(tail)
+        for node_type, node_id in ((head_type, head_id), (tail_type, tail_id)):
+            if (node_type, node_id) not in seen:
+                seen.add((node_type, node_id))
+                yield {"kind": "node", "id": node_id, "type": node_type, "attributes": {"name": node_id}}
+        relationships.append({
+            "kind": "relationship", "source_id": head_id, "source_type": head_type, "target_id": tail_id,
+            "target_type": tail_type, "relationship_type": _relationship_type(relation),
+            "properties": {"relation": relation},
+        })
+    yield from relationships
+
+def extract_llm_records(text: str, args: argparse.Namespace, cache=None) -> Iterator[Dict[str, Any]]:
+    from utils.documents import chunk_text
+    from utils.llm_extraction import OpenAIClient, extract_kg
+
+    client = OpenAIClient(model=args.llm_model, base_url=args.llm_base_url)
+    kg_data, results, stats = extract_kg(
+        [chunk for _, chunk in chunk_text(text)], client=client, max_concurrency=args.llm_concurrency,
+        requests_per_sec=args.llm_rate, cache=cache, skip_resolved=args.skip_resolved,
+    )
+    for result in results:
+        if result.error:
+            logger.warning("LLM request for chunks %s failed: %s", result.chunk_ids, result.error)
+    logger.info("LLM extraction: %s", stats.summary())
+    return kg_data_records(kg_data)
+
+def kg_data_records(kg_data) -> Iterator[Dict[str, Any]]:
+    for node in kg_data.nodes:
+        # Model-specific fields (e.g. Well.total_depth_m) go back into 'attributes', as in the LLM output.
+        attributes = node.model_dump(exclude={"id", "type", "attributes"}, exclude_none=True)
+        attributes.update(node.attributes)
+        yield {"kind": "node", "id": node.id, "type": node.type, "attributes": attributes}
+    for rel in kg_data.relationships:
+        yield {"kind": "relationship", **rel.model_dump()}
+
+def input_records(path: Path, cache=None, args: Optional[argparse.Namespace] = None):
+    from utils.kg_stream import payload_to_records
+
+    if path.name.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as handle:
+            return payload_to_records(json.load(handle))
+    if path.name.endswith(".txt"):
+        if args is not None and args.extractor == "llm":
+            return extract_llm_records(path.read_text(encoding="utf-8"), args, cache)
+        return extract_text_records(path.read_text(encoding="utf-8"), cache)
+    # NDJSON: hand the path over so the stream can read nodes and relationships in two passes.
+    return path
+
+def resolve_records(records) -> Tuple[List[Dict[str, Any]], "ResolutionResult"]:
+    """Validate all records of one input, merge duplicate entities, and return the resolved records.
+
+    Invalid records are passed through unchanged after the resolved ones, so stream_ingest still
+    counts them (or raises on them with --strict).
+    """
+    from pydantic import ValidationError
+    from utils.entity_resolution import resolve_entities
+    from utils.kg_models import KnowledgeGraphData
+    from utils.kg_stream import NODE, iter_ndjson, record_kind
+    from utils.kg_validation import get_validator
+
+    validator = get_validator()
+    nodes, relationships, invalid = [], [], []
+    for record in iter_ndjson(records):
+        try:
+            if record_kind(record) == NODE:
+                nodes.append(validator.validate_node(record))
+            else:
+                relationships.append(validator.validate_relationship(record))
+        except ValidationError:
+            invalid.append(record)
+    result = resolve_entities(KnowledgeGraphData.model_construct(nodes=nodes, relationships=relationships))
+    return [*kg_data_records(result.kg_data), *invalid], result
+
+def ingest_file(path: Path, uploader: Optional["Neo4jUploader"], args: argparse.Namespace, cache=None,
+                store_writer=None) -> "StreamStats":
+    from utils.kg_integrity import IntegrityIndex
+    from utils.kg_stream import stream_ingest
+
+    records = input_records(path, cache, args)
+    resolution = None
+    if args.resolve:
+        records, resolution = resolve_records(records)
+    stats = stream_ingest(
+        records, uploader, batch_size=args.batch_size, workers=args.workers,
+        on_invalid="raise" if args.strict else "skip", store_writer=store_writer,
+        # Each input is checked on its own: its relationships must point at its own nodes.
+        integrity=IntegrityIndex(create_stubs=args.integrity == "stub", repair_types=args.repair_types)
+        if args.integrity != "off" else None,
+    )
+    print(
+        f"{path}: {stats.nodes} nodes, {stats.relationships} relationships, {stats.invalid} invalid "
+        f"in {stats.seconds:.2f}s ({stats.records_per_sec:,.0f} records/s)",
+        flush=True,
+    )
+    if resolution is not None:
+        print(
+            f"{path}: entity resolution merged {resolution.merged_nodes} nodes into {resolution.clusters} entities, "
+            f"{resolution.merged_relationships} duplicate relationships collapsed",
+            flush=True,
+        )
+    return stats
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="kg-ingest", description="Extract, validate and upload a directory of inputs to Neo4j.")
+    parser.add_argument("input_dir", type=Path, nargs="?", help="Directory containing .json, .ndjson(.gz) or .txt inputs.")
+    parser.add_argument("--recursive", action="store_true", help="Also pick up inputs in subdirectories.")
+    parser.add_argument("--uri", default=os.environ.get("NEO4J_URI", "bolt://localhost:7687"))
+    parser.add_argument("--user", default=os.environ.get("NEO4J_USER", "neo4j"))
+    parser.add_argument("--password", default=os.environ.get("NEO4J_PASSWORD"), help="Defaults to $NEO4J_PASSWORD.")
+    parser.add_argument("--batch-size", type=int, help="Elements per upload batch (default: the uploader's DEFAULT_BATCH_SIZE).")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel Neo4j write sessions per batch.")
+    parser.add_argument("--jobs", type=int, default=1, help="Input files processed concurrently.")
+    parser.add_argument("--dry-run", action="store_true", help="Extract and validate only, don't connect to Neo4j.")
+    parser.add_argument("--cache-dir", type=Path, default=Path(DEFAULT_CACHE_DIR), help="Extraction cache location.")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-run extraction.")
+    parser.add_argument("--extractor", choices=["spacy", "llm"], default="spacy", help="How .txt inputs are turned into triples.")
+    parser.add_argument("--llm-model", default=os.environ.get("KG_LLM_MODEL"), help="Defaults to $KG_LLM_MODEL or the engine's default.")
+    parser.add_argument("--llm-base-url", default=os.environ.get("OPENAI_BASE_URL"), help="OpenAI-compatible endpoint.")
+    parser.add_argument("--llm-concurrency", type=int, help="Max in-flight LLM requests.")
+    parser.add_argument("--llm-rate", type=float, help="Max LLM requests per second.")
+    parser.add_argument("--skip-resolved", action="store_true",
+                        help="With --extractor llm: answer chunks the rule-based NPD NER fully resolves without an LLM call.")
+    parser.add_argument("--resolve", action="store_true",
+                        help="Merge near-duplicate entities (e.g. PL037 / PL 037, 33/9-A-12 / 33/9-A-12 H) per input before upload.")
+    parser.add_argument("--delta", action="store_true", help="Only write elements whose content changed since the last sync.")
+    parser.add_argument("--delete-missing", action="store_true",
+                        help="With --delta: delete previously synced elements not present in this run's inputs.")
+    parser.add_argument("--export-admin", type=Path, metavar="DIR",
+                        help="Write neo4j-admin import CSVs to DIR instead of uploading (no Neo4j connection).")
+    parser.add_argument("--verify-export", action="store_true", help="Re-read and check the --export-admin files when done.")
+    parser.add_argument("--dedupe-relationships", action="store_true",
+                        help="With --export-admin: drop repeated relationships (keeps ~50 bytes per relationship in memory).")
+    parser.add_argument("--integrity", choices=["off", "check", "stub"], default="off",
+                        help="Pre-upload referential-integrity pass: drop (check) or stub (stub) edges to missing nodes.")
+    parser.add_argument("--repair-types", action="store_true",
+                        help="With --integrity, re-point edges whose endpoint id exists under a single other type.")
+    parser.add_argument("--no-store", action="store_true", help="Don't append uploaded data to the Dashboard's graph store.")
+    parser.add_argument("--resume-jobs", action="store_true",
+                        help="Finish unfinished upload jobs checkpointed in the cache dir for --uri, then exit (no input_dir).")
+    parser.add_argument("--strict", action="store_true", help="Abort on the first invalid record instead of skipping it.")
+    parser.add_argument("--profile", action="store_true", help="Capture a cProfile + tracemalloc profile of the run.")
+    parser.add_argument("--metrics-jsonl", type=Path, help="Append a metrics snapshot to this JSONL file when done.")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port while running.")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+def resolve_defaults(args: argparse.Namespace) -> argparse.Namespace:
+    # Defaults owned by the heavier modules, filled in once a handler is going to import them anyway.
+    from utils.neo4j_uploader import DEFAULT_BATCH_SIZE
+
+    if args.batch_size is None:
+        args.batch_size = DEFAULT_BATCH_SIZE
+    if args.extractor == "llm":
+        from utils.llm_extraction import DEFAULT_LLM_MODEL, DEFAULT_MAX_CONCURRENCY, DEFAULT_REQUESTS_PER_SEC
+
+        args.llm_model = args.llm_model or DEFAULT_LLM_MODEL
+        args.llm_concurrency = args.llm_concurrency or DEFAULT_MAX_CONCURRENCY
+        args.llm_rate = args.llm_rate or DEFAULT_REQUESTS_PER_SEC
+    return args
+
+def resume_jobs(args: argparse.Namespace, uploader: "Neo4jUploader") -> int:
+    from utils.delta_sync import SyncManifest
+    from utils.graph_store import GraphStore
+    from utils.ingest_jobs import DELTA, JobStore, job_writer, run_job
+
+    store = JobStore(args.cache_dir / "ingest_jobs.sqlite")
+    jobs = [job for job in store.unfinished() if job.target == args.uri]
+    if not jobs:
+        print(f"No unfinished upload jobs for {args.uri}.")
+    # Delta jobs keep writing through the manifest they started with; finished jobs go to the graph store.
+    manifest = SyncManifest(args.cache_dir / "sync_manifest.sqlite") if any(job.writer == DELTA for job in jobs) else None
+    graph_store = None if args.no_store or not jobs else GraphStore(args.cache_dir / "graph_store")
+    failed = 0
+    for job in jobs:
+        print(f"Job {job.job_id} ({job.source}, {job.writer}): resuming at batch {job.committed_batches + 1}/{job.total_batches}", flush=True)
+        try:
+            job = run_job(store, job.job_id, job_writer(job, uploader, manifest), workers=args.workers)
+        except Exception as e:
+            failed += 1
+            print(f"Job {job.job_id}: FAILED: {e}", file=sys.stderr, flush=True)
+            continue
+        if graph_store is not None and job.finished:
+            with graph_store.writer(job.source or "kg-ingest") as writer:
+                writer.write(store.load_graph(job.job_id))
+        print(f"Job {job.job_id}: {job.status}, {job.nodes} nodes, {job.relationships} relationships written", flush=True)
+    if manifest is not None:
+        manifest.close()
+    store.close()
+    return 1 if failed else 0
+
+def resume_command(args: argparse.Namespace) -> int:
+    if not args.password:
+        print("Error: no Neo4j password given (use --password or $NEO4J_PASSWORD).", file=sys.stderr)
+        return 2
+    from utils.neo4j_uploader import Neo4jUploader
+
+    resolve_defaults(args)
+    try:
+        uploader = Neo4jUploader(args.uri, args.user, args.password)
+    except Exception as e:
+        print(f"Neo4j Connection Error: {e}", file=sys.stderr)
+        return 1
+    try:
+        return resume_jobs(args, uploader)
+    finally:
+        uploader.close()
+
+def ingest_command(args: argparse.Namespace) -> int:
+    if args.input_dir is None:
+        print("Error: no input directory given (or pass --resume-jobs).", file=sys.stderr)
+        return 2
+    if not args.input_dir.is_dir():
+        print(f"Error: {args.input_dir} is not a directory.", file=sys.stderr)
+        return 2
+    inputs = find_inputs(args.input_dir, args.recursive)
+    if not inputs:
+        print(f"No inputs ({', '.join(INPUT_SUFFIXES)}) found in {args.input_dir}.", file=sys.stderr)
+        return 1
+
+    if args.export_admin and (args.delta or args.dry_run):
+        print("Error: --export-admin builds a fresh graph offline; it can't be combined with --delta or --dry-run.", file=sys.stderr)
+        return 2
+
+    from utils import metrics
+    from utils.admin_export import AdminImportExporter, verify_export
+    from utils.delta_sync import DeltaSyncer, SyncManifest, graph_name
+    from utils.extraction_cache import ExtractionCache
+    from utils.graph_store import GraphStore
+    from utils.kg_stream import StreamStats
+    from utils.neo4j_uploader import Neo4jUploader
+
+    resolve_defaults(args)
+    uploader = None
+    exporter = AdminImportExporter(args.export_admin, dedupe_relationships=args.dedupe_relationships) \
+        if args.export_admin else None
+    if not args.dry_run and exporter is None:
+        if not args.password:
+            print("Error: no Neo4j password given (use --password or $NEO4J_PASSWORD), or pass --dry-run.", file=sys.stderr)
+            return 2
+        try:
+            uploader = Neo4jUploader(args.uri, args.user, args.password)
+        except Exception as e:
+            print(f"Neo4j Connection Error: {e}", file=sys.stderr)
+            return 1
+
+    cache = None if args.no_cache else ExtractionCache(args.cache_dir / "extraction.sqlite")
+    # DeltaSyncer has the uploader's upload_kg_data(), so stream_ingest can write through it unchanged.
+    syncer = DeltaSyncer(uploader, SyncManifest(args.cache_dir / "sync_manifest.sqlite"), graph_name(args.uri)) if args.delta else None
+    writer = syncer or exporter or uploader
+    # Only runs that reach Neo4j are published to the Dashboard (rows and throughput).
+    store_writer = None if args.no_store or uploader is None else GraphStore(args.cache_dir / "graph_store").writer("kg-ingest")
+
+    start = time.perf_counter()
+    totals = StreamStats()
+    failed = []
+    if args.metrics_port:
+        metrics.start_metrics_server(args.metrics_port)
+    profiler = metrics.profile("kg-ingest", memory=True) if args.profile else nullcontext()
+    with profiler as report:
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+                futures = {path: pool.submit(ingest_file, path, writer, args, cache, store_writer) for path in inputs}
+                for path, future in futures.items():
+                    try:
+                        stats = future.result()
+                    except Exception as e:
+                        failed.append(path)
+                        print(f"{path}: FAILED: {e}", file=sys.stderr, flush=True)
+                        continue
+                    totals.records += stats.records
+                    totals.nodes += stats.nodes
+                    totals.relationships += stats.relationships
+                    totals.invalid += stats.invalid
+                    totals.upload.add(stats.upload)
+                    totals.integrity.add(stats.integrity)
+            # A partial run hasn't seen every element, so only a fully successful one may delete.
+            if syncer and args.delete_missing and not failed:
+                syncer.finish(delete_missing=True, batch_size=args.batch_size)
+        finally:
+            if uploader:
+                uploader.close()
+            if exporter:
+                exporter.close()
+            if store_writer:
+                store_writer.close() # publishes the run to the Dashboard
+    totals.seconds = time.perf_counter() - start
+
+    mode = "dry run" if args.dry_run else f"exported to {args.export_admin}" if exporter else f"uploaded to {args.uri}"
+    print(
+        f"\nSummary ({mode}): {len(inputs) - len(failed)}/{len(inputs)} files, "
+        f"{totals.nodes} nodes, {totals.relationships} relationships, {totals.invalid} invalid records "
+        f"in {totals.seconds:.2f}s ({totals.records_per_sec:,.0f} records/s)"
+    )
+    if cache is not None and (cache.stats.hits or cache.stats.misses):
+        print(f"Extraction cache: {cache.stats.hits} hits, {cache.stats.misses} misses ({cache.stats.hit_rate:.0%} hit rate)")
+    if args.integrity != "off":
+        print(f"Integrity: {totals.integrity.summary()}")
+    if totals.upload.skipped_relationships:
+        print(f"Warning: Neo4j skipped {totals.upload.skipped_relationships} relationships whose endpoints weren't found.")
+    if syncer:
+        d = syncer.stats
+        print(
+            f"Delta sync: {d.new} new, {d.changed} changed, {d.unchanged} unchanged; "
+            f"deleted {d.deleted_nodes} nodes, {d.deleted_relationships} relationships"
+        )
+    export_failed = False
+    if exporter:
+        e = exporter.stats
+        print(
+            f"neo4j-admin export: {len(e.files)} files, {e.bytes_written / 1e6:.1f} MB; skipped {e.duplicate_nodes} duplicate nodes, "
+            f"{e.duplicate_relationships} duplicate relationships. Load with {args.export_admin / 'import.sh'}"
+        )
+        if args.verify_export:
+            check = verify_export(args.export_admin)
+            print(
+                f"Export check: {check.nodes} nodes, {check.relationships} relationships "
+                f"({check.dangling_relationships} with unknown endpoints), {len(check.errors)} errors"
+            )
+            for message in check.errors:
+                print(f"  {message}", file=sys.stderr)
+            export_failed = not check.ok
+    if uploader:
+        print(
+            f"Neo4j write throughput: {totals.upload.nodes_per_sec:,.0f} nodes/s, "
+            f"{totals.upload.relationships_per_sec:,.0f} rels/s"
+        )
+    if args.profile:
+        print(f"\nProfile ({report.seconds:.2f}s, peak traced memory {report.peak_memory_bytes / 1e6:.1f} MB):")
+        print(report.cpu_top)
+    if args.metrics_jsonl:
+        metrics.METRICS.write_jsonl(args.metrics_jsonl)
+    return 1 if failed or export_failed else 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    return resume_command(args) if args.resume_jobs else ingest_command(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import pytest
+
+from utils.admin_export import AdminImportExporter, import_script, verify_export
+from utils.kg_models import BaseNode, Formation, KnowledgeGraphData, Relationship, Well
+
+EDGE = Relationship(source_id="W1", source_type="Well", target_id="F1", target_type="Formation",
+                    relationship_type="TARGETS_FORMATION")
+
+
+def _export(out_dir, relationships, **options):
+    with AdminImportExporter(out_dir, **options) as exporter:
+        exporter.upload_kg_data(KnowledgeGraphData(
+            nodes=[Well(id="W1", total_depth_m=2500.0), Formation(id="F1"), Well(id="W1")], relationships=relationships,
+        ))
+    return exporter.stats
+
+
+def test_export_round_trips_through_verify(tmp_path):
+    stats = _export(tmp_path, [EDGE, EDGE])
+    assert (stats.nodes, stats.duplicate_nodes, stats.relationships) == (2, 1, 2) # relationships aren't deduped by default
+    report = verify_export(tmp_path)
+    assert report.ok, report.errors
+    assert (report.files, report.nodes, report.relationships, report.dangling_relationships) == (3, 2, 2, 0)
+
+
+def test_relationship_dedupe_is_opt_in(tmp_path):
+    stats = _export(tmp_path, [EDGE, EDGE], dedupe_relationships=True)
+    assert (stats.relationships, stats.duplicate_relationships) == (1, 1)
+
+
+@pytest.mark.parametrize("node_type, rel_type", [("Oil'Field", "LOCATED_IN"), ("Field", "LOCATED IN; rm -rf /")])
+def test_unsafe_labels_and_types_are_rejected_before_anything_is_written(tmp_path, node_type, rel_type):
+    exporter = AdminImportExporter(tmp_path)
+    kg_data = KnowledgeGraphData(
+        nodes=[BaseNode(id="x", type=node_type)],
+        relationships=[Relationship(source_id="x", source_type=node_type, target_id="y", target_type="Field",
+                                    relationship_type=rel_type)],
+    )
+    with pytest.raises(ValueError):
+        exporter.upload_kg_data(kg_data)
+    exporter.close()
+    assert exporter.stats.nodes == 0 and not exporter.stats.files
+
+
+def test_import_script_quotes_every_argument():
+    script = import_script(["--nodes=Well=nodes/it's here.csv"])
+    assert "'--nodes=Well=nodes/it'\"'\"'s here.csv'" in script
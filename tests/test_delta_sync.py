@@ -0,0 +1,78 @@
+import sqlite3
+
+from benchmarks.memory_neo4j import MemoryDriver
+from utils.delta_sync import DeltaSyncer, SyncManifest, relationship_key
+from utils.kg_models import Formation, KnowledgeGraphData, Relationship, Well
+from utils.neo4j_uploader import Neo4jUploader
+
+GRAPH = "bolt://test/neo4j"
+TARGETS = Relationship(source_id="W1", source_type="Well", target_id="F1", target_type="Formation",
+                       relationship_type="TARGETS_FORMATION")
+
+
+def _snapshot(*nodes, relationships=(TARGETS,)) -> KnowledgeGraphData:
+    return KnowledgeGraphData(nodes=list(nodes), relationships=list(relationships))
+
+
+def _sync(driver, manifest, kg_data, delete_missing=False):
+    uploader = Neo4jUploader("memory://", "", "", driver=driver)
+    return DeltaSyncer(uploader, manifest, GRAPH).sync(kg_data, delete_missing=delete_missing)
+
+
+def test_unchanged_snapshot_writes_nothing(tmp_path):
+    driver, manifest = MemoryDriver(), SyncManifest(tmp_path / "manifest.sqlite")
+    first = _sync(driver, manifest, _snapshot(Well(id="W1"), Formation(id="F1")))
+    assert (first.new, first.upload.nodes, first.upload.relationships) == (3, 2, 1)
+    second = _sync(driver, manifest, _snapshot(Well(id="W1"), Formation(id="F1")))
+    assert (second.unchanged, second.upload.nodes, second.upload.relationships) == (3, 0, 0)
+    third = _sync(driver, manifest, _snapshot(Well(id="W1", total_depth_m=2500.0), Formation(id="F1")))
+    assert (third.changed, third.upload.nodes, third.upload.relationships) == (1, 1, 0)
+
+
+def test_skipped_relationship_is_not_recorded_and_retried(tmp_path):
+    driver, manifest = MemoryDriver(), SyncManifest(tmp_path / "manifest.sqlite")
+    first = _sync(driver, manifest, _snapshot(Well(id="W1"))) # F1 missing: Neo4j skips the edge
+    assert first.upload.skipped_relationships == 1
+    assert manifest.hashes(GRAPH, [relationship_key(TARGETS)]) == {}
+    second = _sync(driver, manifest, _snapshot(Well(id="W1"), Formation(id="F1")))
+    assert second.upload.relationships == 1
+    assert ("TARGETS_FORMATION", "W1", "F1") in driver.graph.relationships
+
+
+def test_relationships_of_a_recreated_node_are_sent_again(tmp_path):
+    driver, manifest = MemoryDriver(), SyncManifest(tmp_path / "manifest.sqlite")
+    _sync(driver, manifest, _snapshot(Well(id="W1"), Formation(id="F1")))
+    dropped = _sync(driver, manifest, _snapshot(Well(id="W1"), relationships=()), delete_missing=True)
+    assert dropped.deleted_nodes == 1
+    assert not driver.graph.relationships
+
+    # F1 comes back in one batch and the unchanged edge in a later one: the edge is still re-sent.
+    uploader = Neo4jUploader("memory://", "", "", driver=driver)
+    syncer = DeltaSyncer(uploader, manifest, GRAPH)
+    syncer.upload_kg_data(_snapshot(Well(id="W1"), Formation(id="F1"), relationships=()))
+    syncer.upload_kg_data(_snapshot(relationships=(TARGETS,)))
+    assert syncer.stats.upload.relationships == 1
+    assert ("TARGETS_FORMATION", "W1", "F1") in driver.graph.relationships
+
+
+def test_relationship_entries_of_a_new_node_are_invalidated_in_the_same_batch(tmp_path):
+    driver, manifest = MemoryDriver(), SyncManifest(tmp_path / "manifest.sqlite")
+    _sync(driver, manifest, _snapshot(Well(id="W1"), Formation(id="F1")))
+    # The nodes were deleted outside the sync and forgotten by the manifest, the edge entry was not.
+    driver.graph.nodes.clear()
+    driver.graph.relationships.clear()
+    with sqlite3.connect(manifest.path) as conn:
+        conn.execute("DELETE FROM elements WHERE substr(key, 1, 1) = 'N'")
+    stats = _sync(driver, manifest, _snapshot(Well(id="W1"), Formation(id="F1")))
+    assert stats.upload.relationships == 1
+
+
+def test_manifest_without_endpoint_columns_is_migrated(tmp_path):
+    path = tmp_path / "manifest.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE elements (graph TEXT NOT NULL, key TEXT NOT NULL, hash TEXT NOT NULL,"
+                     " run_id TEXT NOT NULL, synced_at REAL NOT NULL, PRIMARY KEY (graph, key))")
+        conn.execute("INSERT INTO elements VALUES (?, ?, 'h', 'r', 0)", (GRAPH, relationship_key(TARGETS)))
+    manifest = SyncManifest(path)
+    assert manifest.forget_relationships(GRAPH, ["N\x1fFormation\x1fF1"]) == 1
+    assert manifest.count(GRAPH) == 0
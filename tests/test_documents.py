@@ -0,0 +1,62 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pypdf
+import pytest
+
+from utils.documents import DocumentParser, chunk_text
+from utils.extraction_cache import ExtractionCache
+
+
+def _blank_pdf(pages: int = 2) -> bytes:
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=72, height=72)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+class CacheWriteError(Exception):
+    pass
+
+
+class FailingCache:
+    def get(self, *args):
+        return None
+
+    def put(self, *args):
+        raise CacheWriteError("disk full")
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        yield pool
+
+
+def test_parsed_document_is_cached_by_content(tmp_path, executor):
+    parser = DocumentParser(cache=ExtractionCache(tmp_path / "cache.sqlite"), executor=executor)
+    first = parser.submit("report.pdf", _blank_pdf()).result(timeout=10)
+    assert (first.pages, first.cached) == (["", ""], False)
+    again = parser.submit("renamed.pdf", _blank_pdf())
+    assert again.done() and again.result().cached and again.result().name == "renamed.pdf"
+
+
+@pytest.mark.parametrize("data, cache, error", [
+    (b"not a pdf", None, pypdf.errors.PdfReadError),
+    (_blank_pdf(), FailingCache(), CacheWriteError),
+], ids=["unreadable-pdf", "cache-write"])
+def test_failures_resolve_the_future(executor, data, cache, error):
+    future = DocumentParser(cache=cache, executor=executor).submit("bad.pdf", data)
+    with pytest.raises(error):
+        future.result(timeout=10)
+
+
+def test_chunks_overlap_and_cut_at_whitespace():
+    text = " ".join(f"word{i}" for i in range(200))
+    chunks = list(chunk_text(text, chunk_size=100, overlap=20))
+    assert all(len(chunk) <= 100 for _, chunk in chunks)
+    for (start, chunk), (next_start, _) in zip(chunks, chunks[1:]):
+        assert next_start == start + len(chunk) - 20
+    assert chunks[-1][0] + len(chunks[-1][1]) == len(text)
@@ -0,0 +1,68 @@
+import pytest
+
+from utils.domain_ner import LICENCE_RE, WELLBORE_RE, Gazetteer, build_domain_nlp, extract_domain
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    return build_domain_nlp()
+
+
+@pytest.mark.parametrize("text, found", [
+    ("Well 6507/7-A-26 H reached TD.", ["6507/7-A-26 H"]),
+    ("33/9-A-12 and 34/10-C-5 T2 were drilled.", ["33/9-A-12", "34/10-C-5 T2"]),
+    ("The 7220/8-1 discovery well", ["7220/8-1"]),
+    ("Sidetrack 15/9-19 ST2 was plugged.", ["15/9-19 ST2"]),
+    ("Dated 12/05/2004 in the report", []),
+])
+def test_wellbore_regex(text, found):
+    assert [match.group(0) for match in WELLBORE_RE.finditer(text)] == found
+
+
+def test_licence_regex():
+    assert [match.groups() for match in LICENCE_RE.finditer("PL037, PL 1049B and PLX")] == [("037", ""), ("1049", "B")]
+
+
+def test_gazetteer_patterns_use_canonical_ids():
+    gazetteer = Gazetteer(fields={"Gjøa": ["Gjoa"]}, formations={"Brent": []}, companies={"Equinor ASA": ["Statoil"]})
+    patterns = {(p["label"], p["pattern"]): p["id"] for p in gazetteer.patterns()}
+    assert patterns[("Field", "Gjoa field")] == "Gjøa Field"
+    assert patterns[("Formation", "Brent Fm.")] == "Brent Formation"
+    assert patterns[("Company", "Statoil")] == "Equinor ASA"
+
+
+def test_gazetteer_load_reads_reference_lists(tmp_path):
+    (tmp_path / "companies.txt").write_text("# operators\nNew Operator AS | NewOp |\n\n", encoding="utf-8")
+    gazetteer = Gazetteer.load(tmp_path)
+    assert gazetteer.companies == {"New Operator AS": ["NewOp"]}
+    assert gazetteer.fields == Gazetteer().fields # no fields.txt: built-in list kept
+
+
+def test_extract_domain_types_and_relates_entities(nlp):
+    text = "Well 33/9-A-12 targets the Brent Formation. PL037 is operated by Statoil."
+    (extraction,) = extract_domain([(text, "doc-1")], nlp=nlp)
+    assert extraction.doc_id == "doc-1"
+    assert [(e.type, e.id, e.sent_idx) for e in extraction.entities] == [
+        ("Well", "33/9-A-12", 0), ("Formation", "Brent Formation", 0), ("License", "PL037", 1), ("Company", "Equinor ASA", 1),
+    ]
+    assert [type(node).__name__ for node in extraction.kg_data.nodes] == ["Well", "Formation", "License", "Company"]
+    assert {(r.relationship_type, r.properties["rule"]) for r in extraction.kg_data.relationships} == {
+        ("TARGETS_FORMATION", True), ("OPERATED_BY", True),
+    }
+    assert extraction.resolved
+
+
+@pytest.mark.parametrize("text", [
+    "The Statfjord field was discovered in 1974.", # lone entity: attributes for the LLM
+    "Well 33/9-A-12 targets the Brent Formation. It reached TD in 1980.", # sentence without entities
+    "Equinor and the Troll field are mentioned here.", # no trigger between them
+])
+def test_unlinked_chunks_are_left_to_the_llm(nlp, text):
+    (extraction,) = extract_domain([text], nlp=nlp)
+    assert extraction.entities and not extraction.resolved
+
+
+def test_wellbore_and_licence_ids_are_canonical(nlp):
+    (extraction,) = extract_domain(["Wellbore 6507/7-A-26 H was drilled in licence PL 124B."], nlp=nlp)
+    assert [(e.type, e.id) for e in extraction.entities] == [("Well", "6507/7-A-26 H"), ("License", "PL124B")]
+    assert [r.relationship_type for r in extraction.kg_data.relationships] == ["DRILLED_IN_LICENSE"]
@@ -0,0 +1,57 @@
+import pytest
+
+from utils.entity_resolution import cluster_ids, resolve_entities, wellbore_key
+from utils.kg_models import BaseNode, Field, KnowledgeGraphData, Relationship, Well
+
+
+@pytest.mark.parametrize("node_id, key", [
+    ("33_9-A-12", "33/9-A-12"),
+    ("33_9-A-12_H", "33/9-A-12"),
+    ("6507/7-A-26 H", "6507/7-A-26"),
+    ("6507_7-A-26", "6507/7-A-26"),
+    ("7220_8-1", "7220/8-1"),
+    ("15_9-19_ST2", "15/9-19"),
+    ("34_10-C-5_T2", "34/10-C-5"),
+    ("Statfjord", None),
+])
+def test_wellbore_key(node_id, key):
+    assert wellbore_key(node_id) == key
+
+
+def test_four_digit_quadrant_variants_are_merged():
+    wells = [Well(id="6507/7-A-26"), Well(id="6507/7-A-26 H", total_depth_m=4100.0), Well(id="6507/7-A-27")]
+    rel = Relationship(source_id="6507/7-A-26 H", source_type="Well", target_id="Heidrun Field",
+                       target_type="Field", relationship_type="LOCATED_IN")
+    result = resolve_entities(KnowledgeGraphData(nodes=[*wells, Field(id="Heidrun Field")], relationships=[rel]))
+    ids = sorted(node.id for node in result.kg_data.nodes if node.type == "Well")
+    assert ids == ["6507_7-A-26", "6507_7-A-27"]
+    merged = next(node for node in result.kg_data.nodes if node.id == "6507_7-A-26")
+    assert merged.total_depth_m == 4100.0
+    assert merged.attributes["aliases"] == ["6507_7-A-26_H"]
+    assert result.kg_data.relationships[0].source_id == "6507_7-A-26"
+
+
+def test_fuzzy_names_merge_but_numbers_never_do():
+    roots, _ = cluster_ids(["Statfjord_Field", "STATFJORD", "Statfjord_field", "Troll_1", "Troll_2"], "Field")
+    assert roots[:3] == [0, 0, 0]
+    assert roots[3] != roots[4]
+
+
+def test_duplicate_relationships_through_aliases_collapse():
+    nodes = [BaseNode(id="Equinor", type="Company"), BaseNode(id="Equinor ASA", type="Company"),
+             BaseNode(id="PL037", type="License")]
+    rels = [Relationship(source_id=company, source_type="Company", target_id="PL037", target_type="License",
+                         relationship_type="OPERATES") for company in ("Equinor", "Equinor ASA")]
+    result = resolve_entities(KnowledgeGraphData(nodes=nodes, relationships=rels))
+    assert result.merged_nodes == 1 and result.merged_relationships == 1
+    assert len(result.kg_data.relationships) == 1
+
+
+def test_licence_spellings_share_one_canonical_name():
+    roots, _ = cluster_ids(["PL037", "PL_037", "PL 037", "PL038", "Production licence 037", "PL 037 B"], "License")
+    assert roots == [0, 0, 0, 3, 0, 5]
+
+
+def test_numbers_only_names_get_a_blocking_key():
+    roots, comparisons = cluster_ids(["1974", "1974.", "1975"], "Entity")
+    assert roots == [0, 0, 2] and comparisons == 0
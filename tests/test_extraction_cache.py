@@ -0,0 +1,65 @@
+import itertools
+import secrets
+
+import pytest
+
+from utils import extraction_cache
+from utils.extraction_cache import ExtractionCache, cache_key
+
+MODEL, VERSION = "en_core_web_sm-3.7", "v1"
+
+
+@pytest.fixture(autouse=True)
+def ticking_clock(monkeypatch):
+    # Each call is one second later, so last_access orders are never tied.
+    ticks = itertools.count(1)
+    monkeypatch.setattr(extraction_cache.time, "time", lambda: float(next(ticks)))
+
+
+def _payload() -> dict:
+    return {"triples": [secrets.token_hex(200)]} # incompressible, so every entry has about the same size
+
+
+def test_hits_misses_and_get_or_compute(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite")
+    assert cache.get("chunk", MODEL, VERSION) is None
+    computed = []
+    value = cache.get_or_compute("chunk", MODEL, VERSION, lambda text: computed.append(text) or {"n": 1})
+    assert cache.get_or_compute("chunk", MODEL, VERSION, lambda text: computed.append(text)) == value == {"n": 1}
+    assert computed == ["chunk"]
+    assert cache.get("chunk", MODEL, "v2") is None # a new pattern version is a different entry
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.writes) == (1, 3, 1)
+    assert cache.stats.hit_rate == 0.25
+
+
+def test_least_recently_used_entries_go_first_under_the_size_cap(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite", max_bytes=10 ** 9)
+    for name in "abc":
+        cache.put(name, MODEL, VERSION, _payload())
+    entry = cache.size_bytes // 3
+    cache.max_bytes = entry * 3 + entry // 2 # room for three entries, not four
+
+    assert cache.get("a", MODEL, VERSION) is not None # "b" is now the oldest
+    cache.put("d", MODEL, VERSION, _payload())
+    assert [cache.get(name, MODEL, VERSION) is not None for name in "abcd"] == [True, False, True, True]
+    assert (len(cache), cache.stats.evictions) == (3, 1)
+    assert cache.size_bytes <= cache.max_bytes
+
+
+def test_size_survives_reopening_and_rewrites(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = ExtractionCache(path)
+    cache.put("a", MODEL, VERSION, _payload())
+    cache.put("a", MODEL, VERSION, _payload()) # replaced, not counted twice
+    size = cache.size_bytes
+    cache.close()
+
+    reopened = ExtractionCache(path)
+    assert (len(reopened), reopened.size_bytes) == (1, size)
+    reopened.clear()
+    assert (len(reopened), reopened.size_bytes) == (0, 0)
+
+
+def test_cache_key_separates_its_parts():
+    assert cache_key("chunk", "ab", "c") != cache_key("chunk", "a", "bc")
+    assert cache_key("chunk", MODEL, VERSION) == cache_key("chunk", MODEL, VERSION)
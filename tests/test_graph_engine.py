@@ -0,0 +1,71 @@
+import pytest
+
+from utils.graph_engine import LocalGraph, parse_pattern
+from utils.kg_models import Field, Formation, KnowledgeGraphData, Relationship, Well
+
+
+def _graph() -> LocalGraph:
+    rels = [
+        Relationship(source_id="W1", source_type="Well", target_id="Brent", target_type="Formation",
+                     relationship_type="TARGETS_FORMATION"),
+        Relationship(source_id="W2", source_type="Well", target_id="Brent", target_type="Formation",
+                     relationship_type="TARGETS_FORMATION"),
+        Relationship(source_id="W1", source_type="Well", target_id="Statfjord", target_type="Field",
+                     relationship_type="LOCATED_IN"),
+    ]
+    nodes = [Well(id="W1", total_depth_m=3000.0), Well(id="W2"), Formation(id="Brent"), Field(id="Statfjord")]
+    return LocalGraph.from_kg_data(KnowledgeGraphData(nodes=nodes, relationships=rels))
+
+
+@pytest.mark.parametrize("text", [
+    "MATCH (w:Well)-[:TARGETS_FORMATION]->(f)",
+    "MATCH (w:Well) -[:TARGETS_FORMATION]-> (f)",
+    "  match ( w : Well )  -[ :TARGETS_FORMATION ]->  ( f )  ",
+    "MATCH (w:Well)\n  -[:TARGETS_FORMATION]->\n  (f);",
+])
+def test_spaced_and_unspaced_patterns_parse_the_same(text):
+    pattern = parse_pattern(text)
+    assert [(n.var, n.label) for n in pattern.nodes] == [("w", "Well"), ("f", None)]
+    assert [(r.types, r.direction) for r in pattern.rels] == [(["TARGETS_FORMATION"], "out")]
+
+
+def test_pattern_with_properties_return_and_limit():
+    pattern = parse_pattern("MATCH p = (f:Formation {id: 'Brent'}) <-[r:TARGETS_FORMATION|LOCATED_IN]- (w) RETURN w, r LIMIT 5")
+    assert pattern.nodes[0].properties == {"id": "Brent"}
+    assert pattern.rels[0].types == ["TARGETS_FORMATION", "LOCATED_IN"] and pattern.rels[0].direction == "in"
+    assert (pattern.returns, pattern.limit) == (["w", "r"], 5)
+
+
+@pytest.mark.parametrize("text", ["MATCH (w:Well) -[:T]-", "MATCH w:Well", "MATCH (a)<-[:T]->(b)"])
+def test_malformed_patterns_raise(text):
+    with pytest.raises(ValueError):
+        parse_pattern(text)
+
+
+def test_match_and_count_with_whitespace():
+    graph = _graph()
+    assert graph.count("MATCH (w:Well) -[:TARGETS_FORMATION]-> (f:Formation)") == 2
+    rows = graph.match("MATCH (w:Well {id: 'W1'}) -[:LOCATED_IN]-> (f) RETURN f")
+    assert [row["f"]["id"] for row in rows] == ["Statfjord"]
+
+
+def test_return_p_gives_the_whole_path():
+    rows = _graph().match("MATCH p=(w {id: 'W1'})-[r]->() RETURN p")
+    assert [list(row) for row in rows] == [["w", "r", "_n1"]] * 2
+    assert sorted((row["r"]["type"], row["_n1"]["id"]) for row in rows) == [
+        ("LOCATED_IN", "Statfjord"), ("TARGETS_FORMATION", "Brent")]
+    assert all(row["w"]["id"] == "W1" for row in rows)
+
+
+def test_a_path_never_reuses_a_relationship():
+    graph = _graph()
+    # W1-Brent-W1 would walk the same TARGETS_FORMATION edge back.
+    rows = graph.match("MATCH (a:Well)-[:TARGETS_FORMATION]-(f)-[:TARGETS_FORMATION]-(b:Well) RETURN a, b")
+    assert sorted((row["a"]["id"], row["b"]["id"]) for row in rows) == [("W1", "W2"), ("W2", "W1")]
+    assert graph.count("MATCH (a:Well)-[]-(f)-[]-(a)") == 0
+
+
+@pytest.mark.parametrize("text", ["MATCH (w:Well) RETURN f", "MATCH (w:Well) RETURN w.id"])
+def test_returning_an_unbound_variable_raises(text):
+    with pytest.raises(ValueError, match="only variables bound in the pattern"):
+        parse_pattern(text)
@@ -0,0 +1,58 @@
+from utils.graph_store import GraphStore
+from utils.kg_models import Field, KnowledgeGraphData, Relationship, Well
+
+
+def _wells(*depths, field_id="Troll Field") -> KnowledgeGraphData:
+    wells = [Well(id=f"W{i}", total_depth_m=depth) for i, depth in enumerate(depths)]
+    rels = [Relationship(source_id=well.id, source_type="Well", target_id=field_id, target_type="Field",
+                         relationship_type="IS_IN_FIELD") for well in wells]
+    return KnowledgeGraphData(nodes=[*wells, Field(id=field_id)], relationships=rels)
+
+
+def test_written_batches_round_trip_into_duckdb_aggregates(tmp_path):
+    store = GraphStore(tmp_path)
+    version = store.version()
+    with store.writer("test") as writer:
+        writer.write(_wells(1200.0, 1700.0, 2600.0))
+    assert store.version() != version
+    assert store.counts_by_type().set_index("type")["nodes"].to_dict() == {"Well": 3, "Field": 1}
+    assert store.wells_per_field().to_dict("records") == [{"field": "Troll_Field", "wells": 3}]
+    assert store.depth_distribution(bin_m=1000.0).to_dict("records") == [
+        {"depth_m": 1000.0, "wells": 2}, {"depth_m": 2000.0, "wells": 1},
+    ]
+    (run,) = store.ingest_throughput().to_dict("records")
+    assert (run["source"], run["nodes"], run["relationships"]) == ("test", 4, 3)
+
+
+def test_later_runs_win_and_compaction_keeps_the_latest_rows(tmp_path):
+    store = GraphStore(tmp_path, compact_parts=0)
+    for depth in (1000.0, 3000.0):
+        with store.writer("test") as writer:
+            writer.write(_wells(depth))
+    assert store.query("SELECT total_depth_m FROM nodes WHERE type = 'Well'")["total_depth_m"].tolist() == [3000.0]
+    assert store.part_count() == 2
+
+    assert store.compact()
+    assert store.part_count() == 1
+    assert not list(tmp_path.rglob("*.tmp"))
+    assert store.query("SELECT total_depth_m FROM node_rows WHERE type = 'Well'")["total_depth_m"].tolist() == [3000.0]
+    assert len(store.ingest_throughput()) == 2
+
+
+def test_writer_compacts_once_the_part_count_passes_the_limit(tmp_path):
+    store = GraphStore(tmp_path, compact_parts=3)
+    for run in range(4):
+        with store.writer("test") as writer:
+            writer.write(_wells(1000.0 + run))
+    assert store.part_count() == 1
+    assert store.query("SELECT count(*) AS n FROM ingests")["n"].item() == 4
+
+
+def test_compaction_backs_off_while_another_process_holds_the_lock(tmp_path):
+    store = GraphStore(tmp_path)
+    for _ in range(2):
+        with store.writer("test") as writer:
+            writer.write(_wells(1000.0))
+    (tmp_path / ".compact.lock").touch()
+    assert not store.compact()
+    assert store.part_count() == 2
@@ -0,0 +1,144 @@
+import sqlite3
+
+import pytest
+
+from benchmarks.memory_neo4j import MemoryDriver
+from utils.delta_sync import DeltaSyncer, SyncManifest, node_key, relationship_key
+from utils.ingest_jobs import DELTA, DONE, FAILED, UPLOAD, JobStore, JobWorker, job_writer, run_job
+from utils.kg_models import Formation, KnowledgeGraphData, Relationship, Well
+from utils.neo4j_uploader import Neo4jUploader
+
+TARGET = "bolt://test"
+GRAPH = "bolt://test/neo4j"
+
+
+def _graph(wells: int = 4) -> KnowledgeGraphData:
+    nodes = [Well(id=f"W{i}") for i in range(wells)] + [Formation(id="F1")]
+    relationships = [Relationship(source_id=f"W{i}", source_type="Well", target_id="F1", target_type="Formation",
+                                  relationship_type="TARGETS_FORMATION") for i in range(wells)]
+    return KnowledgeGraphData(nodes=nodes, relationships=relationships)
+
+
+class CrashingWriter:
+    """Delegates to writer, raising on the call after `after` successful ones."""
+
+    def __init__(self, writer, after: int):
+        self.writer, self.after = writer, after
+
+    def upload_kg_data(self, kg_data, **kwargs):
+        if self.after == 0:
+            raise ConnectionError("connection dropped")
+        self.after -= 1
+        return self.writer.upload_kg_data(kg_data, **kwargs)
+
+
+def test_failed_job_resumes_from_the_first_uncommitted_batch(tmp_path):
+    store, driver = JobStore(tmp_path / "jobs.sqlite"), MemoryDriver()
+    uploader = Neo4jUploader("memory://", "", "", driver=driver)
+    job_id = store.create(_graph(), target=TARGET, batch_size=2) # 3 node batches, 2 relationship batches
+
+    with pytest.raises(ConnectionError):
+        run_job(store, job_id, CrashingWriter(uploader, after=2))
+    job = store.get(job_id)
+    assert (job.status, job.committed_batches, job.total_batches) == (FAILED, 2, 5)
+    assert job.error == "connection dropped"
+    assert store.unfinished() == [job]
+
+    job = run_job(store, job_id, job_writer(job, uploader))
+    assert (job.status, job.committed_batches, job.nodes, job.relationships) == (DONE, 5, 5, 4)
+    assert len(driver.graph.nodes) == 5 and len(driver.graph.relationships) == 4
+    assert store.unfinished() == []
+
+
+def test_delta_job_resumes_through_its_manifest(tmp_path):
+    store, manifest = JobStore(tmp_path / "jobs.sqlite"), SyncManifest(tmp_path / "manifest.sqlite")
+    uploader = Neo4jUploader("memory://", "", "", driver=MemoryDriver())
+    kg_data = _graph()
+    job_id = store.create(kg_data, target=TARGET, batch_size=2, sync_graph=GRAPH)
+    job = store.get(job_id)
+    assert (job.writer, job.sync_graph) == (DELTA, GRAPH)
+    assert job_writer(store.get(store.create(kg_data, target=TARGET)), uploader) is uploader
+
+    with pytest.raises(ConnectionError):
+        run_job(store, job_id, CrashingWriter(job_writer(job, uploader, manifest), after=1))
+    writer = job_writer(store.get(job_id), uploader, manifest)
+    assert isinstance(writer, DeltaSyncer) and writer.graph == GRAPH
+    run_job(store, job_id, writer)
+
+    keys = [node_key(node) for node in kg_data.nodes] + [relationship_key(rel) for rel in kg_data.relationships]
+    assert set(manifest.hashes(GRAPH, keys)) == set(keys)
+    assert writer.stats.upload.relationships == 4
+
+
+def test_worker_calls_on_done_with_the_finished_job(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite")
+    worker = JobWorker(store)
+    uploader = Neo4jUploader("memory://", "", "", driver=MemoryDriver())
+    kg_data = _graph()
+    job_id = store.create(kg_data, target=TARGET, batch_size=3)
+    finished = []
+    try:
+        job = worker.submit(job_id, uploader, on_done=finished.append).result(timeout=10)
+    finally:
+        worker.shutdown()
+    assert job.finished and [done.job_id for done in finished] == [job_id]
+    loaded = store.load_graph(job_id)
+    assert [node.id for node in loaded.nodes] == [node.id for node in kg_data.nodes]
+    assert loaded.relationships == kg_data.relationships
+
+
+def test_job_file_without_writer_columns_is_migrated(tmp_path):
+    path = tmp_path / "jobs.sqlite"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, source TEXT NOT NULL, target TEXT NOT NULL,"
+                 " status TEXT NOT NULL, total_batches INTEGER NOT NULL, created_at REAL NOT NULL,"
+                 " updated_at REAL NOT NULL, error TEXT)")
+    conn.execute("INSERT INTO jobs VALUES ('old', 'cli', ?, 'failed', 0, 1.0, 1.0, NULL)", (TARGET,))
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path)
+    old = store.get("old")
+    assert (old.writer, old.sync_graph, old.batch_size) == (UPLOAD, None, None)
+
+
+class RecordingWriter:
+    def __init__(self, writer):
+        self.writer, self.batch_sizes = writer, []
+
+    def upload_kg_data(self, kg_data, **kwargs):
+        self.batch_sizes.append(kwargs.get("batch_size"))
+        return self.writer.upload_kg_data(kg_data, **kwargs)
+
+
+def test_resumed_job_keeps_its_batch_size(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite")
+    uploader = Neo4jUploader("memory://", "", "", driver=MemoryDriver())
+    job_id = store.create(_graph(), target=TARGET, batch_size=2)
+    assert store.get(job_id).batch_size == 2
+    with pytest.raises(ConnectionError):
+        run_job(store, job_id, CrashingWriter(uploader, after=1))
+    writer = RecordingWriter(uploader)
+    run_job(store, job_id, writer, workers=1)
+    assert writer.batch_sizes == [2, 2, 2, 2]
+
+
+class FakeLease:
+    def __init__(self, job_id, worker):
+        self.job_id, self.worker, self.released_while_active = job_id, worker, None
+
+    def release(self):
+        self.released_while_active = self.worker.is_active(self.job_id)
+
+
+def test_worker_holds_the_driver_lease_until_the_job_ends(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite")
+    worker = JobWorker(store)
+    uploader = Neo4jUploader("memory://", "", "", driver=MemoryDriver())
+    job_id = store.create(_graph(), target=TARGET)
+    lease = FakeLease(job_id, worker)
+    try:
+        worker.submit(job_id, CrashingWriter(uploader, after=0), lease=lease).exception(timeout=10)
+    finally:
+        worker.shutdown()
+    assert lease.released_while_active is False # released once, after the failed job left the worker
@@ -0,0 +1,59 @@
+from utils.kg_columnar import ColumnarGraphData
+from utils.kg_models import Field, Formation, KnowledgeGraphData, Relationship, Well
+
+
+def _graph() -> KnowledgeGraphData:
+    nodes = [
+        Well(id="33/9-A-12", total_depth_m=3000.0, attributes={"operator": "Equinor", "spud": {"year": 1998}}),
+        Well(id="33/9-A-13"),
+        Formation(id="Brent", geologic_age="Jurassic"),
+        Well(id="33/9-A-12", purpose="duplicate"), # the uploader MERGEs this into the first row
+    ]
+    relationships = [
+        Relationship(source_id="33/9-A-12", source_type="Well", target_id="Brent", target_type="Formation",
+                     relationship_type="TARGETS_FORMATION", properties={"confidence": 0.9}),
+        # Both endpoints are missing from the nodes: phantom rows keep them.
+        Relationship(source_id="33/9-A-13", source_type="Well", target_id="Statfjord", target_type="Field",
+                     relationship_type="IS_IN_FIELD"),
+        Relationship(source_id="PL037", source_type="License", target_id="Statfjord", target_type="Field",
+                     relationship_type="COVERS_FIELD"),
+    ]
+    return KnowledgeGraphData(nodes=nodes, relationships=relationships)
+
+
+def test_round_trip_gives_back_the_same_graph():
+    kg_data = _graph()
+    data = ColumnarGraphData.from_kg_data(kg_data)
+    assert data.to_kg_data().model_dump() == kg_data.model_dump()
+
+
+def test_phantom_endpoints_are_not_nodes():
+    data = ColumnarGraphData.from_kg_data(_graph())
+    assert (data.node_count(), data.relationship_count()) == (4, 3)
+    assert len(data.node_ids) == 6 # Statfjord and PL037 live after the real rows
+    assert data.type_counts() == {"Well": 3, "Formation": 1}
+    assert data.relationship_type_counts() == {"TARGETS_FORMATION": 1, "IS_IN_FIELD": 1, "COVERS_FIELD": 1}
+    covers = data.relationship(2)
+    assert (covers.source_type, covers.source_id, covers.target_type, covers.target_id) == (
+        "License", "PL037", "Field", "Statfjord")
+    assert data.page_nodes(4, 10) == []
+
+
+def test_pages_and_batches_rebuild_typed_models():
+    data = ColumnarGraphData.from_kg_data(_graph())
+    first = data.node(0)
+    assert isinstance(first, Well) and first.total_depth_m == 3000.0
+    assert first.attributes == {"operator": "Equinor", "spud": {"year": 1998}}
+    assert isinstance(data.node(2), Formation) and not hasattr(data.node(2), "total_depth_m")
+    assert data.relationship(0).properties == {"confidence": 0.9}
+
+    batches = list(data.iter_batches(3))
+    assert [(len(batch.nodes), len(batch.relationships)) for batch in batches] == [(3, 0), (1, 0), (0, 3)]
+    assert data.nbytes > 0
+
+
+def test_empty_graph():
+    data = ColumnarGraphData.from_kg_data(KnowledgeGraphData(nodes=[], relationships=[]))
+    assert (data.node_count(), data.relationship_count(), data.type_counts()) == (0, 0, {})
+    assert data.to_kg_data().model_dump() == {"nodes": [], "relationships": []}
+    assert list(data.iter_batches(10)) == []
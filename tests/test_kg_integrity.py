@@ -0,0 +1,55 @@
+import pytest
+
+from benchmarks.memory_neo4j import MemoryDriver
+from utils.kg_integrity import IntegrityIndex, check_integrity
+from utils.kg_models import Formation, KnowledgeGraphData, Relationship, Well
+from utils.neo4j_uploader import Neo4jUploader
+
+
+def _rel(source_id, target_id, target_type="Formation", **properties) -> Relationship:
+    return Relationship(source_id=source_id, source_type="Well", target_id=target_id, target_type=target_type,
+                        relationship_type="TARGETS_FORMATION", properties=properties)
+
+
+def _graph() -> KnowledgeGraphData:
+    return KnowledgeGraphData(
+        nodes=[Well(id="W1"), Formation(id="Brent")],
+        relationships=[
+            _rel("W1", "Brent", status="planned"),
+            _rel("W1", "Brent", status="reached"), # duplicate MERGE key
+            _rel("W1", "Ness"), # dangling
+            _rel("W1", "Brent", target_type="Field"), # mistyped: Brent is a Formation
+        ],
+    )
+
+
+def test_report_counts_dangling_mistyped_and_duplicates():
+    checked, report = check_integrity(_graph())
+    assert (len(report.dangling), len(report.mistyped), report.duplicate_relationships, report.dropped) == (1, 1, 1, 2)
+    assert report.mistyped[0].actual_types == ["Formation"]
+    assert len(checked.relationships) == 1
+    assert checked.relationships[0].properties == {"status": "reached"} # later properties win, as with SET +=
+    assert not report.ok
+
+
+def test_stubs_and_type_repair():
+    checked, report = check_integrity(_graph(), create_stubs=True, repair_types=True)
+    assert [(node.type, node.id, node.attributes) for node in report.stub_nodes] == [("Formation", "Ness", {"stub": True})]
+    assert (report.repaired, report.dropped) == (1, 0)
+    # The re-typed edge is the same MERGE key as the first two.
+    assert sorted(rel.target_id for rel in checked.relationships) == ["Brent", "Ness"]
+
+
+def test_index_grows_across_batches():
+    index = IntegrityIndex()
+    index.check(KnowledgeGraphData(nodes=[Well(id="W1"), Formation(id="Brent")], relationships=[]))
+    _, report = index.check(KnowledgeGraphData(nodes=[], relationships=[_rel("W1", "Brent")]))
+    assert report.ok and report.dropped == 0
+
+
+@pytest.mark.parametrize("options", [{"mode": "batch"}, {"mode": "row"}, {"mode": "batch", "workers": 3}])
+def test_upload_reports_relationships_neo4j_skipped(options):
+    kg_data = KnowledgeGraphData(nodes=[Well(id="W1"), Formation(id="Brent")],
+                                 relationships=[_rel("W1", "Brent"), _rel("W1", "Ness"), _rel("W9", "Brent")])
+    stats = Neo4jUploader("memory://", "", "", driver=MemoryDriver()).upload_kg_data(kg_data, **options)
+    assert (stats.nodes, stats.relationships, stats.skipped_relationships) == (2, 1, 2)
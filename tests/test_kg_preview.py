@@ -0,0 +1,66 @@
+import pytest
+
+from utils.kg_models import Field, KnowledgeGraphData, Relationship, Well
+from utils.kg_preview import NODES, RELATIONSHIPS, GraphPreview
+
+
+@pytest.fixture
+def preview() -> GraphPreview:
+    wells = [Well(id=f"W{i:03d}", purpose="production" if i % 3 else "injection",
+                  attributes={"operator": "Equinor"} if i == 7 else {}) for i in range(120)]
+    rels = [Relationship(source_id=well.id, source_type="Well", target_id="Troll", target_type="Field",
+                         relationship_type="IS_IN_FIELD") for well in wells]
+    # An endpoint that isn't a node shows up in the relationship table only.
+    rels.append(Relationship(source_id="W000", source_type="Well", target_id="Oseberg", target_type="Field",
+                             relationship_type="IS_IN_FIELD"))
+    return GraphPreview.from_kg_data(KnowledgeGraphData(nodes=[*wells, Field(id="Troll")], relationships=rels))
+
+
+def test_summary_counts_real_rows_per_type(preview):
+    assert preview.summary() == {NODES: {"Well": 120, "Field": 1}, RELATIONSHIPS: {"IS_IN_FIELD": 121}}
+
+
+def test_pages_cover_every_row_once(preview):
+    ids = []
+    for page in range(3):
+        frame, total, rows = preview.page(NODES, "Well", page=page, page_size=50)
+        assert total == 120 and len(frame) == len(rows)
+        ids += frame["id"].tolist()
+    assert ids == [f"W{i:03d}" for i in range(120)]
+
+
+def test_pages_past_the_end_and_negative_pages(preview):
+    frame, total, rows = preview.page(NODES, "Well", page=5, page_size=50)
+    assert (len(frame), total, len(rows)) == (0, 120, 0)
+    first, _, _ = preview.page(NODES, "Well", page=-1, page_size=50)
+    assert first["id"].iloc[0] == "W000"
+
+
+def test_search_is_case_insensitive_and_pages_the_matches(preview):
+    assert preview.count(NODES, "Well", search="INJECTION") == 40
+    frame, total, rows = preview.page(NODES, "Well", page=1, page_size=30, search=" injection ")
+    assert (total, len(frame)) == (40, 10)
+    assert set(frame["purpose"]) == {"injection"}
+    assert [model.id for model in preview.models(NODES, "Well", rows)] == frame["id"].tolist()
+
+
+def test_search_matches_attributes_and_relationship_endpoints(preview):
+    frame, total, _ = preview.page(NODES, "Well", search="equinor")
+    assert (total, frame["id"].tolist(), frame["operator"].tolist()) == (1, ["W007"], ["Equinor"])
+    frame, total, rows = preview.page(RELATIONSHIPS, "IS_IN_FIELD", search="oseberg")
+    assert (total, frame["source_id"].tolist()) == (1, ["W000"])
+    (rel,) = preview.models(RELATIONSHIPS, "IS_IN_FIELD", rows)
+    assert rel.target_id == "Oseberg"
+
+
+def test_no_match_and_blank_search(preview):
+    frame, total, rows = preview.page(NODES, "Well", search="nothing like this")
+    assert (len(frame), total, len(rows)) == (0, 0, 0)
+    assert preview.count(NODES, "Well", search="   ") == 120
+
+
+def test_sparse_columns_are_dropped_from_pages_without_values(preview):
+    frame, _, _ = preview.page(NODES, "Well", page=1, page_size=50)
+    assert "operator" not in frame.columns
+    frame, _, _ = preview.page(NODES, "Well", page=0, page_size=50)
+    assert frame["operator"].notna().sum() == 1
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.memory_neo4j import MemoryDriver
+from utils.kg_stream import stream_ingest
+from utils.neo4j_uploader import Neo4jUploader
+
+RECORDS = [
+    {"kind": "node", "id": "W1", "type": "Well", "attributes": {"total_depth_m": 2500}},
+    {"kind": "node", "id": "F1", "type": "Formation", "attributes": {}},
+    {"kind": "node", "id": "bad", "type": "Well", "attributes": {"total_depth_m": "deep"}},
+    {"kind": "relationship", "source_id": "W1", "source_type": "Well", "target_id": "F1",
+     "target_type": "Formation", "relationship_type": "TARGETS_FORMATION"},
+]
+
+
+class _FailingUploader:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def upload_kg_data(self, kg_data, **kwargs):
+        time.sleep(self.delay) # lets the producer read everything and fill the queue first
+        raise RuntimeError("connection lost")
+
+
+def _run_with_deadline(target, seconds: float = 10.0):
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = target()
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), "stream_ingest hung"
+    return outcome
+
+
+def test_stream_ingest_uploads_valid_records_and_skips_invalid_ones():
+    driver = MemoryDriver()
+    stats = stream_ingest(RECORDS, uploader=Neo4jUploader("memory://", "", "", driver=driver), batch_size=2)
+    assert (stats.records, stats.nodes, stats.relationships, stats.invalid) == (4, 2, 1, 1)
+    assert stats.upload.relationships == 1
+    assert ("Well", "W1") in driver.graph.nodes
+
+
+def test_failing_upload_with_a_full_queue_raises_instead_of_hanging():
+    # Two one-node batches: the consumer holds the first, the second fills the queue, and the
+    # producer, done reading, still has to hand over the end marker.
+    outcome = _run_with_deadline(lambda: stream_ingest(
+        RECORDS[:2], uploader=_FailingUploader(delay=0.3), batch_size=1, max_pending_batches=1,
+    ))
+    with pytest.raises(RuntimeError, match="connection lost"):
+        raise outcome["error"]
+
+
+def test_invalid_record_error_reaches_the_consumer():
+    outcome = _run_with_deadline(lambda: stream_ingest(RECORDS, batch_size=1, max_pending_batches=1, on_invalid="raise"))
+    assert type(outcome["error"]).__name__ == "ValidationError"
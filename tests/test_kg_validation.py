@@ -0,0 +1,56 @@
+import copy
+
+import pytest
+from pydantic import ValidationError
+
+from utils.kg_models import BaseNode, Relationship, Well
+from utils.kg_validation import KGValidator
+
+
+PAYLOAD = {
+    "nodes": [
+        {"id": "33/9-A-12", "type": "Well", "attributes": {"total_depth_m": 3100.5, "operator_note": "sidetracked"}},
+        {"id": "Brent Formation", "type": "Formation", "attributes": {}},
+        {"id": "Seismic survey ST0103", "type": "Survey", "attributes": {"year": 2001}},
+    ],
+    "relationships": [
+        {"source_id": "33/9-A-12", "source_type": "Well", "target_id": "Brent Formation",
+         "target_type": "Formation", "relationship_type": "TARGETS_FORMATION"},
+    ],
+}
+
+
+def test_specific_fields_are_lifted_out_of_attributes():
+    kg_data = KGValidator().validate(PAYLOAD)
+    well = kg_data.nodes[0]
+    assert isinstance(well, Well)
+    assert well.id == "33_9-A-12"
+    assert well.total_depth_m == 3100.5
+    assert well.attributes == {"operator_note": "sidetracked"}
+    assert type(kg_data.nodes[2]) is BaseNode and kg_data.nodes[2].type == "Survey"
+    assert isinstance(kg_data.relationships[0], Relationship)
+
+
+def test_validation_does_not_mutate_the_payload():
+    payload = copy.deepcopy(PAYLOAD)
+    validator = KGValidator()
+    first = validator.validate(payload)
+    assert payload == PAYLOAD
+    assert validator.validate(payload).nodes[0] == first.nodes[0]
+
+
+def test_revalidating_model_instances_keeps_typed_fields():
+    well = Well(id="33/9-A-12", total_depth_m=3000.0, water_depth_m=145.0, attributes={"note": "x"})
+    for fast in (False, True):
+        kg_data = KGValidator().validate({"nodes": [well], "relationships": []}, fast=fast)
+        assert kg_data.nodes[0] == well
+
+
+def test_top_level_fields_in_dicts_are_kept():
+    node = KGValidator().validate_node({"id": "W1", "type": "Well", "total_depth_m": 2500, "attributes": {}})
+    assert node.total_depth_m == 2500.0
+
+
+def test_invalid_payload_raises():
+    with pytest.raises(ValidationError):
+        KGValidator().validate({"nodes": [{"id": "W1", "type": "Well", "attributes": {"total_depth_m": "deep"}}]})
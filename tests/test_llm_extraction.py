@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+
+from utils import llm_extraction
+from utils.extraction_cache import ExtractionCache
+from utils.llm_extraction import FakeLLMClient, LLMClientError, LLMExtractor, TokenBucket, extract_kg, pack_chunks
+
+PAYLOAD = {"nodes": [{"id": "33/9-A-12", "type": "Well", "attributes": {"total_depth_m": 3000.0}}], "relationships": []}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_extraction.random, "uniform", lambda low, high: 0.0)
+
+
+def _failing(times: int, status_code: int):
+    calls = []
+
+    def respond(user):
+        calls.append(user)
+        if len(calls) <= times:
+            raise LLMClientError("overloaded", status_code=status_code)
+        return PAYLOAD
+    return respond
+
+
+def test_retryable_status_is_retried_until_it_succeeds():
+    client = FakeLLMClient(_failing(2, 503))
+    kg_data, (result,), stats = extract_kg(["Well 33/9-A-12 reached 3000 m."], client=client, max_retries=3)
+    assert (result.attempts, result.error, client.calls) == (3, None, 3)
+    assert (stats.requests, stats.retries, stats.failed) == (1, 2, 0)
+    assert kg_data.nodes[0].total_depth_m == 3000.0
+
+
+def test_non_retryable_status_fails_without_retrying():
+    client = FakeLLMClient(_failing(1, 400))
+    kg_data, (result,), stats = extract_kg(["text"], client=client, max_retries=3)
+    assert (result.attempts, client.calls, stats.retries, stats.failed) == (1, 1, 0, 1)
+    assert result.kg_data is None and result.error == "LLMClientError: overloaded"
+    assert kg_data.nodes == []
+
+
+def test_slow_requests_time_out_and_count_as_retries():
+    client = FakeLLMClient(PAYLOAD, latency=1.0)
+    _, (result,), stats = extract_kg(["text"], client=client, timeout=0.05, max_retries=1)
+    assert (result.attempts, client.calls, stats.retries, stats.failed) == (2, 2, 1, 1)
+    assert result.error == "TimeoutError"
+
+
+def test_cached_responses_are_reused(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite")
+    client = FakeLLMClient(PAYLOAD)
+    extract_kg(["first", "second"], client=client, cache=cache)
+    _, results, stats = extract_kg(["first", "second", "third"], client=client, cache=cache)
+    assert client.calls == 3
+    assert [result.cached for result in results] == [True, True, False]
+    assert stats.cached == 2
+
+
+def test_resolved_chunks_skip_the_llm_and_keep_input_order():
+    client = FakeLLMClient(PAYLOAD)
+    chunks = [("Well 33/9-A-12 targets the Brent Formation.", "ruled"), ("The field was shut in.", "llm")]
+    _, results, stats = extract_kg(chunks, client=client, skip_resolved=True)
+    assert [(result.chunk_ids, result.rule_based) for result in results] == [(["ruled"], True), (["llm"], False)]
+    assert (client.calls, stats.rule_resolved, stats.chunks) == (1, 1, 2)
+    assert [rel.relationship_type for rel in results[0].kg_data.relationships] == ["TARGETS_FORMATION"]
+
+
+def test_concurrency_limit_is_respected():
+    in_flight, peak = 0, 0
+
+    class CountingClient(FakeLLMClient):
+        async def complete(self, system, user):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                return await super().complete(system, user)
+            finally:
+                in_flight -= 1
+
+    extractor = LLMExtractor(CountingClient(PAYLOAD, latency=0.02), max_concurrency=3, requests_per_sec=0)
+    asyncio.run(extractor.extract([f"chunk {i}" for i in range(12)]))
+    assert peak == 3
+
+
+def test_token_bucket_limits_the_request_rate():
+    async def acquire_all(bucket, count):
+        for _ in range(count):
+            await bucket.acquire()
+
+    start = time.perf_counter()
+    asyncio.run(acquire_all(TokenBucket(rate=50.0, capacity=1.0), 6))
+    assert time.perf_counter() - start >= 5 / 50.0 * 0.9
+
+
+def test_pack_chunks_respects_the_character_budget():
+    chunks = [("a" * 40, 0), ("b" * 40, 1), ("c" * 40, 2)]
+    assert [[chunk_id for _, chunk_id in group] for group in pack_chunks(chunks, max_chars=100)] == [[0, 1], [2]]
+    assert len(pack_chunks(chunks)) == 3
@@ -0,0 +1,68 @@
+import json
+import urllib.request
+
+from utils.metrics import MetricsRegistry, start_metrics_server
+
+
+def _registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.inc("batches_total", 2, kind="nodes")
+    registry.inc("batches_total", kind="relationships")
+    registry.inc("cache_lookups_total", result='say "hi"\\')
+    registry.observe("neo4j_batch_seconds", 0.5, kind="nodes")
+    registry.observe("neo4j_batch_seconds", 1.5, kind="nodes")
+    registry.observe("validate_seconds", 3.0, count=3)
+    return registry
+
+
+def test_prometheus_text_format():
+    assert _registry().to_prometheus().splitlines() == [
+        "# TYPE kg_batches_total counter",
+        'kg_batches_total{kind="nodes"} 2',
+        'kg_batches_total{kind="relationships"} 1',
+        "# TYPE kg_cache_lookups_total counter",
+        'kg_cache_lookups_total{result="say \\"hi\\"\\\\"} 1',
+        "# TYPE kg_neo4j_batch_seconds summary",
+        'kg_neo4j_batch_seconds{kind="nodes",quantile="0.5"} 0.500000',
+        'kg_neo4j_batch_seconds{kind="nodes",quantile="0.95"} 1.500000',
+        'kg_neo4j_batch_seconds_sum{kind="nodes"} 2.000000',
+        'kg_neo4j_batch_seconds_count{kind="nodes"} 2',
+        "# TYPE kg_validate_seconds summary",
+        'kg_validate_seconds{quantile="0.5"} 1.000000',
+        'kg_validate_seconds{quantile="0.95"} 1.000000',
+        "kg_validate_seconds_sum 3.000000",
+        "kg_validate_seconds_count 3",
+    ]
+
+
+def test_empty_and_disabled_registries_export_nothing():
+    assert MetricsRegistry().to_prometheus() == "\n"
+    disabled = MetricsRegistry(enabled=False)
+    disabled.inc("batches_total")
+    disabled.observe("validate_seconds", 1.0)
+    assert disabled.to_prometheus() == "\n"
+
+
+def test_timed_iter_counts_items_and_snapshots_to_jsonl(tmp_path):
+    registry = MetricsRegistry()
+    assert list(registry.timed_iter(range(4), "parse_seconds", stage="pdf")) == [0, 1, 2, 3]
+    path = tmp_path / "metrics.jsonl"
+    registry.write_jsonl(path)
+    registry.write_jsonl(path)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 2
+    (timer,) = lines[0]["timers"]
+    assert (timer["name"], timer["labels"], timer["count"]) == ("parse_seconds", {"stage": "pdf"}, 4)
+
+
+def test_metrics_server_serves_the_registry():
+    registry = _registry()
+    server = start_metrics_server(port=0, registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read().decode("utf-8") == registry.to_prometheus()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,109 @@
+import time
+
+from neo4j.exceptions import TransientError
+
+from benchmarks.memory_neo4j import MemoryDriver
+from utils import neo4j_uploader
+from utils.kg_models import BaseNode, KnowledgeGraphData, Relationship
+from utils.neo4j_uploader import (DriverRegistry, Neo4jUploader, group_relationships_by_pattern, relationship_rounds,
+                                  write_with_retry)
+
+
+def _graph(nodes: int = 60, relationships: int = 200) -> KnowledgeGraphData:
+    node_list = [BaseNode(id=f"n{i}", type="Entity") for i in range(nodes)]
+    rel_list = [
+        Relationship(source_id=f"n{i % nodes}", source_type="Entity", target_id=f"n{(i * 7 + 3) % nodes}",
+                     target_type="Entity", relationship_type="RELATED_TO")
+        for i in range(relationships)
+    ]
+    return KnowledgeGraphData(nodes=node_list, relationships=rel_list)
+
+
+def test_relationship_rounds_never_share_a_node_within_a_round():
+    kg_data = _graph()
+    rounds = relationship_rounds(group_relationships_by_pattern(kg_data.relationships), workers=4, batch_size=7)
+    placed = 0
+    for buckets in rounds:
+        seen = set()
+        for bucket in buckets:
+            ids = {row[key] for _, batch in bucket for row in batch for key in ("source_id", "target_id")}
+            assert not ids & seen
+            seen |= ids
+            placed += sum(len(batch) for _, batch in bucket)
+    assert placed == len(kg_data.relationships)
+
+
+def test_parallel_upload_writes_everything_and_counts_skipped():
+    kg_data = _graph()
+    kg_data.relationships.append(Relationship(source_id="n1", source_type="Entity", target_id="missing",
+                                              target_type="Entity", relationship_type="RELATED_TO"))
+    driver = MemoryDriver()
+    stats = Neo4jUploader("memory://", "", "", driver=driver).upload_kg_data(kg_data, batch_size=16, workers=4)
+    assert stats.nodes == 60
+    assert stats.skipped_relationships == 1
+    assert stats.relationships == len(kg_data.relationships) - 1
+    assert {key[1] for key in driver.graph.relationships} == {f"n{i}" for i in range(60)}
+
+
+class _FlakySession:
+    # Fails the first transaction with a deadlock; execute_write must not be used (the driver would retry too).
+    def __init__(self):
+        self.attempts = 0
+
+    def begin_transaction(self):
+        self.attempts += 1
+        if self.attempts == 1:
+            raise TransientError("Deadlock detected")
+        return MemoryDriver().session().begin_transaction()
+
+    def execute_write(self, *args, **kwargs):
+        raise AssertionError("write_with_retry must be the only retry layer")
+
+
+def test_write_with_retry_retries_transient_errors_once_per_attempt():
+    session = _FlakySession()
+    assert write_with_retry(session, lambda tx: "ok", base_delay=0) == "ok"
+    assert session.attempts == 2
+
+
+class _FakeDriver(MemoryDriver):
+    def __init__(self, pool_size: int):
+        super().__init__()
+        self.pool_size = pool_size
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_driver_registry_retires_a_replaced_driver_after_its_last_lease(monkeypatch):
+    monkeypatch.setattr(neo4j_uploader.GraphDatabase, "driver",
+                        lambda uri, max_connection_pool_size, **kwargs: _FakeDriver(max_connection_pool_size))
+    registry = DriverRegistry()
+    running = registry.lease("bolt://db", "neo4j", "secret", max_pool_size=10)
+    with registry.lease("bolt://db", "neo4j", "secret", max_pool_size=10) as again:
+        assert again.driver is running.driver
+    replacement = registry.lease("bolt://db", "neo4j", "secret", max_pool_size=20)
+    assert replacement.driver.pool_size == 20
+    assert not running.driver.closed # an upload still holds it
+    running.release()
+    running.release()
+    assert running.driver.closed and not replacement.driver.closed
+    replacement.release()
+    registry.close_all()
+    assert replacement.driver.closed
+
+
+def test_driver_registry_never_closes_a_leased_driver_as_idle(monkeypatch):
+    monkeypatch.setattr(neo4j_uploader.GraphDatabase, "driver",
+                        lambda uri, max_connection_pool_size, **kwargs: _FakeDriver(max_connection_pool_size))
+    registry = DriverRegistry(idle_timeout=0.0)
+    job = registry.lease("bolt://db", "neo4j", "secret")
+    time.sleep(0.01)
+    assert registry.close_idle() == 0
+    with registry.lease("bolt://other", "neo4j", "secret"): # another session's lookup
+        assert not job.driver.closed
+    job.release()
+    time.sleep(0.01)
+    assert registry.close_idle() == 2
+    assert job.driver.closed
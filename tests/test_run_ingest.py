@@ -0,0 +1,74 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import run_ingest
+
+
+def test_module_import_stays_light():
+    code = "import sys, run_ingest; print(sorted(m for m in ('neo4j', 'pydantic', 'spacy', 'pandas', 'streamlit') if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=Path(run_ingest.__file__).parent).stdout
+    assert output.strip() == "[]"
+
+
+def test_dry_run_validates_a_directory(tmp_path, capsys):
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "graph.json").write_text(json.dumps({
+        "nodes": [{"id": "W1", "type": "Well", "attributes": {}}, {"id": "F1", "type": "Formation", "attributes": {}}],
+        "relationships": [{"source_id": "W1", "source_type": "Well", "target_id": "F1", "target_type": "Formation",
+                           "relationship_type": "TARGETS_FORMATION"}],
+    }))
+    code = run_ingest.main([str(tmp_path / "in"), "--dry-run", "--no-store", "--cache-dir", str(tmp_path / "cache")])
+    assert code == 0
+    assert "2 nodes, 1 relationships, 0 invalid records" in capsys.readouterr().out
+
+
+def test_resume_jobs_rebuilds_the_delta_writer_and_stores_the_graph(tmp_path, capsys):
+    from benchmarks.memory_neo4j import MemoryDriver
+    from utils.delta_sync import SyncManifest, node_key
+    from utils.ingest_jobs import JobStore
+    from utils.kg_models import KnowledgeGraphData, Well
+    from utils.neo4j_uploader import Neo4jUploader
+
+    cache = tmp_path / "cache"
+    args = run_ingest.parse_args(["--resume-jobs", "--uri", "bolt://test", "--cache-dir", str(cache)])
+    run_ingest.resolve_defaults(args)
+    store = JobStore(cache / "ingest_jobs.sqlite")
+    job_id = store.create(KnowledgeGraphData(nodes=[Well(id="W1")], relationships=[]), source="streamlit", target=args.uri,
+                          sync_graph="bolt://test/neo4j")
+    store.close()
+
+    driver = MemoryDriver()
+    assert run_ingest.resume_jobs(args, Neo4jUploader(args.uri, "", "", driver=driver)) == 0
+    assert f"Job {job_id} (streamlit, delta)" in capsys.readouterr().out
+    assert len(driver.graph.nodes) == 1
+    manifest = SyncManifest(cache / "sync_manifest.sqlite")
+    assert list(manifest.hashes("bolt://test/neo4j", [node_key(Well(id="W1"))])) == [node_key(Well(id="W1"))]
+    assert list((cache / "graph_store" / "nodes").glob("*.parquet"))
+
+
+def test_resolve_merges_duplicate_licences_before_upload(tmp_path, capsys):
+    (tmp_path / "in").mkdir()
+    records = [
+        {"id": "PL037", "type": "License", "attributes": {}},
+        {"id": "PL 037", "type": "License", "attributes": {"awarded_date": "1975-01-01"}},
+        {"id": "Equinor ASA", "type": "Company", "attributes": {}},
+        *({"source_id": licence, "source_type": "License", "target_id": "Equinor ASA", "target_type": "Company",
+           "relationship_type": "OPERATED_BY"} for licence in ("PL037", "PL 037")),
+        {"kind": "relationship", "source_id": "PL037"}, # invalid: still counted
+    ]
+    (tmp_path / "in" / "graph.ndjson").write_text("\n".join(json.dumps(record) for record in records))
+    code = run_ingest.main([str(tmp_path / "in"), "--dry-run", "--resolve", "--no-store", "--cache-dir", str(tmp_path / "cache")])
+    output = capsys.readouterr().out
+    assert code == 0
+    assert "2 nodes, 1 relationships, 1 invalid" in output
+    assert "entity resolution merged 1 nodes into 2 entities, 1 duplicate relationships collapsed" in output
+
+
+def test_dry_run_leaves_the_graph_store_alone(tmp_path):
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "graph.json").write_text(json.dumps({"nodes": [{"id": "W1", "type": "Well"}], "relationships": []}))
+    assert run_ingest.main([str(tmp_path / "in"), "--dry-run", "--cache-dir", str(tmp_path / "cache")]) == 0
+    assert not (tmp_path / "cache" / "graph_store").exists()
@@ -0,0 +1,382 @@
+# utils/admin_export.py
+# Offline bulk export for first-time loads: writes the CSV files `neo4j-admin database import full`
+# reads, instead of sending MERGE transactions. Building a fresh graph becomes file generation
+# plus one offline import, which is orders of magnitude faster than Neo4jUploader for full loads.
+#
+# Layout under out_dir/:
+#   nodes/<Label>-<n>.csv.gz                       one id space per label (id:ID(Label))
+#   relationships/<TYPE>-<Source>-<Target>-<n>.csv.gz  :START_ID(Source), :END_ID(Target)
+#   import.sh                                      the neo4j-admin command for every part
+#   schema.cypher                                  id constraints to create after the import
+#
+# Every part carries its own header row. When a batch brings a property the current part has no
+# column for (or a value that doesn't fit the column's type), the part is closed and a new one is
+# started with the wider header, so output can be streamed without knowing all properties upfront.
+#
+# AdminImportExporter has upload_kg_data(), so stream_ingest / kg-ingest can write through it
+# exactly like through a Neo4jUploader. verify_export() checks the files without a database.
+import csv
+import gzip
+import hashlib
+import json
+import re
+import shlex
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from utils import metrics
+from utils.kg_models import KnowledgeGraphData
+from utils.neo4j_uploader import UploadStats, node_properties, relationship_properties
+
+ARRAY_DELIMITER = ";"
+DEFAULT_COMPRESSLEVEL = 1 # the files are transient; favour throughput over size
+
+_SCALAR_TYPES = {bool: "boolean", int: "long", float: "double", str: "string"}
+# Type a column can be widened to when a value doesn't fit; anything else falls back to string.
+_WIDENS = {("long", "double"): "double", ("long[]", "double[]"): "double[]"}
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_]+")
+# Labels and relationship types end up in import.sh, schema.cypher and the CSV headers unquoted.
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def value_type(value: Any) -> str:
+    """neo4j-admin header type for a property value (lists of one scalar type become arrays)."""
+    if type(value) in _SCALAR_TYPES:
+        return _SCALAR_TYPES[type(value)]
+    if isinstance(value, (list, tuple)) and value:
+        element_types = {value_type(v) for v in value}
+        if element_types <= {"long", "double"} and "double" in element_types:
+            return "double[]"
+        if len(element_types) == 1 and not next(iter(element_types)).endswith("[]"):
+            return next(iter(element_types)) + "[]"
+    return "string" # dicts, empty or mixed lists: stored as JSON text
+
+def merge_types(current: str, new: str) -> str:
+    if current == new or (current, new) in (("double", "long"), ("double[]", "long[]")):
+        return current
+    return _WIDENS.get((current, new), "string")
+
+def format_value(value: Any, column_type: str) -> Any:
+    if value is None:
+        return ""
+    if column_type == "boolean":
+        return "true" if value else "false"
+    if column_type.endswith("[]"):
+        return ARRAY_DELIMITER.join(format_value(v, column_type[:-2]) for v in value)
+    if column_type == "string" and not isinstance(value, str):
+        return json.dumps(value, default=str)
+    return str(value) if column_type != "string" else value
+
+
+class _Part:
+    """One open CSV part: a fixed header, streamed rows."""
+
+    def __init__(self, path: Path, header: List[str], compresslevel: Optional[int]):
+        self.path = path
+        self.rows = 0
+        self._raw = gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=compresslevel) \
+            if compresslevel is not None else open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._raw)
+        self._writer.writerow(header)
+
+    def write(self, row: List[Any]):
+        self._writer.writerow(row)
+        self.rows += 1
+
+    def close(self):
+        self._raw.close()
+
+
+class _PartGroup:
+    """All parts for one node label or relationship pattern; rolls to a new part when the schema grows."""
+
+    def __init__(self, directory: Path, stem: str, key_columns: List[str], compresslevel: Optional[int]):
+        self.directory = directory
+        self.stem = stem
+        self.key_columns = key_columns
+        self.compresslevel = compresslevel
+        self.columns: Dict[str, str] = {} # property -> neo4j-admin type, in header order
+        self.paths: List[Path] = []
+        self._part: Optional[_Part] = None
+
+    def write(self, rows: List[Tuple[List[Any], Dict[str, Any]]]):
+        # rows: (key column values, properties). The header is widened once per batch, not per row.
+        changed = False
+        for _, props in rows:
+            for name, value in props.items():
+                current = self.columns.get(name)
+                merged = value_type(value) if current is None else merge_types(current, value_type(value))
+                if merged != current:
+                    self.columns[name] = merged
+                    changed = True
+        if changed or self._part is None:
+            self._roll()
+        columns = list(self.columns.items())
+        for key_values, props in rows:
+            self._part.write(key_values + [format_value(props.get(name), kind) for name, kind in columns])
+
+    def _roll(self):
+        if self._part is not None:
+            self._part.close()
+        suffix = ".csv.gz" if self.compresslevel is not None else ".csv"
+        path = self.directory / f"{self.stem}-{len(self.paths):05d}{suffix}"
+        header = self.key_columns + [f"{name}:{kind}" for name, kind in self.columns.items()]
+        self._part = _Part(path, header, self.compresslevel)
+        self.paths.append(path)
+
+    def close(self):
+        if self._part is not None:
+            self._part.close()
+            self._part = None
+
+
+@dataclass
+class ExportStats:
+    nodes: int = 0
+    relationships: int = 0
+    duplicate_nodes: int = 0
+    duplicate_relationships: int = 0
+    seconds: float = 0.0
+    files: List[Path] = field(default_factory=list)
+
+    @property
+    def bytes_written(self) -> int:
+        return sum(path.stat().st_size for path in self.files if path.exists())
+
+
+def _file_stem(*parts: str) -> str:
+    return "-".join(_SAFE_NAME_RE.sub("_", part) for part in parts)
+
+def _identifier(name: str, kind: str) -> str:
+    if not _IDENTIFIER_RE.match(name):
+        raise ValueError(f"{kind} {name!r} can't be exported: use letters, digits and underscores only.")
+    return name
+
+
+class AdminImportExporter:
+    """Streams KnowledgeGraphData batches into neo4j-admin import CSVs under out_dir.
+
+    Node ids are deduplicated per label (the first occurrence's properties win, unlike MERGE's
+    SET +=). Relationships are written as they come; dedupe_relationships=True also drops repeats
+    of a MERGE key, at ~50 bytes of memory per relationship (several GB at 50M relationships).
+    Labels and relationship types must be plain identifiers; anything else raises ValueError.
+    """
+
+    def __init__(self, out_dir: Union[str, Path], compresslevel: Optional[int] = DEFAULT_COMPRESSLEVEL,
+                 dedupe_relationships: bool = False):
+        self.out_dir = Path(out_dir)
+        (self.out_dir / "nodes").mkdir(parents=True, exist_ok=True)
+        (self.out_dir / "relationships").mkdir(parents=True, exist_ok=True)
+        self.compresslevel = compresslevel
+        self.dedupe_relationships = dedupe_relationships
+        self.stats = ExportStats()
+        self._node_groups: Dict[str, _PartGroup] = {}
+        self._relationship_groups: Dict[Tuple[str, str, str], _PartGroup] = {}
+        self._seen_nodes: Dict[str, Set[str]] = {}
+        self._seen_relationships: Set[bytes] = set()
+        self._lock = threading.Lock() # kg-ingest --jobs writes from several threads
+        self._closed = False
+
+    def upload_kg_data(self, kg_data: KnowledgeGraphData, **_ignored) -> UploadStats:
+        """Same signature as Neo4jUploader.upload_kg_data; batching/worker options don't apply."""
+        node_rows: Dict[str, List[Tuple[List[Any], Dict[str, Any]]]] = {}
+        relationship_rows: Dict[Tuple[str, str, str], List[Tuple[List[Any], Dict[str, Any]]]] = {}
+        start = time.perf_counter()
+        with self._lock:
+            # Checked before anything is written or marked as seen, so a rejected batch leaves no trace.
+            for node in kg_data.nodes:
+                if node.type not in self._seen_nodes:
+                    _identifier(node.type, "Label")
+            for rel in kg_data.relationships:
+                if (rel.relationship_type, rel.source_type, rel.target_type) not in self._relationship_groups:
+                    _identifier(rel.relationship_type, "Relationship type")
+                    _identifier(rel.source_type, "Label")
+                    _identifier(rel.target_type, "Label")
+            for node in kg_data.nodes:
+                seen = self._seen_nodes.setdefault(node.type, set())
+                if node.id in seen:
+                    self.stats.duplicate_nodes += 1
+                    continue
+                seen.add(node.id)
+                node_rows.setdefault(node.type, []).append(([node.id], node_properties(node)))
+            for rel in kg_data.relationships:
+                if self.dedupe_relationships:
+                    digest = hashlib.blake2b("\x1f".join((rel.source_type, rel.source_id, rel.relationship_type,
+                                                          rel.target_type, rel.target_id)).encode("utf-8"),
+                                             digest_size=8).digest()
+                    if digest in self._seen_relationships:
+                        self.stats.duplicate_relationships += 1
+                        continue
+                    self._seen_relationships.add(digest)
+                key = (rel.relationship_type, rel.source_type, rel.target_type)
+                relationship_rows.setdefault(key, []).append(([rel.source_id, rel.target_id], relationship_properties(rel)))
+
+            for label, rows in node_rows.items():
+                group = self._node_groups.get(label)
+                if group is None:
+                    group = self._node_groups[label] = _PartGroup(
+                        self.out_dir / "nodes", _file_stem(label), [f"id:ID({label})"], self.compresslevel)
+                group.write(rows)
+            nodes_seconds = time.perf_counter() - start
+            for (rel_type, source_type, target_type), rows in relationship_rows.items():
+                key = (rel_type, source_type, target_type)
+                group = self._relationship_groups.get(key)
+                if group is None:
+                    group = self._relationship_groups[key] = _PartGroup(
+                        self.out_dir / "relationships", _file_stem(rel_type, source_type, target_type),
+                        [f":START_ID({source_type})", f":END_ID({target_type})"], self.compresslevel)
+                group.write(rows)
+            nodes = sum(len(rows) for rows in node_rows.values())
+            relationships = sum(len(rows) for rows in relationship_rows.values())
+            self.stats.nodes += nodes
+            self.stats.relationships += relationships
+        stats = UploadStats(nodes=nodes, relationships=relationships, nodes_seconds=nodes_seconds,
+                            relationships_seconds=time.perf_counter() - start - nodes_seconds)
+        self.stats.seconds += stats.nodes_seconds + stats.relationships_seconds
+        metrics.inc("admin_export_nodes_total", nodes)
+        metrics.inc("admin_export_relationships_total", relationships)
+        metrics.observe("admin_export_batch_seconds", stats.nodes_seconds + stats.relationships_seconds)
+        return stats
+
+    def close(self, database: str = "neo4j") -> ExportStats:
+        """Finish every part and write import.sh and schema.cypher next to them."""
+        with self._lock:
+            if self._closed:
+                return self.stats
+            self._closed = True
+            for group in list(self._node_groups.values()) + list(self._relationship_groups.values()):
+                group.close()
+            self.stats.files = [path for group in self._node_groups.values() for path in group.paths] + \
+                               [path for group in self._relationship_groups.values() for path in group.paths]
+            script = self.out_dir / "import.sh"
+            script.write_text(import_script(self._import_args(), database))
+            script.chmod(0o755)
+            (self.out_dir / "schema.cypher").write_text("".join(
+                f"CREATE CONSTRAINT {label.lower()}_id_unique IF NOT EXISTS FOR (n:{label}) REQUIRE n.id IS UNIQUE;\n"
+                for label in sorted(self._node_groups)
+            ))
+        return self.stats
+
+    def _import_args(self) -> List[str]:
+        # Each part is its own group because neo4j-admin reads the header from a group's first file only.
+        args = [f"--nodes={label}={path.relative_to(self.out_dir)}"
+                for label, group in self._node_groups.items() for path in group.paths]
+        args += [f"--relationships={rel_type}={path.relative_to(self.out_dir)}"
+                 for (rel_type, _, _), group in self._relationship_groups.items() for path in group.paths]
+        return args
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def import_script(part_args: List[str], database: str = "neo4j") -> str:
+    lines = [
+        "#!/bin/sh",
+        "# Generated by utils/admin_export.py. Run with the target database stopped, then apply",
+        "# schema.cypher (cypher-shell -f schema.cypher) for the id constraints Neo4jUploader relies on.",
+        'cd "$(dirname "$0")"',
+        "exec neo4j-admin database import full \\",
+        f"  --array-delimiter='{ARRAY_DELIMITER}' --multiline-fields=true \\",
+        # Relationships to ids that never appeared as nodes are dropped, like the uploader's MATCH does.
+        "  --skip-bad-relationships=true --bad-tolerance=-1 \\",
+        '  --overwrite-destination="${OVERWRITE:-false}" \\',
+    ]
+    lines += [f"  {shlex.quote(arg)} \\" for arg in part_args]
+    lines.append(f'  "${{1:-{database}}}"')
+    return "\n".join(lines) + "\n"
+
+
+# --- Local verification (no database needed) ---
+@dataclass
+class VerifyReport:
+    files: int = 0
+    nodes: int = 0
+    relationships: int = 0
+    dangling_relationships: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+_MAX_ERRORS = 50
+_ID_SPACE_RE = re.compile(r"^(?:id)?:(ID|START_ID|END_ID)\(([^)]+)\)$")
+
+
+def _read_rows(path: Path) -> Iterator[List[str]]:
+    opener = gzip.open if path.name.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as handle:
+        yield from csv.reader(handle)
+
+def _check_value(raw: str, column_type: str) -> bool:
+    if raw == "":
+        return True
+    if column_type.endswith("[]"):
+        return all(_check_value(v, column_type[:-2]) for v in raw.split(ARRAY_DELIMITER))
+    try:
+        if column_type in ("long", "int"):
+            int(raw)
+        elif column_type in ("double", "float"):
+            float(raw)
+        elif column_type == "boolean":
+            return raw in ("true", "false")
+    except ValueError:
+        return False
+    return True
+
+def verify_export(out_dir: Union[str, Path]) -> VerifyReport:
+    """Re-read every part listed in import.sh: headers, column counts, typed values, id uniqueness, endpoints."""
+    out_dir = Path(out_dir)
+    report = VerifyReport()
+
+    def error(message: str):
+        if len(report.errors) < _MAX_ERRORS:
+            report.errors.append(message)
+
+    parts = [tuple(token[2:].split("=", 2)[::2]) for token in shlex.split((out_dir / "import.sh").read_text(), comments=True)
+             if token.startswith(("--nodes=", "--relationships="))]
+    ids: Dict[str, Set[str]] = {}
+    # Nodes first, so relationship endpoints can be checked against complete id spaces.
+    for kind, relative in sorted(parts, key=lambda part: part[0] != "nodes"):
+        path = out_dir / relative
+        report.files += 1
+        rows = _read_rows(path)
+        header = next(rows, None)
+        if not header:
+            error(f"{relative}: missing header")
+            continue
+        columns = []
+        for column in header:
+            name, _, column_type = column.rpartition(":")
+            id_space = _ID_SPACE_RE.match(column)
+            columns.append((id_space.group(1), id_space.group(2)) if id_space else ("property", column_type or "string"))
+            if not id_space and not name:
+                error(f"{relative}: malformed header column {column!r}")
+        for line, row in enumerate(rows, start=2):
+            if len(row) != len(columns):
+                error(f"{relative}:{line}: {len(row)} values for {len(columns)} columns")
+                continue
+            dangling = False
+            for raw, (role, detail) in zip(row, columns):
+                if role == "ID":
+                    space = ids.setdefault(detail, set())
+                    if raw in space:
+                        error(f"{relative}:{line}: duplicate id {raw!r} in id space {detail}")
+                    space.add(raw)
+                elif role in ("START_ID", "END_ID"):
+                    dangling = dangling or raw not in ids.get(detail, ())
+                elif not _check_value(raw, detail):
+                    error(f"{relative}:{line}: {raw!r} is not a valid {detail}")
+            if kind == "nodes":
+                report.nodes += 1
+            else:
+                report.relationships += 1
+                report.dangling_relationships += dangling
+    return report
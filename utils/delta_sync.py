@@ -0,0 +1,266 @@
+# utils/delta_sync.py
+# Delta-based graph sync. A local SQLite manifest remembers a content hash for every node and
+# relationship written to a given graph; a sync only sends elements that are new or whose hash
+# changed, and can delete elements that vanished from the new snapshot. Re-loading an unchanged
+# NPD snapshot then costs a manifest lookup per element instead of a MERGE + SET per element.
+#
+# DeltaSyncer exposes the same upload_kg_data() as Neo4jUploader, so it can be dropped into
+# stream_ingest() / kg-ingest; call finish() after the last batch to apply deletions.
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from utils.extraction_cache import DEFAULT_CACHE_DIR
+from utils.kg_models import BaseNode, KnowledgeGraphData, Relationship
+from utils.neo4j_uploader import (
+    DEFAULT_BATCH_SIZE, Neo4jUploader, UploadStats, node_properties, relationship_properties,
+)
+
+_SEP = "\x1f"
+_SQLITE_MAX_PARAMS = 500
+
+
+@dataclass
+class DeltaStats:
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    deleted_nodes: int = 0
+    deleted_relationships: int = 0
+    upload: UploadStats = field(default_factory=UploadStats)
+
+    def add(self, other: "DeltaStats"):
+        self.new += other.new
+        self.changed += other.changed
+        self.unchanged += other.unchanged
+        self.deleted_nodes += other.deleted_nodes
+        self.deleted_relationships += other.deleted_relationships
+        self.upload.add(other.upload)
+
+
+def node_key(node: BaseNode) -> str:
+    return _SEP.join(("N", node.type, node.id))
+
+def relationship_key(rel: Relationship) -> str:
+    return _SEP.join(("R", rel.source_type, rel.source_id, rel.relationship_type, rel.target_type, rel.target_id))
+
+def endpoint_keys(key: str) -> Tuple[Optional[str], Optional[str]]:
+    """Node keys of a relationship key's endpoints; (None, None) for a node key."""
+    parts = key.split(_SEP)
+    if parts[0] != "R":
+        return None, None
+    _, source_type, source_id, _, target_type, target_id = parts
+    return _SEP.join(("N", source_type, source_id)), _SEP.join(("N", target_type, target_id))
+
+def content_hash(properties: Dict[str, Any]) -> str:
+    encoded = json.dumps(properties, sort_keys=True, default=str, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class SyncManifest:
+    """Content hashes of what was last written to each graph, keyed by element key."""
+
+    def __init__(self, path: Union[str, Path, None] = None):
+        self.path = Path(path) if path is not None else Path(DEFAULT_CACHE_DIR) / "sync_manifest.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS elements ("
+            " graph TEXT NOT NULL, key TEXT NOT NULL, hash TEXT NOT NULL, run_id TEXT NOT NULL, synced_at REAL NOT NULL,"
+            " source TEXT, target TEXT, PRIMARY KEY (graph, key))"
+        )
+        # Relationship rows carry their endpoint node keys, so a node's relationships can be invalidated.
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(elements)")}
+        if "source" not in columns: # manifest written before endpoints were tracked
+            self._conn.execute("ALTER TABLE elements ADD COLUMN source TEXT")
+            self._conn.execute("ALTER TABLE elements ADD COLUMN target TEXT")
+            rows = self._conn.execute("SELECT graph, key FROM elements WHERE substr(key, 1, 2) = ?", ("R" + _SEP,)).fetchall()
+            self._conn.execute("BEGIN")
+            self._conn.executemany("UPDATE elements SET source = ?, target = ? WHERE graph = ? AND key = ?",
+                                   ((*endpoint_keys(key), graph, key) for graph, key in rows))
+            self._conn.execute("COMMIT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS elements_source ON elements (graph, source)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS elements_target ON elements (graph, target)")
+
+    def hashes(self, graph: str, keys: List[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQLITE_MAX_PARAMS):
+                chunk = keys[start:start + _SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, hash FROM elements WHERE graph = ? AND key IN ({placeholders})", (graph, *chunk)
+                )
+                found.update(rows)
+        return found
+
+    def record(self, graph: str, run_id: str, hashes: Dict[str, str]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO elements (graph, key, hash, run_id, synced_at, source, target)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((graph, key, digest, run_id, now, *endpoint_keys(key)) for key, digest in hashes.items()),
+            )
+            self._conn.execute("COMMIT")
+
+    def touch(self, graph: str, run_id: str, keys: List[str]):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for start in range(0, len(keys), _SQLITE_MAX_PARAMS):
+                chunk = keys[start:start + _SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                self._conn.execute(
+                    f"UPDATE elements SET run_id = ? WHERE graph = ? AND key IN ({placeholders})", (run_id, graph, *chunk)
+                )
+            self._conn.execute("COMMIT")
+
+    def stale_keys(self, graph: str, run_id: str) -> Iterator[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM elements WHERE graph = ? AND run_id != ?", (graph, run_id)).fetchall()
+        return (key for (key,) in rows)
+
+    def forget(self, graph: str, keys: List[str]):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM elements WHERE graph = ? AND key = ?", ((graph, key) for key in keys))
+            self._conn.execute("COMMIT")
+
+    def forget_relationships(self, graph: str, node_keys: List[str]) -> int:
+        """Drop the entries of relationships attached to these nodes, so they are written again."""
+        removed = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for start in range(0, len(node_keys), _SQLITE_MAX_PARAMS):
+                chunk = node_keys[start:start + _SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                for column in ("source", "target"):
+                    removed += self._conn.execute(
+                        f"DELETE FROM elements WHERE graph = ? AND {column} IN ({placeholders})", (graph, *chunk)
+                    ).rowcount
+            self._conn.execute("COMMIT")
+        return removed
+
+    def reset(self, graph: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM elements WHERE graph = ?", (graph,))
+
+    def count(self, graph: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM elements WHERE graph = ?", (graph,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DeltaSyncer:
+    """Sends only new/changed elements to Neo4j and tracks which ones a sync run has seen."""
+
+    def __init__(self, uploader: Optional[Neo4jUploader], manifest: SyncManifest, graph: str):
+        # uploader=None plans the delta without writing anything (and without updating the manifest).
+        self.uploader = uploader
+        self.manifest = manifest
+        self.graph = graph
+        self.run_id = uuid.uuid4().hex
+        self.stats = DeltaStats()
+
+    def plan(self, kg_data: KnowledgeGraphData) -> Tuple[KnowledgeGraphData, Dict[str, str], List[str], DeltaStats]:
+        """Split a batch into (elements to write, their new hashes, unchanged keys, counts)."""
+        return self._plan(kg_data)[:4]
+
+    def _plan(self, kg_data: KnowledgeGraphData):
+        # plan() plus the keys of the nodes it (re)creates.
+        node_hashes = {node_key(node): content_hash(node_properties(node)) for node in kg_data.nodes}
+        rel_hashes = {relationship_key(rel): content_hash(relationship_properties(rel)) for rel in kg_data.relationships}
+        previous = self.manifest.hashes(self.graph, list(node_hashes) + list(rel_hashes))
+        # A node missing from the manifest is (re)created, and a MERGE on it has no relationships
+        # yet, so its relationships are written again even if their own content didn't change.
+        created = {key for key in node_hashes if key not in previous}
+
+        stats = DeltaStats()
+        pending: Dict[str, str] = {}
+        unchanged: List[str] = []
+        for key, digest in (*node_hashes.items(), *rel_hashes.items()):
+            old = previous.get(key)
+            if old == digest and not created.intersection(endpoint_keys(key)):
+                unchanged.append(key)
+                stats.unchanged += 1
+            else:
+                pending[key] = digest
+                if old is None:
+                    stats.new += 1
+                else:
+                    stats.changed += 1
+
+        delta = KnowledgeGraphData.model_construct(
+            nodes=[node for node in kg_data.nodes if node_key(node) in pending],
+            relationships=[rel for rel in kg_data.relationships if relationship_key(rel) in pending],
+        )
+        return delta, pending, unchanged, stats, created
+
+    def upload_kg_data(self, kg_data: KnowledgeGraphData, mode: str = "batch", batch_size: int = DEFAULT_BATCH_SIZE,
+                       workers: int = 1) -> UploadStats:
+        delta, pending, unchanged, stats, created = self._plan(kg_data)
+        if self.uploader is not None:
+            options = dict(mode=mode, batch_size=batch_size, workers=workers, replace_properties=True)
+            # Relationships of (re)created nodes that arrive in later batches must not count as synced either.
+            if created:
+                self.manifest.forget_relationships(self.graph, sorted(created))
+            # Changed elements replace their properties so removed attributes don't linger.
+            # Hashes are only recorded once the write succeeded: a failed batch is simply retried next sync.
+            if delta.nodes:
+                stats.upload.add(self.uploader.upload_kg_data(
+                    KnowledgeGraphData.model_construct(nodes=delta.nodes, relationships=[]), **options
+                ))
+                self.manifest.record(self.graph, self.run_id, {key: pending[key] for key in map(node_key, delta.nodes)})
+            # Relationships go in chunks, and a chunk is recorded only if Neo4j wrote all of it. Rows
+            # skipped for a missing endpoint (and the rest of their chunk) keep their old manifest
+            # entry, so they are sent again next sync instead of being taken as synced.
+            for start in range(0, len(delta.relationships), max(1, batch_size)):
+                chunk = delta.relationships[start:start + max(1, batch_size)]
+                chunk_stats = self.uploader.upload_kg_data(
+                    KnowledgeGraphData.model_construct(nodes=[], relationships=chunk), **options
+                )
+                stats.upload.add(chunk_stats)
+                keys = [relationship_key(rel) for rel in chunk]
+                if chunk_stats.skipped_relationships:
+                    self.manifest.touch(self.graph, self.run_id, keys) # still part of the snapshot
+                else:
+                    self.manifest.record(self.graph, self.run_id, {key: pending[key] for key in keys})
+            self.manifest.touch(self.graph, self.run_id, unchanged)
+        self.stats.add(stats)
+        return stats.upload
+
+    def sync(self, kg_data: KnowledgeGraphData, delete_missing: bool = False, **upload_options) -> DeltaStats:
+        """One-shot sync of a complete snapshot."""
+        self.upload_kg_data(kg_data, **upload_options)
+        return self.finish(delete_missing=delete_missing, batch_size=upload_options.get("batch_size", DEFAULT_BATCH_SIZE))
+
+    def finish(self, delete_missing: bool = False, batch_size: int = DEFAULT_BATCH_SIZE) -> DeltaStats:
+        """Close the run; with delete_missing, remove everything synced before but not seen in this run."""
+        if delete_missing and self.uploader is not None:
+            stale = list(self.manifest.stale_keys(self.graph, self.run_id))
+            node_keys = [tuple(key.split(_SEP)[1:]) for key in stale if key.startswith("N" + _SEP)]
+            rel_keys = [tuple(key.split(_SEP)[1:]) for key in stale if key.startswith("R" + _SEP)]
+            if stale:
+                deleted_nodes, deleted_rels = self.uploader.delete_kg_elements(node_keys, rel_keys, batch_size=batch_size)
+                self.manifest.forget(self.graph, stale)
+                # DETACH DELETE also removed relationships this run did see; they are gone from the graph now.
+                self.manifest.forget_relationships(self.graph, [key for key in stale if key.startswith("N" + _SEP)])
+                self.stats.deleted_nodes += deleted_nodes
+                self.stats.deleted_relationships += deleted_rels
+        return self.stats
+
+
+def graph_name(uri: str, database: Optional[str] = None) -> str:
+    return f"{uri}/{database or 'neo4j'}"
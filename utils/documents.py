@@ -0,0 +1,150 @@
+# utils/documents.py
+# Document ingestion: parse uploaded PDFs from their bytes in a process pool, split the text
+# into overlapping chunks and stream those chunks to the extraction stage.
+#
+# Parsed page text is cached per file hash (in the ExtractionCache SQLite file), so a Streamlit
+# rerun or a re-upload of the same report never parses it twice. pypdf is the same backend
+# neo4j_graphrag's PdfLoader uses; it's called directly because PdfLoader only reads from a path.
+import hashlib
+import io
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+PDF_PARSER = "pypdf"
+PDF_PARSER_VERSION = "1"
+DEFAULT_CHUNK_SIZE = 2000 # characters
+DEFAULT_CHUNK_OVERLAP = 200
+DEFAULT_PARSE_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+
+@dataclass
+class ParsedDocument:
+    name: str
+    digest: str
+    pages: List[str]
+    cached: bool = False
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.pages)
+
+
+class TextChunk(NamedTuple):
+    doc_id: str # "<file name>#<chunk index>"
+    document: str
+    index: int
+    start: int # character offset into ParsedDocument.text
+    text: str
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_pdf_bytes(data: bytes) -> List[str]:
+    """Page texts of a PDF given as bytes. Top-level so it can run in a worker process."""
+    import pypdf
+
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def chunk_text(text: str, chunk_size: int = DEFAULT_CHUNK_SIZE, overlap: int = DEFAULT_CHUNK_OVERLAP) -> Iterator[Tuple[int, str]]:
+    """Yield (start, chunk) windows of ~chunk_size characters, each overlapping the previous one.
+
+    Windows end at the last whitespace before the limit where possible, so words (and usually
+    well names like 33/9-A-12) aren't cut in half.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            cut = text.rfind(" ", start + overlap + 1, end)
+            cut = max(cut, text.rfind("\n", start + overlap + 1, end))
+            if cut > start:
+                end = cut
+        chunk = text[start:end]
+        if chunk.strip():
+            yield start, chunk
+        if end >= length:
+            return
+        start = end - overlap
+
+
+def iter_chunks(documents: Iterable[ParsedDocument], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                overlap: int = DEFAULT_CHUNK_OVERLAP) -> Iterator[TextChunk]:
+    for document in documents:
+        for index, (start, text) in enumerate(chunk_text(document.text, chunk_size, overlap)):
+            yield TextChunk(f"{document.name}#{index}", document.name, index, start, text)
+
+
+def extract_chunk_triples(chunks: Iterable[TextChunk], cache=None, **extract_options):
+    """Run the spaCy triple extraction over a chunk stream; each triple's doc_id is its chunk's doc_id."""
+    from utils.nlp_utils import extract_triples
+
+    return extract_triples(((chunk.text, chunk.doc_id) for chunk in chunks), cache=cache, **extract_options)
+
+
+class DocumentParser:
+    """Parses many PDFs concurrently, reusing cached text for files it has seen before."""
+
+    def __init__(self, max_workers: int = DEFAULT_PARSE_WORKERS, cache=None, executor: Optional[Executor] = None):
+        self.cache = cache
+        self._executor = executor
+        self._owns_executor = executor is None
+        self.max_workers = max_workers
+
+    @property
+    def executor(self) -> Executor:
+        # Worker processes are only started once a PDF actually needs parsing.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def cached(self, name: str, data: bytes) -> Optional[ParsedDocument]:
+        digest = file_digest(data)
+        pages = self.cache.get(digest, PDF_PARSER, PDF_PARSER_VERSION) if self.cache is not None else None
+        return ParsedDocument(name, digest, pages, cached=True) if pages is not None else None
+
+    def submit(self, name: str, data: bytes) -> "Future[ParsedDocument]":
+        """Schedule one file; the returned future is already resolved on a cache hit."""
+        document = self.cached(name, data)
+        if document is not None:
+            future: Future = Future()
+            future.set_result(document)
+            return future
+        digest = file_digest(data)
+        parse = self.executor.submit(parse_pdf_bytes, data)
+        result: Future = Future()
+
+        def _done(parse_future: Future):
+            # Runs on the executor's thread: anything raised here would be logged and dropped,
+            # leaving result pending forever, so every failure is handed to the caller instead.
+            try:
+                pages = parse_future.result()
+                if self.cache is not None:
+                    self.cache.put(digest, PDF_PARSER, PDF_PARSER_VERSION, pages)
+                document = ParsedDocument(name, digest, pages)
+            except BaseException as e:
+                result.set_exception(e)
+                return
+            result.set_result(document)
+
+        parse.add_done_callback(_done)
+        return result
+
+    def parse_many(self, files: Iterable[Tuple[str, bytes]]) -> Iterator[ParsedDocument]:
+        """Yield documents as they finish parsing (completion order, not input order)."""
+        futures = [self.submit(name, data) for name, data in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+    def close(self):
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,248 @@
+# utils/domain_ner.py
+# Rule-based NER for Norwegian-shelf identifiers: a fast, deterministic pre-extraction stage that
+# runs before (and often instead of) the LLM.
+#
+#   npd_identifiers    precompiled regexes for NPD wellbore names (33/9-A-12, 6507/7-A-26 H) and
+#                      production licences (PL037, PL 1049B), which the tokenizer splits apart
+#   domain_gazetteer   spaCy EntityRuler (PhraseMatcher underneath) over reference lists of fields,
+#                      formations and operators, compiled once when the pipeline is built
+#
+# Both set doc.ents with the node type as label and the canonical node id as ent_id_, so the
+# result can be used as typed Well/License/Formation/Field/Company candidates directly. Within a
+# sentence, typed entity pairs plus a trigger phrase between them ("targets", "operated by") give
+# rule relationships. A chunk is "resolved" when every sentence mentions an entity and all of its
+# entities are linked that way. A sentence with a lone entity usually carries attributes ("discovered
+# in 1974"), and one without any may refer back to one ("The well reached ..."), so those chunks
+# are left to the LLM.
+#
+# The pipes can also sit in front of the parser (utils/resources.get_nlp merges the spans into
+# single tokens), so the dependency triples in utils/nlp_utils.py see "33/9-A-12" as one word.
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple, Union
+
+from spacy.language import Language
+from spacy.tokens import Doc
+from spacy.util import filter_spans
+
+from utils import metrics
+from utils.kg_models import KnowledgeGraphData, NPD_WELLBORE_PATTERN, licence_id
+from utils.kg_validation import get_validator
+
+GAZETTEER_PIPE = "domain_gazetteer"
+IDENTIFIER_PIPE = "npd_identifiers"
+DEFAULT_PIPE_BATCH_SIZE = 256
+NODE_LABELS = ("Well", "License", "Formation", "Field", "Company")
+
+# --- 1. Reference lists (canonical name -> aliases) ---
+DEFAULT_FIELDS: Dict[str, List[str]] = {name: [] for name in (
+    "Statfjord", "Gullfaks", "Troll", "Oseberg", "Ekofisk", "Snorre", "Heidrun", "Draugen", "Grane", "Kristin",
+    "Aasta Hansteen", "Johan Sverdrup", "Johan Castberg", "Valhall", "Sleipner", "Brage", "Njord", "Norne",
+    "Visund", "Ivar Aasen", "Edvard Grieg", "Martin Linge", "Goliat", "Alvheim", "Skarv", "Ormen Lange",
+)}
+DEFAULT_FIELDS.update({"Gjøa": ["Gjoa"], "Snøhvit": ["Snohvit"]})
+DEFAULT_FORMATIONS: Dict[str, List[str]] = {name: [] for name in (
+    "Brent", "Statfjord", "Cook", "Tarbert", "Ness", "Etive", "Rannoch", "Broom", "Oseberg", "Heather", "Draupne",
+    "Ekofisk", "Tor", "Hod", "Garn", "Ile", "Tilje", "Hugin", "Sleipner", "Skagerrak", "Utsira", "Sognefjord",
+    "Fensfjord", "Kobbe", "Nordmela", "Fruholmen", "Snadd",
+)}
+DEFAULT_FORMATIONS.update({"Åre": ["Are"], "Stø": ["Sto"], "Tubåen": ["Tubaen"]})
+DEFAULT_COMPANIES: Dict[str, List[str]] = {
+    "Equinor ASA": ["Equinor", "Statoil"], "Aker BP ASA": ["Aker BP"], "Vår Energi ASA": ["Vår Energi", "Var Energi"],
+    "Petoro AS": ["Petoro"], "ConocoPhillips Skandinavia AS": ["ConocoPhillips"],
+    "TotalEnergies EP Norge AS": ["TotalEnergies"], "Harbour Energy Norge AS": ["Harbour Energy"],
+    "OMV (Norge) AS": ["OMV"], "Wintershall Dea Norge AS": ["Wintershall Dea"], "DNO Norge AS": ["DNO"],
+    "Lundin Energy Norway AS": ["Lundin"], "Shell Norge AS": ["A/S Norske Shell", "Norske Shell"],
+    "Norsk Hydro ASA": ["Norsk Hydro"],
+}
+
+
+@dataclass
+class Gazetteer:
+    fields: Dict[str, List[str]] = field(default_factory=lambda: dict(DEFAULT_FIELDS))
+    formations: Dict[str, List[str]] = field(default_factory=lambda: dict(DEFAULT_FORMATIONS))
+    companies: Dict[str, List[str]] = field(default_factory=lambda: dict(DEFAULT_COMPANIES))
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> "Gazetteer":
+        """Read fields.txt / formations.txt / companies.txt ("Canonical | alias | ..." per line);
+        a missing file keeps the built-in list."""
+        gazetteer = cls()
+        for name in ("fields", "formations", "companies"):
+            path = Path(directory) / f"{name}.txt"
+            if path.is_file():
+                setattr(gazetteer, name, _read_reference_list(path))
+        return gazetteer
+
+    def patterns(self) -> List[Dict[str, str]]:
+        """EntityRuler phrase patterns; the pattern id is the canonical node id."""
+        patterns = []
+        for name, aliases in self.fields.items():
+            for alias in (name, *aliases):
+                for suffix in ("", " field", " Field"):
+                    patterns.append({"label": "Field", "pattern": alias + suffix, "id": f"{name} Field"})
+        for name, aliases in self.formations.items():
+            for alias in (name, *aliases):
+                for suffix in (" Formation", " formation", " Fm", " Fm."):
+                    patterns.append({"label": "Formation", "pattern": alias + suffix, "id": f"{name} Formation"})
+        for name, aliases in self.companies.items():
+            for alias in (name, *aliases):
+                patterns.append({"label": "Company", "pattern": alias, "id": name})
+        return patterns
+
+
+def _read_reference_list(path: Path) -> Dict[str, List[str]]:
+    entries: Dict[str, List[str]] = {}
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            name, *aliases = [part.strip() for part in line.split("|")]
+            entries[name] = [alias for alias in aliases if alias]
+    return entries
+
+
+# --- 2. NPD identifier regexes ---
+# Wellbore: quadrant/block-[slot-]number, optional sidetrack/re-entry suffix (H, A, T2, AH).
+WELLBORE_RE = re.compile(rf"(?<![\w/]){NPD_WELLBORE_PATTERN}(?![\w/-])")
+# Production licence: PL + 3-4 digits (+ an optional part letter), written with or without a space.
+LICENCE_RE = re.compile(r"\bPL\s?(\d{3,4})([A-Z]{0,2})\b")
+
+def _wellbore_id(match: "re.Match[str]") -> str:
+    return " ".join(match.group(0).split())
+
+def _licence_id(match: "re.Match[str]") -> str:
+    return licence_id(match.group(1), match.group(2))
+
+IDENTIFIER_RULES: List[Tuple[Pattern[str], str, Callable[["re.Match[str]"], str]]] = [
+    (WELLBORE_RE, "Well", _wellbore_id),
+    (LICENCE_RE, "License", _licence_id),
+]
+
+
+class NPDIdentifierMatcher:
+    """Sets regex-matched NPD identifiers as doc.ents (longest span wins on overlaps); runs before the ruler."""
+
+    def __call__(self, doc: Doc) -> Doc:
+        spans = []
+        for regex, label, canonical in IDENTIFIER_RULES:
+            for match in regex.finditer(doc.text):
+                span = doc.char_span(match.start(), match.end(), label=label, alignment_mode="expand",
+                                     span_id=canonical(match))
+                if span is not None:
+                    spans.append(span)
+        if spans:
+            # set_ents instead of doc.ents += ...: reading doc.ents walks every token.
+            doc.set_ents(filter_spans(spans), default="unmodified")
+        return doc
+
+
+@Language.factory(IDENTIFIER_PIPE)
+def create_npd_identifier_matcher(nlp: Language, name: str):
+    return NPDIdentifierMatcher()
+
+
+def add_domain_pipes(nlp: Language, gazetteer: Optional[Gazetteer] = None, first: bool = False) -> Language:
+    """Add the identifier matcher and gazetteer ruler (at the front with first=True, e.g. before a parser)."""
+    nlp.add_pipe(IDENTIFIER_PIPE, first=first or None)
+    # Gazetteer matches never override an identifier (overwrite_ents=False).
+    ruler = nlp.add_pipe("entity_ruler", name=GAZETTEER_PIPE, after=IDENTIFIER_PIPE,
+                         config={"phrase_matcher_attr": "ORTH", "overwrite_ents": False})
+    ruler.add_patterns((gazetteer or Gazetteer()).patterns())
+    return nlp
+
+def build_domain_nlp(gazetteer: Optional[Gazetteer] = None) -> Language:
+    """Tokenizer + sentencizer + domain pipes; no statistical model, so it runs at tokenizer speed."""
+    import spacy
+
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    return add_domain_pipes(nlp, gazetteer)
+
+
+# --- 3. Typed candidates and rule relationships ---
+class DomainEntity(NamedTuple):
+    text: str
+    type: str
+    id: str
+    start_char: int
+    end_char: int
+    sent_idx: int
+
+
+# (source type, target type) -> [(relationship type, trigger between the two mentions)], first match wins.
+RELATION_RULES: Dict[Tuple[str, str], List[Tuple[str, Pattern[str]]]] = {
+    ("Well", "Formation"): [("TARGETS_FORMATION", re.compile(r"\b(?:target|penetrat|reach|encounter|drilled into)", re.I))],
+    ("Well", "License"): [("DRILLED_IN_LICENSE", re.compile(r"\b(?:licen[cs]e|drilled (?:in|under))\b", re.I))],
+    ("Well", "Field"): [("IS_IN_FIELD", re.compile(r"\b(?:in|on|at)(?: the)?\s*$", re.I))], # "... in the Troll field"
+    ("License", "Company"): [("OPERATED_BY", re.compile(r"\boperat", re.I)),
+                             ("HAS_LICENSEE", re.compile(r"\b(?:partner|licensee|interest)", re.I))],
+    ("Field", "License"): [("ASSOCIATED_WITH_LICENSE", re.compile(r"\blicen[cs]e", re.I))],
+}
+
+
+@dataclass
+class DomainExtraction:
+    doc_id: object
+    entities: List[DomainEntity]
+    kg_data: KnowledgeGraphData # candidate nodes + rule relationships
+    resolved: bool # every entity-bearing sentence fully linked by rules: no LLM needed
+
+
+def _doc_entities(doc: Doc) -> Tuple[List[DomainEntity], int]:
+    """(entities, number of sentences)."""
+    sentences = list(doc.sents) if doc.has_annotation("SENT_START") else [doc[:]]
+    starts = [sent.start for sent in sentences]
+    # doc.ents walks every token, so read it once rather than per sentence.
+    entities = [DomainEntity(ent.text, ent.label_, ent.ent_id_ or ent.text, ent.start_char, ent.end_char,
+                             bisect_right(starts, ent.start) - 1)
+                for ent in doc.ents if ent.label_ in NODE_LABELS]
+    return entities, sum(1 for sent in sentences if not sent.text.isspace())
+
+def _relate(text: str, entities: List[DomainEntity], sentences: int) -> Tuple[List[Dict[str, object]], bool]:
+    """Rule relationships between entities of the same sentence, and whether that resolves the text."""
+    relationships: Dict[Tuple[str, str, str], Dict[str, object]] = {}
+    linked = set()
+    by_sentence: Dict[int, List[int]] = {}
+    for index, entity in enumerate(entities):
+        by_sentence.setdefault(entity.sent_idx, []).append(index)
+    for members in by_sentence.values():
+        for i, a_index in enumerate(members):
+            for b_index in members[i + 1:]:
+                a, b = entities[a_index], entities[b_index]
+                between = text[a.end_char:b.start_char]
+                for source, target in ((a, b), (b, a)):
+                    for rel_type, trigger in RELATION_RULES.get((source.type, target.type), ()):
+                        if trigger.search(between):
+                            relationships.setdefault((source.id, rel_type, target.id), {
+                                "source_id": source.id, "source_type": source.type, "target_id": target.id,
+                                "target_type": target.type, "relationship_type": rel_type, "properties": {"rule": True},
+                            })
+                            linked.update((a_index, b_index))
+                            break
+    resolved = bool(entities) and len(linked) == len(entities) and len(by_sentence) == sentences
+    return list(relationships.values()), resolved
+
+def domain_extraction(doc: Doc, doc_id: object = None) -> DomainExtraction:
+    entities, sentences = _doc_entities(doc)
+    relationships, resolved = _relate(doc.text, entities, sentences)
+    nodes = {(entity.type, entity.id): {"id": entity.id, "type": entity.type, "attributes": {}} for entity in entities}
+    kg_data = get_validator().validate({"nodes": list(nodes.values()), "relationships": relationships})
+    return DomainExtraction(doc_id, entities, kg_data, resolved)
+
+
+def extract_domain(texts: Iterable[Union[str, Tuple[str, object]]], nlp: Optional[Language] = None,
+                   batch_size: int = DEFAULT_PIPE_BATCH_SIZE, n_process: int = 1) -> Iterator[DomainExtraction]:
+    """Stream typed candidates over a corpus with nlp.pipe; texts are strings or (text, doc_id) pairs."""
+    if nlp is None:
+        from utils.resources import get_domain_nlp
+
+        nlp = get_domain_nlp()
+    items = ((item, index) if isinstance(item, str) else item for index, item in enumerate(texts))
+    docs = nlp.pipe(items, as_tuples=True, batch_size=batch_size, n_process=n_process)
+    for doc, doc_id in metrics.timed_iter(docs, "domain_ner_seconds"):
+        extraction = domain_extraction(doc, doc_id)
+        metrics.inc("domain_entities_total", len(extraction.entities))
+        metrics.inc("domain_chunks_total", resolved="yes" if extraction.resolved else "no")
+        yield extraction
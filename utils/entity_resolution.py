@@ -0,0 +1,216 @@
+# utils/entity_resolution.py
+# Entity resolution between validation and upload: clusters near-duplicate node ids within each
+# node type ("Statfjord_Field" / "Statfjord_field" / "STATFJORD", "33_9-A-12" / "33_9-A-12_H")
+# and rewrites relationship endpoints to one canonical id per cluster.
+#
+# Comparing every pair is quadratic, so candidates are only compared inside blocks that share a
+# key: an NPD wellbore key for wells, plus leading/trailing character n-grams of the normalised
+# name. Exact normalised matches are merged by hashing; fuzzy matches inside a block are scored
+# with rapidfuzz's vectorised process.cdist.
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from utils.kg_models import BaseNode, KnowledgeGraphData, NPD_WELLBORE_PATTERN, Relationship, licence_id
+
+DEFAULT_SCORE_CUTOFF = 92
+DEFAULT_NGRAM = 4
+DEFAULT_MAX_BLOCK_SIZE = 2000
+
+# Generic words that don't identify an entity ("Statfjord Field" == "Statfjord").
+STOPWORDS = {
+    "Field": {"field", "felt"},
+    "Formation": {"formation", "fm", "fm."},
+    "Company": {"asa", "as", "ab", "ltd", "inc", "plc", "corp", "corporation", "company", "norge", "norway"},
+    "License": {"production", "licence", "license", "pl"},
+}
+# NPD wellbore names, sanitised by BaseNode: 33/9-A-12 H -> 33_9-A-12_H. The trailing sidetrack/
+# re-entry designation (H, T2, A, ST2, ...) is dropped so variants of one well share a key.
+NPD_WELLBORE = re.compile(rf"^{NPD_WELLBORE_PATTERN}$", re.IGNORECASE)
+# Production licences in any spacing (PL037, PL 037, sanitised PL_037) normalise to one name, pl037.
+NPD_LICENCE = re.compile(r"^PL[\s_]*(\d{1,4})[\s_]*([A-Z]{0,2})$", re.IGNORECASE)
+_SEPARATORS = re.compile(r"[_\s\-/.,:;()]+")
+_DIGITS = re.compile(r"\d+")
+
+
+@dataclass
+class ResolutionResult:
+    kg_data: KnowledgeGraphData
+    id_map: Dict[Tuple[str, str], str] = field(default_factory=dict) # (type, old id) -> canonical id
+    clusters: int = 0
+    merged_nodes: int = 0
+    merged_relationships: int = 0
+    comparisons: int = 0
+
+
+def normalize_name(node_id: str, node_type: Optional[str] = None) -> str:
+    tokens = [t for t in _SEPARATORS.split(node_id.lower()) if t]
+    stopwords = STOPWORDS.get(node_type, ())
+    kept = [t for t in tokens if t not in stopwords]
+    name = " ".join(kept or tokens)
+    if node_type == "License":
+        # "PL037", "PL_037", "PL 37" and "Production licence 037" all name licence pl037.
+        match = NPD_LICENCE.match(node_id.strip()) or NPD_LICENCE.match("PL" + name)
+        if match:
+            return licence_id(*match.groups()).lower()
+    return name
+
+def wellbore_key(node_id: str) -> Optional[str]:
+    match = NPD_WELLBORE.match(node_id.strip())
+    if not match:
+        return None
+    quadrant, block, slot, number, _ = match.groups()
+    slot = f"{slot.upper()}-" if slot else ""
+    return f"{int(quadrant)}/{int(block)}-{slot}{int(number)}"
+
+def blocking_keys(name: str, ngram: int = DEFAULT_NGRAM) -> List[str]:
+    # Numbers are identifiers ("Troll 1" vs "Troll 2", "PL037" vs "PL038"), never typos, so
+    # they are part of every key and names with different numbers are never compared.
+    digits = "-".join(_DIGITS.findall(name))
+    letters = _DIGITS.sub("", name).replace(" ", "")
+    if not letters: # numbers only ("037"): the number is the key
+        return [f"d:{digits}"] if digits else []
+    # A trailing n-gram catches variants that differ in their first characters.
+    return [f"p:{digits}:{letters[:ngram]}", f"s:{digits}:{letters[-ngram:]}"]
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # Keep the smaller index as root: the earliest occurrence becomes canonical.
+            if root_b < root_a:
+                root_a, root_b = root_b, root_a
+            self.parent[root_b] = root_a
+
+
+def _fuzzy_pairs(names: List[str], score_cutoff: int) -> Tuple[np.ndarray, np.ndarray]:
+    scores = process.cdist(names, names, scorer=fuzz.ratio, score_cutoff=score_cutoff, dtype=np.uint8, workers=-1)
+    return np.nonzero(np.triu(scores, k=1))
+
+def _split_block(members: List[int], names: List[str], width: int, max_block_size: int) -> List[List[int]]:
+    # Oversized blocks are split on a longer prefix so cdist stays at max_block_size**2 cells.
+    if len(members) <= max_block_size or width > 32:
+        return [members]
+    sub_blocks: Dict[str, List[int]] = defaultdict(list)
+    for member in members:
+        sub_blocks[_DIGITS.sub("", names[member]).replace(" ", "")[:width]].append(member)
+    if len(sub_blocks) == 1:
+        return [members[start:start + max_block_size] for start in range(0, len(members), max_block_size)]
+    result = []
+    for sub_members in sub_blocks.values():
+        result.extend(_split_block(sub_members, names, width + 2, max_block_size))
+    return result
+
+
+def cluster_ids(node_ids: List[str], node_type: str, score_cutoff: int = DEFAULT_SCORE_CUTOFF,
+                ngram: int = DEFAULT_NGRAM, max_block_size: int = DEFAULT_MAX_BLOCK_SIZE) -> Tuple[List[int], int]:
+    """Return (root index per id, number of scored comparisons) for ids of one node type."""
+    names = [normalize_name(node_id, node_type) for node_id in node_ids]
+    union_find = _UnionFind(len(node_ids))
+
+    exact: Dict[str, int] = {}
+    for index, node_id in enumerate(node_ids):
+        for key in filter(None, (names[index] and "n:" + names[index],
+                                 node_type == "Well" and wellbore_key(node_id))):
+            if key in exact:
+                union_find.union(exact[key], index)
+            else:
+                exact[key] = index
+
+    # Fuzzy matching runs on one representative per exact cluster only. NPD wellbores are fully
+    # described by their key, so they never go through fuzzy matching.
+    representatives = [
+        index for index in range(len(node_ids))
+        if union_find.find(index) == index and names[index] and not (node_type == "Well" and wellbore_key(node_ids[index]))
+    ]
+    blocks: Dict[str, List[int]] = defaultdict(list)
+    for index in representatives:
+        for key in blocking_keys(names[index], ngram):
+            blocks[key].append(index)
+
+    comparisons = 0
+    for members in blocks.values():
+        for block in _split_block(members, names, ngram + 2, max_block_size):
+            if len(block) < 2:
+                continue
+            comparisons += len(block) * (len(block) - 1) // 2
+            rows, cols = _fuzzy_pairs([names[member] for member in block], score_cutoff)
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                union_find.union(block[row], block[col])
+
+    return [union_find.find(index) for index in range(len(node_ids))], comparisons
+
+
+def _merge_nodes(members: List[BaseNode]) -> BaseNode:
+    canonical = members[0]
+    if len(members) == 1:
+        return canonical
+    attributes = dict(canonical.attributes)
+    updates = {}
+    for duplicate in members[1:]:
+        for key, value in duplicate.attributes.items():
+            attributes.setdefault(key, value)
+        for name in type(canonical).model_fields:
+            if name not in BaseNode.model_fields and getattr(canonical, name) is None and name not in updates:
+                value = getattr(duplicate, name, None)
+                if value is not None:
+                    updates[name] = value
+    attributes["aliases"] = sorted({node.id for node in members[1:]})
+    return canonical.model_copy(update={"attributes": attributes, **updates})
+
+
+def resolve_entities(kg_data: KnowledgeGraphData, score_cutoff: int = DEFAULT_SCORE_CUTOFF,
+                     ngram: int = DEFAULT_NGRAM, max_block_size: int = DEFAULT_MAX_BLOCK_SIZE) -> ResolutionResult:
+    result = ResolutionResult(kg_data=kg_data)
+    by_type: Dict[str, List[BaseNode]] = defaultdict(list)
+    for node in kg_data.nodes:
+        by_type[node.type].append(node)
+
+    nodes: List[BaseNode] = []
+    for node_type, typed_nodes in by_type.items():
+        roots, comparisons = cluster_ids([node.id for node in typed_nodes], node_type, score_cutoff, ngram, max_block_size)
+        result.comparisons += comparisons
+        clusters: Dict[int, List[BaseNode]] = defaultdict(list)
+        for node, root in zip(typed_nodes, roots):
+            clusters[root].append(node)
+        for members in clusters.values():
+            canonical_id = members[0].id
+            for member in members:
+                if member.id != canonical_id:
+                    result.id_map[(node_type, member.id)] = canonical_id
+            nodes.append(_merge_nodes(members))
+        result.clusters += len(clusters)
+        result.merged_nodes += len(typed_nodes) - len(clusters)
+
+    relationships: Dict[Tuple[str, str, str, str, str], Relationship] = {}
+    for rel in kg_data.relationships:
+        source_id = result.id_map.get((rel.source_type, rel.source_id), rel.source_id)
+        target_id = result.id_map.get((rel.target_type, rel.target_id), rel.target_id)
+        key = (rel.source_type, source_id, rel.relationship_type, rel.target_type, target_id)
+        if key in relationships:
+            # Same edge reached through two aliases: keep one, fill in missing properties.
+            result.merged_relationships += 1
+            existing = relationships[key]
+            relationships[key] = existing.model_copy(update={"properties": {**rel.properties, **existing.properties}})
+            continue
+        if source_id != rel.source_id or target_id != rel.target_id:
+            rel = rel.model_copy(update={"source_id": source_id, "target_id": target_id})
+        relationships[key] = rel
+
+    result.kg_data = KnowledgeGraphData.model_construct(nodes=nodes, relationships=list(relationships.values()))
+    return result
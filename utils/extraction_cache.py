@@ -0,0 +1,132 @@
+# utils/extraction_cache.py
+# Persistent, content-addressed cache for extraction results (spaCy triples, LLM nodes and
+# relationships). Entries are keyed by sha256(chunk text, model name/version, prompt/pattern
+# version), so unchanged chunks are never extracted twice, and changing the model or the
+# patterns naturally invalidates old entries. Stored in one SQLite file; least recently used
+# entries are evicted once the total payload exceeds max_bytes.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from utils import metrics
+
+DEFAULT_CACHE_DIR = os.environ.get("KG_CACHE_DIR", ".cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def cache_key(text: str, model: str, version: str) -> str:
+    digest = hashlib.sha256()
+    for part in (model, version, text):
+        encoded = part.encode("utf-8")
+        # Length-prefixed so ("ab", "c") and ("a", "bc") can't collide.
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, path: Union[str, Path, None] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path) if path is not None else Path(DEFAULT_CACHE_DIR) / "extraction.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, text: str, model: str, version: str) -> Optional[Any]:
+        key = cache_key(text, model, version)
+        with metrics.timer("cache_lookup_seconds"), self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                metrics.inc("cache_lookups_total", result="miss")
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.stats.hits += 1
+        metrics.inc("cache_lookups_total", result="hit")
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, text: str, model: str, version: str, value: Any):
+        key = cache_key(text, model, version)
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._total_bytes += len(blob) - (previous[0] if previous else 0)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            self.stats.writes += 1
+            self._evict()
+        metrics.inc("cache_writes_total")
+
+    def get_or_compute(self, text: str, model: str, version: str, compute: Callable[[str], Any]) -> Any:
+        value = self.get(text, model, version)
+        if value is None:
+            value = compute(text)
+            self.put(text, model, version, value)
+        return value
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Other processes may share the file, so re-read the real total before deleting anything.
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self._total_bytes = total
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if total - freed <= self.max_bytes:
+                break
+            victims.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self._total_bytes -= freed
+        self.stats.evictions += len(victims)
+        metrics.inc("cache_evictions_total", len(victims))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._total_bytes
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._total_bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,429 @@
+# utils/graph_engine.py
+# Compact in-process graph built from KnowledgeGraphData, for querying and checking a graph
+# before (or without) uploading it to Neo4j.
+#
+#   nodes          interned to 0..n-1; (type, id) -> index, one int16 type code per node
+#   properties     one typed column per property name (int64/float64/bool with a presence mask, object otherwise)
+#   relationships  per type, CSR adjacency in both directions: indptr[n + 1] and neighbour indices,
+#                  plus the edge id each entry came from (index into relationship_properties[type])
+#
+# Nodes and relationships are merged on the same keys Neo4jUploader MERGEs on. Relationships whose
+# endpoints aren't in the graph are kept aside in `dangling`: those are the ones the uploader's
+# MATCH silently skips.
+#
+# match() understands simple Cypher path patterns, e.g.
+#   MATCH (w:Well)-[:TARGETS_FORMATION]->(f:Formation {id: 'Brent_Formation'}) RETURN w, f LIMIT 10
+# As in Cypher, a path never uses the same relationship twice, and RETURN p (the path variable)
+# returns every node and relationship along the path.
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.kg_models import KnowledgeGraphData, Relationship
+from utils.neo4j_uploader import node_properties, relationship_properties
+
+NodeKey = Tuple[str, str] # (type, id)
+DIRECTIONS = ("out", "in", "both")
+
+
+@dataclass
+class _CSR:
+    indptr: np.ndarray # int64[n + 1]
+    indices: np.ndarray # int32 neighbour per entry
+    edges: np.ndarray # int64 edge id per entry
+
+
+def _build_csr(sources: np.ndarray, targets: np.ndarray, n: int) -> _CSR:
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    return _CSR(indptr, targets[order].astype(np.int32), order.astype(np.int64))
+
+def _gather(csr: _CSR, frontier: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """All (frontier position, neighbour, edge id) entries for the frontier nodes, vectorised."""
+    starts = csr.indptr[frontier]
+    lengths = csr.indptr[frontier + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    owners = np.repeat(np.arange(len(frontier)), lengths)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    positions = np.repeat(starts, lengths) + offsets
+    return owners, csr.indices[positions].astype(np.int64), csr.edges[positions]
+
+
+@dataclass
+class GraphCheck:
+    nodes: int
+    relationships: int
+    dangling: List[Relationship] = field(default_factory=list)
+    duplicate_nodes: int = 0
+    duplicate_relationships: int = 0
+    isolated_nodes: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.dangling
+
+
+class LocalGraph:
+    def __init__(self):
+        self.type_names: List[str] = []
+        self.node_ids: List[str] = []
+        self.node_type = np.empty(0, dtype=np.int16)
+        self.columns: Dict[str, np.ndarray] = {}
+        self.present: Dict[str, np.ndarray] = {} # per column: which nodes have the property
+        self.relationship_properties: Dict[str, List[Dict[str, Any]]] = {}
+        self.dangling: List[Relationship] = []
+        self.duplicate_nodes = 0
+        self.duplicate_relationships = 0
+        self._index: Dict[NodeKey, int] = {}
+        self._by_type: Dict[str, np.ndarray] = {}
+        self._out: Dict[str, _CSR] = {}
+        self._in: Dict[str, _CSR] = {}
+
+    @classmethod
+    def from_kg_data(cls, kg_data: KnowledgeGraphData) -> "LocalGraph":
+        graph = cls()
+        type_codes: Dict[str, int] = {}
+        codes: List[int] = []
+        props: List[Dict[str, Any]] = []
+        for node in kg_data.nodes:
+            key = (node.type, node.id)
+            index = graph._index.get(key)
+            if index is None:
+                index = graph._index[key] = len(graph.node_ids)
+                graph.node_ids.append(node.id)
+                codes.append(type_codes.setdefault(node.type, len(type_codes)))
+                props.append({})
+            else:
+                graph.duplicate_nodes += 1
+            props[index].update(node_properties(node)) # SET n += props, as the uploader does
+        graph.type_names = list(type_codes)
+        graph.node_type = np.array(codes, dtype=np.int16)
+        graph._by_type = {name: np.flatnonzero(graph.node_type == code) for name, code in type_codes.items()}
+        graph.columns, graph.present = _property_columns(props)
+
+        edges: Dict[str, Dict[Tuple[int, int], int]] = {}
+        for rel in kg_data.relationships:
+            source = graph._index.get((rel.source_type, rel.source_id))
+            target = graph._index.get((rel.target_type, rel.target_id))
+            if source is None or target is None:
+                graph.dangling.append(rel)
+                continue
+            by_pair = edges.setdefault(rel.relationship_type, {})
+            rel_props = graph.relationship_properties.setdefault(rel.relationship_type, [])
+            edge = by_pair.get((source, target))
+            if edge is None:
+                by_pair[(source, target)] = len(rel_props)
+                rel_props.append(relationship_properties(rel))
+            else:
+                graph.duplicate_relationships += 1
+                rel_props[edge].update(relationship_properties(rel))
+
+        n = len(graph.node_ids)
+        for rel_type, by_pair in edges.items():
+            pairs = np.array(list(by_pair), dtype=np.int64).reshape(-1, 2)
+            # Edge ids are insertion order, which is also the dict's iteration order.
+            graph._out[rel_type] = _build_csr(pairs[:, 0], pairs[:, 1], n)
+            graph._in[rel_type] = _build_csr(pairs[:, 1], pairs[:, 0], n)
+        return graph
+
+    # --- Lookups ---
+    @property
+    def relationship_types(self) -> List[str]:
+        return list(self._out)
+
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    def relationship_count(self, rel_type: Optional[str] = None) -> int:
+        if rel_type is not None:
+            return len(self.relationship_properties.get(rel_type, ()))
+        return sum(len(p) for p in self.relationship_properties.values())
+
+    def lookup(self, node_type: str, node_id: str) -> Optional[int]:
+        return self._index.get((node_type, node_id))
+
+    def key(self, index: int) -> NodeKey:
+        return self.type_names[self.node_type[index]], self.node_ids[index]
+
+    def node(self, index: int) -> Dict[str, Any]:
+        data = {"id": self.node_ids[index], "type": self.type_names[self.node_type[index]]}
+        for name, column in self.columns.items():
+            if self.present[name][index]:
+                value = column[index]
+                data[name] = value.item() if isinstance(value, np.generic) else value
+        return data
+
+    def _csrs(self, rel_types: Optional[Iterable[str]], direction: str) -> List[_CSR]:
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}, got {direction!r}")
+        names = self.relationship_types if rel_types is None else [t for t in rel_types if t in self._out]
+        csrs = []
+        for name in names:
+            if direction in ("out", "both"):
+                csrs.append(self._out[name])
+            if direction in ("in", "both"):
+                csrs.append(self._in[name])
+        return csrs
+
+    def neighbors(self, node_type: str, node_id: str, rel_type: Optional[str] = None, direction: str = "out") -> List[NodeKey]:
+        index = self.lookup(node_type, node_id)
+        if index is None:
+            raise KeyError((node_type, node_id))
+        frontier = np.array([index])
+        found = [_gather(csr, frontier)[1] for csr in self._csrs(None if rel_type is None else [rel_type], direction)]
+        return [self.key(i) for i in np.unique(np.concatenate(found))] if found else []
+
+    def expand(self, seeds: Sequence[NodeKey], hops: int = 1, rel_types: Optional[Iterable[str]] = None,
+               direction: str = "both") -> Dict[NodeKey, int]:
+        """Breadth-first k-hop neighbourhood: every reachable node -> its hop distance (seeds are 0)."""
+        csrs = self._csrs(rel_types, direction)
+        distance = np.full(len(self.node_ids), -1, dtype=np.int32)
+        frontier = np.unique(np.array([i for i in (self.lookup(*seed) for seed in seeds) if i is not None], dtype=np.int64))
+        distance[frontier] = 0
+        for hop in range(1, hops + 1):
+            if not len(frontier):
+                break
+            reached = np.unique(np.concatenate([_gather(csr, frontier)[1] for csr in csrs] or [np.empty(0, np.int64)]))
+            frontier = reached[distance[reached] < 0]
+            distance[frontier] = hop
+        return {self.key(i): int(distance[i]) for i in np.flatnonzero(distance >= 0)}
+
+    # --- Degree statistics ---
+    def degrees(self, rel_type: Optional[str] = None, direction: str = "out") -> np.ndarray:
+        total = np.zeros(len(self.node_ids), dtype=np.int64)
+        for csr in self._csrs(None if rel_type is None else [rel_type], direction):
+            total += np.diff(csr.indptr)
+        return total
+
+    def degree_stats(self) -> List[Dict[str, Any]]:
+        """Per relationship type and direction: degree distribution over the nodes that have such edges."""
+        rows = []
+        for rel_type in self.relationship_types:
+            for direction in ("out", "in"):
+                degrees = self.degrees(rel_type, direction)
+                present = degrees[degrees > 0]
+                rows.append({
+                    "relationship_type": rel_type, "direction": direction, "nodes": len(present),
+                    "mean": float(present.mean()) if len(present) else 0.0,
+                    "p50": float(np.percentile(present, 50)) if len(present) else 0.0,
+                    "p95": float(np.percentile(present, 95)) if len(present) else 0.0,
+                    "max": int(present.max()) if len(present) else 0,
+                })
+        return rows
+
+    def check(self) -> GraphCheck:
+        isolated = int((self.degrees(direction="both") == 0).sum()) if self.node_ids else 0
+        return GraphCheck(
+            nodes=self.node_count(), relationships=self.relationship_count(), dangling=list(self.dangling),
+            duplicate_nodes=self.duplicate_nodes, duplicate_relationships=self.duplicate_relationships,
+            isolated_nodes=isolated,
+        )
+
+    # --- Pattern queries ---
+    def match(self, pattern: str, limit: Optional[int] = None) -> List[Dict[str, Dict[str, Any]]]:
+        """Rows of {variable: node or relationship dict} for a Cypher-like path pattern."""
+        query = parse_pattern(pattern)
+        bindings, rel_bindings = self._match(query)
+        limit = limit if limit is not None else query.limit
+        count = len(next(iter(bindings.values()))) if bindings else 0
+        if limit is not None:
+            count = min(count, limit)
+        names = query.returns or [n.var for n in query.nodes if not n.var.startswith("_")] + \
+            [r.var for r in query.rels if not r.var.startswith("_")] or [n.var for n in query.nodes]
+        rows = []
+        for row in range(count):
+            result = {}
+            for name in names:
+                if name in bindings:
+                    result[name] = self.node(int(bindings[name][row]))
+                elif name in rel_bindings:
+                    types, edges = rel_bindings[name]
+                    rel_type = self.relationship_types[types[row]]
+                    result[name] = {"type": rel_type, **self.relationship_properties[rel_type][edges[row]]}
+            rows.append(result)
+        return rows
+
+    def count(self, pattern: str) -> int:
+        bindings, _ = self._match(parse_pattern(pattern))
+        return len(next(iter(bindings.values()))) if bindings else 0
+
+    def _candidates(self, node: "_NodePattern") -> np.ndarray:
+        if node.label is None:
+            indices = np.arange(len(self.node_ids))
+        else:
+            indices = self._by_type.get(node.label, np.empty(0, dtype=np.int64))
+        return indices[self._node_mask(node, indices)]
+
+    def _node_mask(self, node: "_NodePattern", indices: np.ndarray) -> np.ndarray:
+        mask = np.ones(len(indices), dtype=bool)
+        if node.label is not None:
+            code = self.type_names.index(node.label) if node.label in self.type_names else -1
+            mask &= self.node_type[indices] == code
+        for name, value in node.properties.items():
+            if name == "id":
+                mask &= np.array([self.node_ids[i] == str(value) for i in indices], dtype=bool)
+            elif name in self.columns:
+                mask &= self.present[name][indices] & (self.columns[name][indices] == value)
+            else:
+                mask[:] = False
+        return mask
+
+    def _match(self, query: "_Pattern"):
+        first = query.nodes[0]
+        bindings: Dict[str, np.ndarray] = {first.var: self._candidates(first)}
+        rel_bindings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        previous = first.var
+        type_index = {name: i for i, name in enumerate(self.relationship_types)}
+        for rel, node in zip(query.rels, query.nodes[1:]):
+            frontier = bindings[previous]
+            owners_parts, neighbour_parts, type_parts, edge_parts = [], [], [], []
+            for rel_type in (rel.types or self.relationship_types):
+                if rel_type not in self._out:
+                    continue
+                csrs = {"out": [self._out[rel_type]], "in": [self._in[rel_type]],
+                        "both": [self._out[rel_type], self._in[rel_type]]}[rel.direction]
+                for csr in csrs:
+                    owners, neighbours, edges = _gather(csr, frontier)
+                    owners_parts.append(owners)
+                    neighbour_parts.append(neighbours)
+                    edge_parts.append(edges)
+                    type_parts.append(np.full(len(owners), type_index[rel_type], dtype=np.int32))
+            if not owners_parts:
+                owners = neighbours = edges = np.empty(0, dtype=np.int64)
+                types = np.empty(0, dtype=np.int32)
+            else:
+                owners, neighbours = np.concatenate(owners_parts), np.concatenate(neighbour_parts)
+                edges, types = np.concatenate(edge_parts), np.concatenate(type_parts)
+            if node.var in bindings: # (a)-->(b)-->(a): the variable must bind to the same node again
+                keep = neighbours == bindings[node.var][owners]
+            else:
+                keep = self._node_mask(node, neighbours)
+            for bound_types, bound_edges in rel_bindings.values(): # no relationship twice in one path
+                keep &= (bound_types[owners] != types) | (bound_edges[owners] != edges)
+            owners = owners[keep]
+            bindings = {name: values[owners] for name, values in bindings.items()}
+            rel_bindings = {name: (t[owners], e[owners]) for name, (t, e) in rel_bindings.items()}
+            bindings.setdefault(node.var, neighbours[keep])
+            rel_bindings[rel.var] = (types[keep], edges[keep])
+            previous = node.var
+        return bindings, rel_bindings
+
+
+def _property_columns(props: List[Dict[str, Any]]) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    names: Dict[str, None] = {}
+    for p in props:
+        names.update(dict.fromkeys(p))
+    columns, present = {}, {}
+    for name in names:
+        values = [p.get(name) for p in props]
+        mask = np.array([v is not None for v in values], dtype=bool)
+        kinds = {type(v) for v in values if v is not None}
+        if kinds == {bool}:
+            column = np.array([bool(v) for v in values], dtype=np.bool_)
+        elif kinds and kinds <= {int} and all(-2**63 <= v < 2**63 for v in values if v is not None):
+            column = np.array([0 if v is None else v for v in values], dtype=np.int64)
+        elif kinds and kinds <= {int, float}:
+            column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        else: # strings, lists, mixed: kept as Python objects
+            column = np.empty(len(values), dtype=object)
+            column[:] = values
+        columns[name], present[name] = column, mask
+    return columns, present
+
+
+# --- Pattern parsing ---
+@dataclass
+class _NodePattern:
+    var: str
+    label: Optional[str]
+    properties: Dict[str, Any]
+
+@dataclass
+class _RelPattern:
+    var: str
+    types: List[str]
+    direction: str # out, in, both
+
+@dataclass
+class _Pattern:
+    nodes: List[_NodePattern]
+    rels: List[_RelPattern]
+    returns: List[str]
+    limit: Optional[int]
+    path: Optional[str] = None
+
+_NODE_RE = re.compile(r"\(\s*(\w*)\s*(?::\s*(\w+))?\s*(\{[^}]*\})?\s*\)")
+_REL_RE = re.compile(r"(<)?-(?:\[\s*(\w*)\s*(?::\s*(\w+(?:\s*\|\s*:?\w+)*))?\s*\])?-(>)?")
+_SPACE_RE = re.compile(r"\s*")
+_PROP_RE = re.compile(r"(\w+)\s*:\s*('(?:[^']*)'|\"(?:[^\"]*)\"|-?\d+(?:\.\d+)?|true|false)")
+
+
+def _literal(raw: str) -> Any:
+    if raw[0] in "'\"":
+        return raw[1:-1]
+    if raw in ("true", "false"):
+        return raw == "true"
+    return float(raw) if "." in raw else int(raw)
+
+def parse_pattern(text: str) -> _Pattern:
+    """Parse `[MATCH] [p=](a:Label {k: v})-[r:TYPE|OTHER]->(b)... [RETURN a, b] [LIMIT n]`."""
+    text = text.strip().rstrip(";")
+    limit_match = re.search(r"\s+LIMIT\s+(\d+)\s*$", text, re.IGNORECASE)
+    limit = int(limit_match.group(1)) if limit_match else None
+    if limit_match:
+        text = text[:limit_match.start()]
+    returns: List[str] = []
+    return_match = re.search(r"\s+RETURN\s+(.+)$", text, re.IGNORECASE)
+    if return_match:
+        returns = [name.strip() for name in return_match.group(1).split(",")]
+        text = text[:return_match.start()]
+    text = re.sub(r"^\s*MATCH\s+", "", text, flags=re.IGNORECASE)
+    path_match = re.match(r"(\w+)\s*=\s*", text)
+    path = path_match.group(1) if path_match else None
+    if path_match:
+        text = text[path_match.end():]
+
+    nodes: List[_NodePattern] = []
+    rels: List[_RelPattern] = []
+    position = 0
+    while True:
+        # Whitespace around each node and relationship segment is free: "(w) -[:T]-> (f)".
+        position = _SPACE_RE.match(text, position).end()
+        node_match = _NODE_RE.match(text, position)
+        if not node_match:
+            raise ValueError(f"Expected a node pattern like (n:Label) at: {text[position:]!r}")
+        var, label, props = node_match.groups()
+        nodes.append(_NodePattern(var or f"_n{len(nodes)}", label,
+                                  {k: _literal(v) for k, v in _PROP_RE.findall(props or "")}))
+        position = _SPACE_RE.match(text, node_match.end()).end()
+        if position >= len(text):
+            break
+        rel_match = _REL_RE.match(text, position)
+        if not rel_match:
+            raise ValueError(f"Expected a relationship like -[:TYPE]-> at: {text[position:]!r}")
+        left, rel_var, types, right = rel_match.groups()
+        if left and right:
+            raise ValueError("A relationship can't point both ways.")
+        rels.append(_RelPattern(
+            rel_var or f"_r{len(rels)}",
+            [t.strip().lstrip(":") for t in types.split("|")] if types else [],
+            "in" if left else "out" if right else "both",
+        ))
+        position = rel_match.end()
+    # RETURN p expands to the whole path in order, anonymous elements included; RETURN * means "everything named".
+    elements = [nodes[0].var] + [var for rel, node in zip(rels, nodes[1:]) for var in (rel.var, node.var)]
+    expanded: List[str] = []
+    for name in returns:
+        if name == path:
+            expanded.extend(elements)
+        elif name in elements:
+            expanded.append(name)
+        elif name != "*":
+            raise ValueError(f"RETURN {name!r}: only variables bound in the pattern can be returned.")
+    return _Pattern(nodes, rels, list(dict.fromkeys(expanded)), limit, path)
@@ -0,0 +1,309 @@
+# utils/graph_store.py
+# Columnar local copy of everything the pipeline validated: Parquet part files queried with DuckDB.
+# Dashboards aggregate from here (milliseconds on millions of rows) instead of sending MATCH
+# scans to Neo4j on every Streamlit rerun.
+#
+# Layout under root/:
+#   nodes/part-<run>-<n>.parquet          id, type, run_id, ingested_at, one typed column per
+#                                         model-specific field (total_depth_m, discovery_year, ...),
+#                                         attributes_json for everything else
+#   relationships/part-<run>-<n>.parquet  endpoints, relationship_type, run_id, ingested_at, properties_json
+#   ingests/<run>.parquet                 one row per finished ingest run (counts, duration)
+#   VERSION                               bumped when a run finishes; cache key for readers
+#
+# The same element may be written by several runs; the nodes/relationships views keep the latest.
+# Parts are written under a temporary name and renamed, so readers never see a half-written file.
+# Once a directory holds more than compact_parts files, the run that finishes rewrites it into one
+# deduplicated part (GraphStore.compact), so views scan a few large files instead of many small ones.
+import json
+import os
+import threading
+import time
+import typing
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from utils.extraction_cache import DEFAULT_CACHE_DIR
+from utils.kg_models import BaseNode, KnowledgeGraphData, NODE_MODELS
+
+DEFAULT_STORE_DIR = Path(DEFAULT_CACHE_DIR) / "graph_store"
+DEFAULT_COMPACT_PARTS = 64
+COMPACT_LOCK_STALE_S = 600.0 # a lock older than this was left behind by a crashed compaction
+
+
+def _arrow_type(annotation):
+    import pyarrow as pa
+
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    python_type = args[0] if args else annotation
+    if python_type is float:
+        return pa.float64()
+    if python_type is int:
+        return pa.int64()
+    return pa.string()
+
+def node_columns() -> Dict[str, Any]:
+    """Model-specific node fields that get their own typed Parquet column."""
+    columns: Dict[str, Any] = {}
+    for model in NODE_MODELS.values():
+        for name, info in model.model_fields.items():
+            if name not in BaseNode.model_fields and name not in columns:
+                columns[name] = _arrow_type(info.annotation)
+    return columns
+
+
+class StoreWriter:
+    """Appends validated batches of one ingest run; close() records the run and publishes it."""
+
+    def __init__(self, store: "GraphStore", source: str):
+        self.store = store
+        self.source = source
+        self.run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        self.started_at = datetime.now(timezone.utc)
+        self.nodes = 0
+        self.relationships = 0
+        self._parts = 0
+        self._lock = threading.Lock()
+        self._columns = node_columns()
+
+    def write(self, kg_data: KnowledgeGraphData):
+        import pyarrow as pa
+        from utils.neo4j_uploader import node_properties, relationship_properties
+
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            part = self._parts
+            self._parts += 1
+        if kg_data.nodes:
+            columns: Dict[str, List[Any]] = {name: [] for name in self._columns}
+            attributes = []
+            for node in kg_data.nodes:
+                props = node_properties(node)
+                for name in self._columns:
+                    columns[name].append(props.pop(name, None))
+                attributes.append(json.dumps(props, default=str) if props else None)
+            table = pa.table({
+                "id": pa.array([node.id for node in kg_data.nodes], pa.string()),
+                "type": pa.array([node.type for node in kg_data.nodes], pa.string()),
+                "run_id": pa.array([self.run_id] * len(kg_data.nodes), pa.string()),
+                "ingested_at": pa.array([now] * len(kg_data.nodes), pa.timestamp("us", tz="UTC")),
+                **{name: pa.array(_coerce(values, arrow_type), arrow_type) for (name, arrow_type), values
+                   in zip(self._columns.items(), columns.values())},
+                "attributes_json": pa.array(attributes, pa.string()),
+            })
+            _write_part(table, self.store.root / "nodes" / f"part-{self.run_id}-{part:05d}.parquet")
+        if kg_data.relationships:
+            rels = kg_data.relationships
+            props = [relationship_properties(rel) for rel in rels]
+            table = pa.table({
+                "source_id": pa.array([rel.source_id for rel in rels], pa.string()),
+                "source_type": pa.array([rel.source_type for rel in rels], pa.string()),
+                "relationship_type": pa.array([rel.relationship_type for rel in rels], pa.string()),
+                "target_id": pa.array([rel.target_id for rel in rels], pa.string()),
+                "target_type": pa.array([rel.target_type for rel in rels], pa.string()),
+                "run_id": pa.array([self.run_id] * len(rels), pa.string()),
+                "ingested_at": pa.array([now] * len(rels), pa.timestamp("us", tz="UTC")),
+                "properties_json": pa.array([json.dumps(p, default=str) if p else None for p in props], pa.string()),
+            })
+            _write_part(table, self.store.root / "relationships" / f"part-{self.run_id}-{part:05d}.parquet")
+        with self._lock:
+            self.nodes += len(kg_data.nodes)
+            self.relationships += len(kg_data.relationships)
+
+    def close(self):
+        import pyarrow as pa
+
+        finished_at = datetime.now(timezone.utc)
+        table = pa.table({
+            "run_id": [self.run_id], "source": [self.source],
+            "started_at": pa.array([self.started_at], pa.timestamp("us", tz="UTC")),
+            "finished_at": pa.array([finished_at], pa.timestamp("us", tz="UTC")),
+            "nodes": pa.array([self.nodes], pa.int64()), "relationships": pa.array([self.relationships], pa.int64()),
+            "seconds": [(finished_at - self.started_at).total_seconds()],
+        })
+        _write_part(table, self.store.root / "ingests" / f"{self.run_id}.parquet")
+        self.store.bump_version()
+        self.store.compact_if_needed()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Batches already written stay queryable even when the run failed part-way.
+        self.close()
+        return False
+
+
+def _write_part(table, path: Path):
+    import pyarrow.parquet as pq
+
+    tmp = path.with_name(path.name + ".tmp") # not matched by the *.parquet globs until renamed
+    pq.write_table(table, tmp)
+    tmp.replace(path)
+
+def _sql_string(path: Path) -> str:
+    return "'" + str(path).replace("'", "''") + "'"
+
+def _coerce(values: List[Any], arrow_type) -> List[Any]:
+    # LLM output is loosely typed ("3000" for a float column); unparseable values become null.
+    import pyarrow as pa
+
+    if arrow_type == pa.string():
+        return [None if v is None else str(v) for v in values]
+    cast = float if arrow_type == pa.float64() else int
+    coerced = []
+    for value in values:
+        try:
+            coerced.append(None if value is None else cast(value))
+        except (TypeError, ValueError):
+            coerced.append(None)
+    return coerced
+
+
+_EMPTY_SCHEMAS = {
+    "nodes": "SELECT NULL::VARCHAR AS id, NULL::VARCHAR AS type, NULL::VARCHAR AS run_id, "
+             "NULL::TIMESTAMPTZ AS ingested_at, NULL::DOUBLE AS total_depth_m, NULL::VARCHAR AS attributes_json",
+    "relationships": "SELECT NULL::VARCHAR AS source_id, NULL::VARCHAR AS source_type, NULL::VARCHAR AS relationship_type, "
+                     "NULL::VARCHAR AS target_id, NULL::VARCHAR AS target_type, NULL::VARCHAR AS run_id, "
+                     "NULL::TIMESTAMPTZ AS ingested_at, NULL::VARCHAR AS properties_json",
+    "ingests": "SELECT NULL::VARCHAR AS run_id, NULL::VARCHAR AS source, NULL::TIMESTAMPTZ AS started_at, "
+               "NULL::TIMESTAMPTZ AS finished_at, NULL::BIGINT AS nodes, NULL::BIGINT AS relationships, NULL::DOUBLE AS seconds",
+}
+
+
+# Latest version of each element; aggregates that only count distinct keys can skip this and use *_rows.
+_LATEST = {
+    "nodes": "QUALIFY row_number() OVER (PARTITION BY type, id ORDER BY ingested_at DESC) = 1",
+    "relationships": "QUALIFY row_number() OVER ("
+                     "PARTITION BY source_type, source_id, relationship_type, target_type, target_id ORDER BY ingested_at DESC) = 1",
+    "ingests": "",
+}
+
+
+class GraphStore:
+    def __init__(self, root: Union[str, Path, None] = None, compact_parts: int = DEFAULT_COMPACT_PARTS):
+        self.root = Path(root) if root is not None else DEFAULT_STORE_DIR
+        self.compact_parts = compact_parts # 0 turns automatic compaction off
+        for sub in ("nodes", "relationships", "ingests"):
+            (self.root / sub).mkdir(parents=True, exist_ok=True)
+
+    def writer(self, source: str = "") -> StoreWriter:
+        return StoreWriter(self, source)
+
+    def version(self) -> str:
+        path = self.root / "VERSION"
+        return path.read_text().strip() if path.exists() else "0"
+
+    def bump_version(self):
+        # Written via rename so a reader never sees a half-written file.
+        tmp = self.root / f"VERSION.{uuid.uuid4().hex}"
+        tmp.write_text(f"{time.time_ns()}")
+        tmp.replace(self.root / "VERSION")
+
+    def _has_parts(self, sub: str) -> bool:
+        return any((self.root / sub).glob("*.parquet"))
+
+    def connect(self):
+        """A DuckDB connection with nodes, relationships and ingests views over the Parquet parts."""
+        import duckdb
+
+        con = duckdb.connect()
+        for view, sub in (("node_rows", "nodes"), ("relationship_rows", "relationships"), ("ingests", "ingests")):
+            if self._has_parts(sub):
+                pattern = _sql_string(self.root / sub / "*.parquet")
+                con.execute(f"CREATE VIEW {view} AS SELECT * FROM read_parquet({pattern}, union_by_name = true)")
+            else:
+                con.execute(f"CREATE VIEW {view} AS SELECT * FROM ({_EMPTY_SCHEMAS[sub]}) WHERE false")
+        con.execute(f"CREATE VIEW nodes AS SELECT * FROM node_rows {_LATEST['nodes']}")
+        con.execute(f"CREATE VIEW relationships AS SELECT * FROM relationship_rows {_LATEST['relationships']}")
+        return con
+
+    def query(self, sql: str, params: Optional[List[Any]] = None):
+        """Run SQL against the views and return a pandas DataFrame."""
+        con = self.connect()
+        try:
+            return con.execute(sql, params or []).df()
+        finally:
+            con.close()
+
+    # --- Dashboard aggregates ---
+    def counts_by_type(self):
+        return self.query("SELECT type, count(DISTINCT id) AS nodes FROM node_rows GROUP BY type ORDER BY nodes DESC")
+
+    def wells_per_field(self, limit: int = 50):
+        return self.query(
+            "SELECT target_id AS field, count(DISTINCT source_id) AS wells FROM relationship_rows "
+            "WHERE relationship_type = 'IS_IN_FIELD' AND source_type = 'Well' AND target_type = 'Field' "
+            "GROUP BY field ORDER BY wells DESC, field LIMIT ?", [limit],
+        )
+
+    def operators_per_license(self, limit: int = 50):
+        return self.query(
+            "SELECT source_id AS license, count(DISTINCT target_id) AS operators, "
+            "string_agg(DISTINCT target_id, ', ') AS operated_by FROM relationship_rows "
+            "WHERE relationship_type = 'OPERATED_BY' AND source_type = 'License' "
+            "GROUP BY license ORDER BY operators DESC, license LIMIT ?", [limit],
+        )
+
+    def depth_distribution(self, bin_m: float = 500.0):
+        return self.query(
+            "SELECT floor(total_depth_m / ?) * ? AS depth_m, count(*) AS wells FROM nodes "
+            "WHERE type = 'Well' AND total_depth_m IS NOT NULL GROUP BY depth_m ORDER BY depth_m", [bin_m, bin_m],
+        )
+
+    def ingest_throughput(self):
+        return self.query(
+            "SELECT finished_at, source, nodes, relationships, seconds, "
+            "(nodes + relationships) / nullif(seconds, 0) AS elements_per_sec FROM ingests ORDER BY finished_at"
+        )
+
+    def part_count(self) -> int:
+        """Part files in the most fragmented of nodes/, relationships/ and ingests/."""
+        return max(sum(1 for _ in (self.root / sub).glob("*.parquet")) for sub in _LATEST)
+
+    def compact_if_needed(self) -> bool:
+        if self.compact_parts and self.part_count() > self.compact_parts:
+            return self.compact()
+        return False
+
+    def compact(self) -> bool:
+        """Rewrite each directory into one deduplicated file (keeps queries fast after many runs).
+
+        Only the parts present when it starts are merged and removed, so a run writing meanwhile loses
+        nothing. Returns False without doing anything if another process is already compacting.
+        """
+        import duckdb
+
+        lock = self.root / ".compact.lock"
+        try:
+            if time.time() - lock.stat().st_mtime > COMPACT_LOCK_STALE_S:
+                lock.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        con = duckdb.connect()
+        try:
+            for sub, latest in _LATEST.items():
+                old = sorted((self.root / sub).glob("*.parquet"))
+                if len(old) < 2:
+                    continue
+                files = ", ".join(_sql_string(path) for path in old)
+                target = self.root / sub / f"part-compacted-{uuid.uuid4().hex[:8]}.parquet"
+                tmp = target.with_name(target.name + ".tmp")
+                con.execute(
+                    f"COPY (SELECT * FROM read_parquet([{files}], union_by_name = true) {latest}) "
+                    f"TO {_sql_string(tmp)} (FORMAT PARQUET)"
+                )
+                tmp.replace(target)
+                for path in old:
+                    path.unlink()
+        finally:
+            con.close()
+            lock.unlink(missing_ok=True)
+        self.bump_version()
+        return True
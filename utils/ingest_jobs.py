@@ -0,0 +1,298 @@
+# utils/ingest_jobs.py
+# Crash-safe, resumable Neo4j ingests. A job splits a validated graph into numbered batches (all
+# node batches first, then relationships, as the uploader's MATCH needs) and stores them in a
+# local SQLite file together with a checkpoint of which batches were committed. Running a job
+# uploads the uncommitted batches in order and records each one as soon as Neo4j has it, so
+# after a crash, a dropped connection or a Streamlit session reset the job resumes from the
+# first uncommitted batch instead of from scratch.
+#
+# A batch committed to Neo4j but not yet checkpointed (crash in between) is simply sent again:
+# every write is a MERGE, so replaying it is harmless (at-least-once delivery, idempotent writes).
+# Credentials are never stored; whoever resumes a job passes in an uploader, and job_writer()
+# wraps it the way the job was started (plain upload, or a DeltaSyncer on the stored sync graph).
+#
+# JobWorker runs jobs on a background thread, so the UI can poll JobStore.get() for progress.
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from utils import metrics
+from utils.delta_sync import DeltaSyncer, SyncManifest
+from utils.extraction_cache import DEFAULT_CACHE_DIR
+from utils.kg_models import BaseNode, KnowledgeGraphData, NODE_MODELS, Relationship
+from utils.neo4j_uploader import DEFAULT_BATCH_SIZE, UploadStats
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+UPLOAD, DELTA = "upload", "delta" # writer kinds
+
+
+@dataclass
+class IngestJob:
+    job_id: str
+    source: str
+    target: str
+    status: str
+    total_batches: int
+    committed_batches: int
+    nodes: int # written so far
+    relationships: int
+    skipped_relationships: int
+    created_at: float
+    updated_at: float
+    error: Optional[str] = None
+    writer: str = UPLOAD
+    sync_graph: Optional[str] = None # the DeltaSyncer graph of a DELTA job
+    batch_size: Optional[int] = None # what the job was split with; run_job uploads with it too
+
+    @property
+    def progress(self) -> float:
+        return self.committed_batches / self.total_batches if self.total_batches else 1.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status == DONE
+
+
+def _encode(kg_data: KnowledgeGraphData) -> bytes:
+    payload = {"nodes": [node.model_dump(mode="json") for node in kg_data.nodes],
+               "relationships": [rel.model_dump(mode="json") for rel in kg_data.relationships]}
+    return zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"), 1)
+
+def _decode(blob: bytes) -> KnowledgeGraphData:
+    payload = json.loads(zlib.decompress(blob))
+    return KnowledgeGraphData.model_construct(
+        nodes=[NODE_MODELS.get(node["type"], BaseNode).model_validate(node) for node in payload["nodes"]],
+        relationships=[Relationship.model_validate(rel) for rel in payload["relationships"]],
+    )
+
+
+class JobStore:
+    """Jobs, their batches and the committed-batch checkpoint, in one SQLite file."""
+
+    def __init__(self, path: Union[str, Path, None] = None):
+        self.path = Path(path) if path is not None else Path(DEFAULT_CACHE_DIR) / "ingest_jobs.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL") # WAL keeps committed checkpoints across a process crash
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, source TEXT NOT NULL, target TEXT NOT NULL, status TEXT NOT NULL,"
+            " total_batches INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, error TEXT,"
+            f" writer TEXT NOT NULL DEFAULT '{UPLOAD}', sync_graph TEXT, batch_size INTEGER)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, definition in (("writer", f"TEXT NOT NULL DEFAULT '{UPLOAD}'"), ("sync_graph", "TEXT"),
+                                   ("batch_size", "INTEGER")):
+            if column not in columns: # job file written before the column existed
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS batches ("
+            " job_id TEXT NOT NULL, batch_no INTEGER NOT NULL, payload BLOB NOT NULL, committed_at REAL,"
+            " nodes INTEGER NOT NULL DEFAULT 0, relationships INTEGER NOT NULL DEFAULT 0,"
+            " skipped_relationships INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (job_id, batch_no))"
+        )
+
+    def create(self, kg_data: KnowledgeGraphData, source: str = "", target: str = "",
+               batch_size: int = DEFAULT_BATCH_SIZE, sync_graph: Optional[str] = None) -> str:
+        """Split kg_data into numbered batches and store them as a new queued job; returns its id.
+
+        With sync_graph the job is a DELTA job: job_writer() runs it through a DeltaSyncer on that graph.
+        """
+        batches = [KnowledgeGraphData.model_construct(nodes=kg_data.nodes[start:start + batch_size], relationships=[])
+                   for start in range(0, len(kg_data.nodes), batch_size)]
+        batches += [KnowledgeGraphData.model_construct(nodes=[], relationships=kg_data.relationships[start:start + batch_size])
+                    for start in range(0, len(kg_data.relationships), batch_size)]
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (job_id, source, target, status, total_batches, created_at, updated_at, writer,"
+                    " sync_graph, batch_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, source, target, QUEUED, len(batches), now, now, DELTA if sync_graph else UPLOAD,
+                     sync_graph, batch_size),
+                )
+                self._conn.executemany(
+                    "INSERT INTO batches (job_id, batch_no, payload) VALUES (?, ?, ?)",
+                    ((job_id, batch_no, _encode(batch)) for batch_no, batch in enumerate(batches)),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        metrics.inc("ingest_jobs_created_total")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        jobs = self._jobs("j.job_id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def list(self, limit: int = 50) -> List[IngestJob]:
+        return self._jobs("1", (), f"ORDER BY j.created_at DESC LIMIT {int(limit)}")
+
+    def unfinished(self) -> List[IngestJob]:
+        """Jobs with batches left to commit, oldest first (a 'running' one may belong to a crashed process)."""
+        return self._jobs("j.status != ?", (DONE,), "ORDER BY j.created_at")
+
+    def _jobs(self, where: str, params: tuple, tail: str = "") -> List[IngestJob]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT j.job_id, j.source, j.target, j.status, j.total_batches,"
+                " COUNT(b.committed_at), COALESCE(SUM(b.nodes), 0), COALESCE(SUM(b.relationships), 0),"
+                " COALESCE(SUM(b.skipped_relationships), 0), j.created_at, j.updated_at, j.error, j.writer, j.sync_graph, j.batch_size"
+                " FROM jobs j LEFT JOIN batches b ON b.job_id = j.job_id"
+                f" WHERE {where} GROUP BY j.job_id {tail}", params,
+            ).fetchall()
+        return [IngestJob(*row) for row in rows]
+
+    def pending_batches(self, job_id: str) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT batch_no FROM batches WHERE job_id = ? AND committed_at IS NULL ORDER BY batch_no", (job_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def load_batch(self, job_id: str, batch_no: int) -> KnowledgeGraphData:
+        with self._lock:
+            blob = self._conn.execute(
+                "SELECT payload FROM batches WHERE job_id = ? AND batch_no = ?", (job_id, batch_no)
+            ).fetchone()[0]
+        return _decode(blob)
+
+    def load_graph(self, job_id: str) -> KnowledgeGraphData:
+        """All of the job's batches joined back into one graph (e.g. for the local graph store once it's done)."""
+        nodes: List[BaseNode] = []
+        relationships: List[Relationship] = []
+        with self._lock:
+            blobs = [row[0] for row in self._conn.execute(
+                "SELECT payload FROM batches WHERE job_id = ? ORDER BY batch_no", (job_id,)
+            )]
+        for blob in blobs:
+            batch = _decode(blob)
+            nodes.extend(batch.nodes)
+            relationships.extend(batch.relationships)
+        return KnowledgeGraphData.model_construct(nodes=nodes, relationships=relationships)
+
+    def commit_batch(self, job_id: str, batch_no: int, stats: UploadStats):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE batches SET committed_at = ?, nodes = ?, relationships = ?, skipped_relationships = ?"
+                " WHERE job_id = ? AND batch_no = ?",
+                (time.time(), stats.nodes, stats.relationships, stats.skipped_relationships, job_id, batch_no),
+            )
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                               (status, error, time.time(), job_id))
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM batches WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def job_writer(job: IngestJob, uploader, manifest: Optional[SyncManifest] = None):
+    """The writer job was started with: uploader itself, or a DeltaSyncer over it for a DELTA job."""
+    if job.writer == DELTA:
+        return DeltaSyncer(uploader, manifest if manifest is not None else SyncManifest(), job.sync_graph)
+    return uploader
+
+def run_job(store: JobStore, job_id: str, writer, cancel: Optional[threading.Event] = None,
+            **upload_kwargs: Any) -> IngestJob:
+    """Upload the job's uncommitted batches in order, checkpointing each one; safe to call again after a failure.
+
+    Unless upload_kwargs says otherwise, batches are uploaded with the batch size the job was created with.
+    """
+    job = store.get(job_id)
+    if job is not None and job.batch_size:
+        upload_kwargs.setdefault("batch_size", job.batch_size)
+    store.set_status(job_id, RUNNING)
+    try:
+        for batch_no in store.pending_batches(job_id):
+            if cancel is not None and cancel.is_set():
+                store.set_status(job_id, CANCELLED)
+                return store.get(job_id)
+            with metrics.timer("ingest_job_batch_seconds"):
+                stats = writer.upload_kg_data(store.load_batch(job_id, batch_no), **upload_kwargs)
+            store.commit_batch(job_id, batch_no, stats)
+            metrics.inc("ingest_job_batches_committed_total")
+    except Exception as e:
+        logger.warning("Ingest job %s stopped: %s (resume picks up from the last committed batch)", job_id, e)
+        store.set_status(job_id, FAILED, error=str(e))
+        metrics.inc("ingest_jobs_failed_total")
+        raise
+    store.set_status(job_id, DONE)
+    return store.get(job_id)
+
+
+class JobWorker:
+    """Runs jobs one at a time on a background thread; one per process (see utils.resources.get_job_worker)."""
+
+    def __init__(self, store: Optional[JobStore] = None):
+        self.store = store or JobStore()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-job")
+        self._lock = threading.Lock()
+        self._active: Dict[str, threading.Event] = {} # queued or running here -> cancel flag
+
+    def submit(self, job_id: str, writer, on_done=None, lease=None, **upload_kwargs: Any) -> Future:
+        """Queue job_id (new or unfinished); on_done(job) is called after it finishes successfully.
+
+        lease (a DriverLease for the writer's driver) is held while the job is queued and running and
+        released when it ends, so the registry can't close the driver under a long job. If submit()
+        raises, the lease stays with the caller.
+        """
+        with self._lock:
+            if job_id in self._active:
+                raise ValueError(f"Ingest job {job_id} is already queued or running.")
+            cancel = self._active[job_id] = threading.Event()
+        return self._pool.submit(self._run, job_id, writer, cancel, on_done, lease, upload_kwargs)
+
+    def _run(self, job_id: str, writer, cancel: threading.Event, on_done, lease,
+             upload_kwargs: Dict[str, Any]) -> IngestJob:
+        try:
+            job = run_job(self.store, job_id, writer, cancel, **upload_kwargs)
+            if on_done is not None and job.finished:
+                on_done(job)
+            return job
+        finally:
+            with self._lock:
+                self._active.pop(job_id, None)
+            if lease is not None:
+                lease.release()
+
+    def is_active(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._active
+
+    def cancel(self, job_id: str) -> bool:
+        """Stop job_id after its current batch; False if it isn't queued or running here."""
+        with self._lock:
+            cancel = self._active.get(job_id)
+        if cancel is None:
+            return False
+        cancel.set()
+        return True
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            for cancel in self._active.values():
+                cancel.set()
+        self._pool.shutdown(wait=wait)
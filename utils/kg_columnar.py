@@ -0,0 +1,206 @@
+# utils/kg_columnar.py
+# Array-backed alternative to KnowledgeGraphData for large graphs kept in memory (session state,
+# previews, batch uploads). A list of Pydantic models costs ~1-2 KB per element; here:
+#
+#   nodes          node_ids (Arrow strings), node_type (int16 codes into type_names),
+#                  one Arrow column per model-specific field (total_depth_m, discovery_year, ...)
+#   relationships  rel_source / rel_target (int32 node indices), rel_type (int16 codes): the
+#                  source/target types are the endpoint nodes' types, so nothing is repeated
+#   free-form      attributes and relationship properties as sparse (row, key code, JSON value)
+#                  side tables, sorted by row
+#
+# Relationship endpoints that aren't among the nodes get a "phantom" node row after the real ones
+# (never returned as a node), so a round trip through to_kg_data() gives back exactly what went in.
+# Pydantic models are only built at the edges: node(i), page_nodes(), iter_batches(), to_kg_data().
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from utils.graph_store import node_columns
+from utils.kg_models import BaseNode, KnowledgeGraphData, NODE_MODELS, Relationship
+
+
+class _SideTable:
+    """Sparse free-form key/value pairs per row: (row, key code, JSON value), sorted by row."""
+
+    def __init__(self, rows: List[int], keys: List[int], values: List[str], key_names: List[str]):
+        self.rows = np.array(rows, dtype=np.int32)
+        self.keys = np.array(keys, dtype=np.int16 if len(key_names) < 2 ** 15 else np.int32)
+        self.values = pa.array(values, pa.string())
+        self.key_names = key_names
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.keys.nbytes + self.values.nbytes
+
+    def dicts(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        """Decoded dicts for rows start..stop-1."""
+        out: List[Dict[str, Any]] = [{} for _ in range(stop - start)]
+        lo, hi = np.searchsorted(self.rows, [start, stop])
+        values = self.values.slice(lo, hi - lo).to_pylist()
+        for row, key, value in zip(self.rows[lo:hi].tolist(), self.keys[lo:hi].tolist(), values):
+            out[row - start][self.key_names[key]] = json.loads(value)
+        return out
+
+
+class ColumnarGraphData:
+    def __init__(self):
+        self.type_names: List[str] = []
+        self.node_ids = pa.array([], pa.string())
+        self.node_type = np.empty(0, dtype=np.int16)
+        self.real_nodes = 0 # rows from here on are phantom endpoints
+        self.columns: Dict[str, pa.Array] = {}
+        self.attributes = _SideTable([], [], [], [])
+        self.relationship_types: List[str] = []
+        self.rel_source = np.empty(0, dtype=np.int32)
+        self.rel_target = np.empty(0, dtype=np.int32)
+        self.rel_type = np.empty(0, dtype=np.int16)
+        self.properties = _SideTable([], [], [], [])
+
+    # --- Conversion ---
+    @classmethod
+    def from_kg_data(cls, kg_data: KnowledgeGraphData) -> "ColumnarGraphData":
+        data = cls()
+        typed = node_columns()
+        type_codes: Dict[str, int] = {}
+        index: Dict[Tuple[str, str], int] = {}
+        ids: List[str] = []
+        codes: List[int] = []
+        values: Dict[str, List[Any]] = {name: [] for name in typed}
+        attr_rows: List[int] = []
+        attr_keys: List[int] = []
+        attr_values: List[str] = []
+        attr_codes: Dict[str, int] = {}
+        for row, node in enumerate(kg_data.nodes):
+            index.setdefault((node.type, node.id), row) # the uploader MERGEs duplicates into the first
+            ids.append(node.id)
+            codes.append(type_codes.setdefault(node.type, len(type_codes)))
+            fields = node.__dict__
+            for name, column in values.items():
+                column.append(fields.get(name))
+            for key, value in node.attributes.items():
+                attr_rows.append(row)
+                attr_keys.append(attr_codes.setdefault(key, len(attr_codes)))
+                attr_values.append(json.dumps(value, default=str))
+        data.real_nodes = len(ids)
+
+        def endpoint(node_type: str, node_id: str) -> int:
+            row = index.get((node_type, node_id))
+            if row is None: # dangling: phantom row so the relationship keeps its endpoint
+                row = index[(node_type, node_id)] = len(ids)
+                ids.append(node_id)
+                codes.append(type_codes.setdefault(node_type, len(type_codes)))
+                for column in values.values():
+                    column.append(None)
+            return row
+
+        rel_codes: Dict[str, int] = {}
+        sources: List[int] = []
+        targets: List[int] = []
+        rel_types: List[int] = []
+        prop_rows: List[int] = []
+        prop_keys: List[int] = []
+        prop_values: List[str] = []
+        prop_codes: Dict[str, int] = {}
+        for row, rel in enumerate(kg_data.relationships):
+            sources.append(endpoint(rel.source_type, rel.source_id))
+            targets.append(endpoint(rel.target_type, rel.target_id))
+            rel_types.append(rel_codes.setdefault(rel.relationship_type, len(rel_codes)))
+            for key, value in rel.properties.items():
+                prop_rows.append(row)
+                prop_keys.append(prop_codes.setdefault(key, len(prop_codes)))
+                prop_values.append(json.dumps(value, default=str))
+
+        data.type_names = list(type_codes)
+        data.node_ids = pa.array(ids, pa.string())
+        data.node_type = np.array(codes, dtype=np.int16)
+        # Columns nobody uses stay out entirely (all-null Arrow arrays still cost a validity bitmap).
+        data.columns = {name: pa.array(column, arrow_type) for (name, arrow_type), column
+                        in zip(typed.items(), values.values()) if any(v is not None for v in column)}
+        data.attributes = _SideTable(attr_rows, attr_keys, attr_values, list(attr_codes))
+        data.relationship_types = list(rel_codes)
+        data.rel_source = np.array(sources, dtype=np.int32)
+        data.rel_target = np.array(targets, dtype=np.int32)
+        data.rel_type = np.array(rel_types, dtype=np.int16)
+        data.properties = _SideTable(prop_rows, prop_keys, prop_values, list(prop_codes))
+        return data
+
+    def to_kg_data(self) -> KnowledgeGraphData:
+        return KnowledgeGraphData.model_construct(
+            nodes=self.page_nodes(0, self.node_count()),
+            relationships=self.page_relationships(0, self.relationship_count()),
+        )
+
+    # --- Access ---
+    def node_count(self) -> int:
+        return self.real_nodes
+
+    def relationship_count(self) -> int:
+        return int(len(self.rel_type))
+
+    def node(self, i: int) -> BaseNode:
+        return self.page_nodes(i, i + 1)[0]
+
+    def relationship(self, i: int) -> Relationship:
+        return self.page_relationships(i, i + 1)[0]
+
+    def page_nodes(self, start: int, stop: int) -> List[BaseNode]:
+        """Nodes start..stop-1 as Pydantic models (built with model_construct: the data was validated on the way in)."""
+        stop = min(stop, self.node_count())
+        if start >= stop:
+            return []
+        ids = self.node_ids.slice(start, stop - start).to_pylist()
+        codes = self.node_type[start:stop].tolist()
+        columns = {name: column.slice(start, stop - start).to_pylist() for name, column in self.columns.items()}
+        attributes = self.attributes.dicts(start, stop)
+        nodes = []
+        for offset, (node_id, code) in enumerate(zip(ids, codes)):
+            node_type = self.type_names[code]
+            model = NODE_MODELS.get(node_type, BaseNode)
+            fields = {name: values[offset] for name, values in columns.items()
+                      if values[offset] is not None and name in model.model_fields}
+            nodes.append(model.model_construct(id=node_id, type=node_type, attributes=attributes[offset], **fields))
+        return nodes
+
+    def page_relationships(self, start: int, stop: int) -> List[Relationship]:
+        stop = min(stop, self.relationship_count())
+        if start >= stop:
+            return []
+        sources, targets = self.rel_source[start:stop], self.rel_target[start:stop]
+        source_ids = self.node_ids.take(pa.array(sources)).to_pylist()
+        target_ids = self.node_ids.take(pa.array(targets)).to_pylist()
+        source_types = self.node_type[sources].tolist()
+        target_types = self.node_type[targets].tolist()
+        properties = self.properties.dicts(start, stop)
+        return [
+            Relationship.model_construct(
+                source_id=source_ids[offset], source_type=self.type_names[source_types[offset]],
+                target_id=target_ids[offset], target_type=self.type_names[target_types[offset]],
+                relationship_type=self.relationship_types[code], properties=properties[offset],
+            )
+            for offset, code in enumerate(self.rel_type[start:stop].tolist())
+        ]
+
+    def iter_batches(self, batch_size: int) -> Iterator[KnowledgeGraphData]:
+        """Bounded KnowledgeGraphData batches, all nodes first (what the uploader's MATCH needs)."""
+        for start in range(0, self.node_count(), batch_size):
+            yield KnowledgeGraphData.model_construct(nodes=self.page_nodes(start, start + batch_size), relationships=[])
+        for start in range(0, self.relationship_count(), batch_size):
+            yield KnowledgeGraphData.model_construct(nodes=[], relationships=self.page_relationships(start, start + batch_size))
+
+    def type_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.node_type[:self.real_nodes], minlength=len(self.type_names))
+        return {name: int(count) for name, count in zip(self.type_names, counts) if count}
+
+    def relationship_type_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.rel_type, minlength=len(self.relationship_types))
+        return {name: int(count) for name, count in zip(self.relationship_types, counts)}
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the arrays (the small name lists aside)."""
+        return (self.node_ids.nbytes + self.node_type.nbytes
+                + sum(column.nbytes for column in self.columns.values()) + self.attributes.nbytes
+                + self.rel_source.nbytes + self.rel_target.nbytes + self.rel_type.nbytes + self.properties.nbytes)
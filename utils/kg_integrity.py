@@ -0,0 +1,146 @@
+# utils/kg_integrity.py
+# Referential-integrity pass over validated KnowledgeGraphData, run before upload.
+#
+# Neo4jUploader MATCHes both endpoints before MERGEing a relationship, so a relationship whose
+# source/target isn't in the graph (dangling) or is given the wrong label (mistyped: the id exists,
+# but under another type) is dropped by the database after a wasted round trip. This pass finds
+# them with one (type, id) hash index built over the nodes, O(1) per relationship, collapses
+# duplicate edges the way MERGE would, and optionally repairs what it can:
+#   create_stubs   add a placeholder node (attributes {"stub": True}) for each missing endpoint
+#   repair_types   point a mistyped endpoint at the only type that id exists under
+# Whatever can't be repaired is left out of the returned graph, so upload counts stay honest.
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils import metrics
+from utils.kg_models import BaseNode, KnowledgeGraphData, NODE_MODELS, Relationship
+
+NodeKey = Tuple[str, str] # (type, id)
+
+
+@dataclass
+class Mistyped:
+    relationship: Relationship
+    side: str # "source" or "target"
+    actual_types: List[str]
+
+
+@dataclass
+class IntegrityReport:
+    relationships: int = 0 # checked
+    dangling: List[Relationship] = field(default_factory=list)
+    mistyped: List[Mistyped] = field(default_factory=list)
+    duplicate_relationships: int = 0
+    stub_nodes: List[BaseNode] = field(default_factory=list)
+    repaired: int = 0 # endpoints re-typed
+    dropped: int = 0 # relationships left out of the returned graph
+
+    @property
+    def ok(self) -> bool:
+        return not (self.dangling or self.mistyped or self.duplicate_relationships)
+
+    def summary(self) -> str:
+        return (
+            f"{self.relationships} relationships checked: {len(self.dangling)} dangling, {len(self.mistyped)} mistyped, "
+            f"{self.duplicate_relationships} duplicates; {len(self.stub_nodes)} stub nodes created, "
+            f"{self.repaired} endpoints re-typed, {self.dropped} relationships dropped"
+        )
+
+    def add(self, other: "IntegrityReport"):
+        self.relationships += other.relationships
+        self.dangling.extend(other.dangling)
+        self.mistyped.extend(other.mistyped)
+        self.duplicate_relationships += other.duplicate_relationships
+        self.stub_nodes.extend(other.stub_nodes)
+        self.repaired += other.repaired
+        self.dropped += other.dropped
+
+
+class IntegrityIndex:
+    """(type, id) index that can grow across batches, e.g. over a stream that sends all nodes first."""
+
+    def __init__(self, nodes: Iterable[BaseNode] = (), create_stubs: bool = False, repair_types: bool = False):
+        self.create_stubs = create_stubs
+        self.repair_types = repair_types
+        self._keys: Set[NodeKey] = set()
+        self._types_by_id: Dict[str, Set[str]] = {}
+        self.add_nodes(nodes)
+
+    def add_nodes(self, nodes: Iterable[BaseNode]):
+        for node in nodes:
+            self._keys.add((node.type, node.id))
+            self._types_by_id.setdefault(node.id, set()).add(node.type)
+
+    def __contains__(self, key: NodeKey) -> bool:
+        return key in self._keys
+
+    def types_of(self, node_id: str) -> List[str]:
+        return sorted(self._types_by_id.get(node_id, ()))
+
+    def check(self, kg_data: KnowledgeGraphData, create_stubs: Optional[bool] = None,
+              repair_types: Optional[bool] = None) -> Tuple[KnowledgeGraphData, IntegrityReport]:
+        """Index kg_data's nodes, then return (the graph as Neo4j would actually store it, report)."""
+        create_stubs = self.create_stubs if create_stubs is None else create_stubs
+        repair_types = self.repair_types if repair_types is None else repair_types
+        self.add_nodes(kg_data.nodes)
+        report = IntegrityReport(relationships=len(kg_data.relationships))
+        stubs: Dict[NodeKey, BaseNode] = {}
+        kept: Dict[Tuple[str, str, str, str, str], Relationship] = {}
+
+        with metrics.timer("integrity_check_seconds"):
+            for rel in kg_data.relationships:
+                endpoints = {"source": (rel.source_type, rel.source_id), "target": (rel.target_type, rel.target_id)}
+                drop = dangling = False
+                for side, key in endpoints.items():
+                    if key in self._keys or key in stubs:
+                        continue
+                    actual = self.types_of(key[1])
+                    if actual:
+                        report.mistyped.append(Mistyped(rel, side, actual))
+                        if repair_types and len(actual) == 1:
+                            endpoints[side] = (actual[0], key[1])
+                            report.repaired += 1
+                        else:
+                            drop = True
+                    else:
+                        dangling = True
+                        if create_stubs:
+                            stubs[key] = _stub(*key)
+                        else:
+                            drop = True
+                if dangling:
+                    report.dangling.append(rel)
+                if drop:
+                    report.dropped += 1
+                    continue
+                (source_type, source_id), (target_type, target_id) = endpoints["source"], endpoints["target"]
+                merge_key = (source_type, source_id, rel.relationship_type, target_type, target_id)
+                existing = kept.get(merge_key)
+                if existing is not None:
+                    # MERGE + SET r += props: one edge, later properties win.
+                    report.duplicate_relationships += 1
+                    kept[merge_key] = existing.model_copy(update={"properties": {**existing.properties, **rel.properties}})
+                elif (source_type, target_type) != (rel.source_type, rel.target_type):
+                    kept[merge_key] = rel.model_copy(update={"source_type": source_type, "target_type": target_type})
+                else:
+                    kept[merge_key] = rel
+
+        self.add_nodes(stubs.values())
+        report.stub_nodes = list(stubs.values())
+        metrics.inc("integrity_dangling_total", len(report.dangling))
+        metrics.inc("integrity_mistyped_total", len(report.mistyped))
+        metrics.inc("integrity_duplicate_relationships_total", report.duplicate_relationships)
+        metrics.inc("integrity_dropped_relationships_total", report.dropped)
+        checked = KnowledgeGraphData.model_construct(nodes=list(kg_data.nodes) + report.stub_nodes,
+                                                     relationships=list(kept.values()))
+        return checked, report
+
+
+def _stub(node_type: str, node_id: str) -> BaseNode:
+    model = NODE_MODELS.get(node_type, BaseNode)
+    return model.model_construct(id=node_id, type=node_type, attributes={"stub": True})
+
+def check_integrity(kg_data: KnowledgeGraphData, create_stubs: bool = False, repair_types: bool = False,
+                    index: Optional[IntegrityIndex] = None) -> Tuple[KnowledgeGraphData, IntegrityReport]:
+    """One-shot integrity pass; pass an IntegrityIndex to check batches against earlier ones too."""
+    return (index or IntegrityIndex()).check(kg_data, create_stubs=create_stubs, repair_types=repair_types)
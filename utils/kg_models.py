@@ -0,0 +1,85 @@
+# utils/kg_models.py
+# Conceptual ontology for the Norway subsurface knowledge graph, as Pydantic models.
+# Kept free of Streamlit so the pipeline can be imported by scripts and workers.
+from typing import List, Optional, Dict, Any, Type
+from pydantic import BaseModel, Field, field_validator
+
+
+def sanitize_id(value: Any) -> str:
+    return str(value).replace(" ", "_").replace("/", "_").replace(":", "_")
+
+# NPD wellbore name: quadrant/block-[slot-]number and an optional sidetrack/re-entry designation
+# (33/9-A-12, 6507/7-A-26 H, 34/10-C-5 T2, 15/9-19 ST2). Separators also match the sanitize_id
+# form (33_9-A-12_H). Groups: quadrant, block, slot, number, designation. Shared by the rule-based
+# NER (utils/domain_ner.py) and entity resolution (utils/entity_resolution.py).
+NPD_WELLBORE_PATTERN = r"(\d{1,4})[/_](\d{1,2})-(?:([A-Z]{1,2})-?)?(\d{1,3})(?:[_\s-]?([A-Z]{1,2}\d?|ST\d+))?"
+
+def licence_id(number: str, suffix: str = "") -> str:
+    # Canonical production licence id: PL 37 / PL_037 / pl037 -> PL037, PL 1049 b -> PL1049B.
+    return f"PL{int(number):03d}{suffix.upper()}"
+
+class BaseNode(BaseModel):
+    id: str = Field(..., description="Unique identifier for the node (e.g., name, official ID).")
+    type: str = Field(..., description="Type of the node (e.g., 'Well', 'Formation').")
+    attributes: Dict[str, Any] = Field(default_factory=dict, description="Key-value properties of the node.")
+
+    @field_validator('id', mode='before')
+    def sanitize_id(cls, v):
+        return sanitize_id(v)
+
+class Well(BaseNode):
+    type: str = "Well"
+    wellbore_name: Optional[str] = None
+    purpose: Optional[str] = None
+    completion_date: Optional[str] = None
+    total_depth_m: Optional[float] = None
+    water_depth_m: Optional[float] = None
+
+class Formation(BaseNode):
+    type: str = "Formation"
+    geologic_age: Optional[str] = None
+    lithology_description: Optional[str] = None
+
+class Field(BaseNode):
+    type: str = "Field"
+    discovery_year: Optional[int] = None
+    status: Optional[str] = None
+
+class License(BaseNode):
+    type: str = "License"
+    awarded_date: Optional[str] = None
+    valid_until_date: Optional[str] = None
+
+class Company(BaseNode):
+    type: str = "Company"
+    country_of_registration: Optional[str] = None
+
+class Relationship(BaseModel):
+    source_id: str
+    source_type: str
+    target_id: str
+    target_type: str
+    relationship_type: str
+    properties: Dict[str, Any] = {}#Field(default_factory=dict)
+
+    @field_validator('source_id', 'target_id', mode='before')
+    def sanitize_ids_in_relationship(cls, v):
+        return sanitize_id(v)
+
+class KnowledgeGraphData(BaseModel):
+    nodes: List[BaseNode]
+    relationships: List[Relationship]
+
+# Node type -> specific model. Types not listed here fall back to BaseNode.
+NODE_MODELS: Dict[str, Type[BaseNode]] = {
+    "Well": Well, "Formation": Formation, "Field": Field,
+    "License": License, "Company": Company
+}
+
+def model_labels() -> List[str]:
+    # Labels declared by the Pydantic ontology, i.e. the default 'type' of every BaseNode subclass.
+    return [
+        model.model_fields["type"].default
+        for model in BaseNode.__subclasses__()
+        if isinstance(model.model_fields["type"].default, str)
+    ]
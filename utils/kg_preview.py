@@ -0,0 +1,135 @@
+# utils/kg_preview.py
+# Server-side paging over a validated graph for the Streamlit preview: per-type Arrow tables are
+# built once (from ColumnarGraphData), and each rerun only filters with Arrow compute and
+# converts the requested page to pandas, so rendering cost follows the page size, not the graph.
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from utils.kg_columnar import ColumnarGraphData, _SideTable
+from utils.kg_models import BaseNode, KnowledgeGraphData, NODE_MODELS
+
+NODES = "Nodes"
+RELATIONSHIPS = "Relationships"
+_MAX_CACHED_FILTERS = 32
+
+
+def _display(raw: str) -> str:
+    # Side-table values are JSON; show plain strings without their quotes.
+    return raw[1:-1] if raw.startswith('"') and raw.endswith('"') and '\\' not in raw else raw
+
+def _side_columns(table: _SideTable, rows: np.ndarray) -> Dict[str, pa.Array]:
+    """Pivot the side-table entries of `rows` (sorted) into one string column per key."""
+    position = {row: i for i, row in enumerate(rows.tolist())}
+    columns: Dict[str, List[Optional[str]]] = {}
+    entry_rows = table.rows
+    selected = np.flatnonzero(np.isin(entry_rows, rows))
+    values = table.values.take(pa.array(selected)).to_pylist() if len(selected) else []
+    for entry, value in zip(selected.tolist(), values):
+        name = table.key_names[table.keys[entry]]
+        column = columns.get(name)
+        if column is None:
+            column = columns[name] = [None] * len(rows)
+        column[position[int(entry_rows[entry])]] = _display(value)
+    return {name: pa.array(values, pa.string()) for name, values in columns.items()}
+
+
+class GraphPreview:
+    def __init__(self, data: ColumnarGraphData):
+        self.data = data
+        self.node_tables: Dict[str, pa.Table] = {}
+        self.node_rows: Dict[str, np.ndarray] = {} # table row -> ColumnarGraphData node row
+        self.relationship_tables: Dict[str, pa.Table] = {}
+        self.relationship_rows: Dict[str, np.ndarray] = {}
+        self._filters: "OrderedDict[Tuple[str, str, str], np.ndarray]" = OrderedDict()
+
+        real_types = data.node_type[:data.real_nodes]
+        for code, name in enumerate(data.type_names):
+            rows = np.flatnonzero(real_types == code)
+            if not len(rows):
+                continue
+            indices = pa.array(rows)
+            model = NODE_MODELS.get(name, BaseNode)
+            columns = {"id": data.node_ids.take(indices)}
+            columns.update({field: column.take(indices) for field, column in data.columns.items()
+                            if field in model.model_fields})
+            columns.update(_side_columns(data.attributes, rows))
+            self.node_tables[name] = pa.table(columns)
+            self.node_rows[name] = rows
+
+        type_names = pa.array(data.type_names, pa.string())
+        for code, name in enumerate(data.relationship_types):
+            rows = np.flatnonzero(data.rel_type == code)
+            sources, targets = data.rel_source[rows], data.rel_target[rows]
+            columns = {
+                "source_type": type_names.take(pa.array(data.node_type[sources])),
+                "source_id": data.node_ids.take(pa.array(sources)),
+                "target_type": type_names.take(pa.array(data.node_type[targets])),
+                "target_id": data.node_ids.take(pa.array(targets)),
+            }
+            columns.update(_side_columns(data.properties, rows))
+            self.relationship_tables[name] = pa.table(columns)
+            self.relationship_rows[name] = rows
+
+    @classmethod
+    def from_kg_data(cls, kg_data: KnowledgeGraphData) -> "GraphPreview":
+        return cls(ColumnarGraphData.from_kg_data(kg_data))
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {
+            NODES: {name: table.num_rows for name, table in self.node_tables.items()},
+            RELATIONSHIPS: {name: table.num_rows for name, table in self.relationship_tables.items()},
+        }
+
+    def _tables(self, kind: str) -> Dict[str, pa.Table]:
+        return self.node_tables if kind == NODES else self.relationship_tables
+
+    def _matches(self, kind: str, type_name: str, search: str) -> Optional[np.ndarray]:
+        """Table rows whose string columns contain `search` (case-insensitive); None means all rows."""
+        if not search:
+            return None
+        key = (kind, type_name, search)
+        if key in self._filters:
+            self._filters.move_to_end(key)
+            return self._filters[key]
+        table = self._tables(kind)[type_name]
+        mask = None
+        for column in table.columns:
+            if not pa.types.is_string(column.type):
+                continue
+            hit = pc.fill_null(pc.match_substring(column, search, ignore_case=True), False)
+            mask = hit if mask is None else pc.or_(mask, hit)
+        rows = np.flatnonzero(mask.to_numpy(zero_copy_only=False)) if mask is not None else np.empty(0, np.int64)
+        self._filters[key] = rows
+        if len(self._filters) > _MAX_CACHED_FILTERS:
+            self._filters.popitem(last=False)
+        return rows
+
+    def count(self, kind: str, type_name: str, search: str = "") -> int:
+        matches = self._matches(kind, type_name, search.strip())
+        return self._tables(kind)[type_name].num_rows if matches is None else len(matches)
+
+    def page(self, kind: str, type_name: str, page: int = 0, page_size: int = 50, search: str = ""):
+        """(one page as a pandas DataFrame, number of matching rows, matching row numbers of that page)."""
+        table = self._tables(kind)[type_name]
+        matches = self._matches(kind, type_name, search.strip())
+        total = table.num_rows if matches is None else len(matches)
+        start = max(0, page) * page_size
+        if matches is None:
+            rows = np.arange(start, min(start + page_size, total))
+            frame = table.slice(start, page_size)
+        else:
+            rows = matches[start:start + page_size]
+            frame = table.take(pa.array(rows, pa.int64()))
+        # Drop columns that are empty on this page (sparse attributes of other rows).
+        keep = [name for name in frame.column_names if frame[name].null_count < frame.num_rows or not frame.num_rows]
+        return frame.select(keep).to_pandas(), total, rows
+
+    def models(self, kind: str, type_name: str, rows: np.ndarray) -> List[object]:
+        """Pydantic models for the given table rows, e.g. to show one page as JSON."""
+        if kind == NODES:
+            return [self.data.node(int(i)) for i in self.node_rows[type_name][rows]]
+        return [self.data.relationship(int(i)) for i in self.relationship_rows[type_name][rows]]
@@ -0,0 +1,213 @@
+# utils/kg_stream.py
+# Streaming ingestion: NDJSON records -> per-record Pydantic validation -> bounded batches -> Neo4j.
+# Memory is bounded by batch_size * (max_pending_batches + 2) elements, independent of input size,
+# and nothing here depends on Streamlit.
+#
+# Each NDJSON line is one node or one relationship, shaped like the entries of the LLM output:
+#   {"kind": "node", "id": "33/9-A-12", "type": "Well", "attributes": {...}}
+#   {"kind": "relationship", "source_id": "33/9-A-12", "source_type": "Well", ...}
+# "kind" is optional; records with a "source_id" are treated as relationships.
+import gzip
+import io
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from pydantic import ValidationError
+from utils import metrics
+from utils.kg_integrity import IntegrityIndex, IntegrityReport
+from utils.kg_models import BaseNode, Relationship, KnowledgeGraphData
+from utils.kg_validation import KGValidator, get_validator
+from utils.neo4j_uploader import DEFAULT_BATCH_SIZE, Neo4jUploader, UploadStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PENDING_BATCHES = 2
+NODE = "node"
+RELATIONSHIP = "relationship"
+
+Source = Union[str, "os.PathLike[str]", Iterable[Union[str, bytes, Dict[str, Any]]]]
+
+
+@dataclass
+class StreamStats:
+    records: int = 0
+    nodes: int = 0
+    relationships: int = 0
+    invalid: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    upload: UploadStats = field(default_factory=UploadStats)
+    integrity: IntegrityReport = field(default_factory=IntegrityReport)
+
+    @property
+    def records_per_sec(self) -> float:
+        return self.records / self.seconds if self.seconds > 0 else 0.0
+
+
+def record_kind(record: Dict[str, Any]) -> str:
+    kind = record.get("kind")
+    if kind in (NODE, RELATIONSHIP):
+        return kind
+    return RELATIONSHIP if "source_id" in record else NODE
+
+def _open_text(path: Union[str, "os.PathLike[str]"]) -> io.TextIOBase:
+    if os.fspath(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+def iter_ndjson(source: Source) -> Iterator[Dict[str, Any]]:
+    """Yield records one at a time from an NDJSON file (optionally .gz) or an iterable of lines/dicts."""
+    if isinstance(source, (str, os.PathLike)):
+        with _open_text(source) as handle:
+            yield from iter_ndjson(handle)
+        return
+    for line in source:
+        if isinstance(line, dict):
+            yield line
+            continue
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def payload_to_records(llm_json_output: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    # Bridges the in-memory {"nodes": [...], "relationships": [...]} shape to the streaming one.
+    for node in llm_json_output.get("nodes", []):
+        yield {"kind": NODE, **node}
+    for rel in llm_json_output.get("relationships", []):
+        yield {"kind": RELATIONSHIP, **rel}
+
+def write_ndjson(records: Iterable[Dict[str, Any]], path: Union[str, "os.PathLike[str]"]) -> int:
+    opener = gzip.open if os.fspath(path).endswith(".gz") else open
+    written = 0
+    with opener(path, "wt", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False))
+            handle.write("\n")
+            written += 1
+    return written
+
+def iter_validated(records: Iterable[Dict[str, Any]], stats: StreamStats, validator: Optional[KGValidator] = None,
+                   on_invalid: str = "skip") -> Iterator[Union[BaseNode, Relationship]]:
+    validator = validator or get_validator()
+    for record in records:
+        stats.records += 1
+        kind = record_kind(record)
+        try:
+            if kind == NODE:
+                element = validator.validate_node(record)
+            else:
+                element = validator.validate_relationship(record)
+        except ValidationError as e:
+            if on_invalid == "raise":
+                raise
+            stats.invalid += 1
+            metrics.inc("invalid_records_total", kind=kind)
+            logger.warning("Skipping invalid %s record #%d: %s", kind, stats.records, e.errors()[:1])
+            continue
+        yield element
+
+def iter_kg_batches(elements: Iterable[Union[BaseNode, Relationship]], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[KnowledgeGraphData]:
+    # Pending nodes always travel with the relationships flushed after them, and the uploader writes a
+    # batch's nodes before its relationships, so a relationship never overtakes an endpoint seen earlier.
+    nodes: List[BaseNode] = []
+    relationships: List[Relationship] = []
+    for element in elements:
+        if isinstance(element, BaseNode):
+            nodes.append(element)
+            if len(nodes) >= batch_size:
+                yield KnowledgeGraphData.model_construct(nodes=nodes, relationships=relationships)
+                nodes, relationships = [], []
+        else:
+            relationships.append(element)
+            if len(relationships) >= batch_size:
+                yield KnowledgeGraphData.model_construct(nodes=nodes, relationships=relationships)
+                nodes, relationships = [], []
+    if nodes or relationships:
+        yield KnowledgeGraphData.model_construct(nodes=nodes, relationships=relationships)
+
+def _ordered_records(source: Source) -> Iterator[Dict[str, Any]]:
+    # Files can be read twice: all nodes first, then all relationships, so every MATCH finds its
+    # endpoints. One-shot iterables are consumed in order and must list nodes before their edges.
+    if isinstance(source, (str, os.PathLike)):
+        yield from (record for record in iter_ndjson(source) if record_kind(record) == NODE)
+        yield from (record for record in iter_ndjson(source) if record_kind(record) == RELATIONSHIP)
+    else:
+        yield from iter_ndjson(source)
+
+def stream_ingest(source: Source, uploader: Optional[Neo4jUploader] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                  workers: int = 1, max_pending_batches: int = DEFAULT_MAX_PENDING_BATCHES,
+                  validator: Optional[KGValidator] = None, on_invalid: str = "skip",
+                  store_writer=None, integrity: Optional[IntegrityIndex] = None) -> StreamStats:
+    """Validate and upload an NDJSON stream in bounded batches. With uploader=None it only validates (dry run).
+
+    store_writer (GraphStore.writer()) additionally appends every uploaded batch to the local
+    Parquet store the Dashboard aggregates from. With an IntegrityIndex, every batch is checked
+    against all nodes streamed so far before upload (dangling/mistyped edges dropped or stubbed).
+
+    Parsing/validation runs on a producer thread feeding a bounded queue; when the uploader falls
+    behind, the producer blocks instead of buffering more input.
+    """
+    stats = StreamStats()
+    batches: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_pending_batches))
+    done = object()
+    stop = threading.Event()
+
+    def offer(item) -> bool:
+        # Every put (batches, the end marker, an error) gives up once the consumer has stopped,
+        # so a failed upload never leaves the producer blocked on a full queue.
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            elements = iter_validated(_ordered_records(source), stats, validator, on_invalid)
+            # Time spent parsing + validating each batch, excluding time blocked on a full queue.
+            for batch in metrics.timed_iter(iter_kg_batches(elements, batch_size), "stream_batch_build_seconds"):
+                if integrity is not None: # nodes come before relationships, so the index is complete in time
+                    batch, report = integrity.check(batch)
+                    stats.integrity.add(report)
+                if not offer(batch):
+                    return
+            offer(done)
+        except BaseException as e: # handed to the consumer and re-raised there
+            offer(e)
+
+    start = time.perf_counter()
+    producer = threading.Thread(target=produce, name="kg-stream-producer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            with metrics.timer("stream_queue_wait_seconds"): # > 0 when validation, not Neo4j, is the bottleneck
+                item = batches.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            stats.batches += 1
+            stats.nodes += len(item.nodes)
+            stats.relationships += len(item.relationships)
+            if uploader is not None:
+                stats.upload.add(uploader.upload_kg_data(item, batch_size=batch_size, workers=workers))
+            if store_writer is not None:
+                store_writer.write(item)
+    finally:
+        stop.set()
+        producer.join()
+        stats.seconds = time.perf_counter() - start
+    metrics.inc("validated_nodes_total", stats.nodes)
+    metrics.inc("validated_relationships_total", stats.relationships)
+    logger.info(
+        "Streamed %d records (%d nodes, %d relationships, %d invalid) in %d batches, %.0f records/s",
+        stats.records, stats.nodes, stats.relationships, stats.invalid, stats.batches, stats.records_per_sec,
+    )
+    return stats
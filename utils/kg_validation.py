@@ -0,0 +1,125 @@
+# utils/kg_validation.py
+# Precompiled validation of LLM JSON output into KnowledgeGraphData.
+import gc
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Type
+from pydantic import TypeAdapter
+from utils import metrics
+from utils.kg_models import BaseNode, Relationship, KnowledgeGraphData, NODE_MODELS
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    # Building 100k+ small models trips the cyclic GC over and over although none of them form cycles.
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+class KGValidator:
+    """Validates node/relationship payloads with per-type tables and list adapters built once.
+
+    The input payload is never mutated, so the same payload can be validated repeatedly.
+    With ``fast=True`` elements that are already model instances are trusted as-is.
+    """
+
+    def __init__(self, node_models: Optional[Dict[str, Type[BaseNode]]] = None):
+        self.node_models = dict(NODE_MODELS if node_models is None else node_models)
+        # Per type: the model-specific fields lifted out of 'attributes' (e.g. Well.total_depth_m).
+        self._specific_fields: Dict[str, Tuple[str, ...]] = {
+            node_type: tuple(name for name in model.model_fields if name not in BaseNode.model_fields)
+            for node_type, model in self.node_models.items()
+        }
+        self._node_adapters: Dict[Optional[str], TypeAdapter] = {
+            node_type: TypeAdapter(List[model]) for node_type, model in self.node_models.items()
+        }
+        self._node_adapters[None] = TypeAdapter(List[BaseNode]) # unknown types
+        self._relationship_adapter = TypeAdapter(List[Relationship])
+
+    def is_known_type(self, node_type: Optional[str]) -> bool:
+        return node_type in self.node_models
+
+    def prepare_node(self, node_data: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any]]:
+        # Returns (adapter key, validator input). Builds new dicts instead of popping from the caller's.
+        node_type = node_data.get("type")
+        attributes = node_data.get("attributes") or {}
+        specific_fields = self._specific_fields.get(node_type)
+        if specific_fields is None:
+            return None, {"id": node_data.get("id"), "type": node_type or "Unknown", "attributes": attributes}
+
+        prepared = {"id": node_data.get("id")}
+        # Top-level typed fields (a dumped Well has total_depth_m next to attributes) are kept;
+        # a value under 'attributes' still wins, as before.
+        for name in specific_fields:
+            value = node_data.get(name)
+            if value is not None:
+                prepared[name] = value
+        if any(name in attributes for name in specific_fields):
+            prepared["attributes"] = {k: v for k, v in attributes.items() if k not in specific_fields}
+            for name in specific_fields:
+                if name in attributes:
+                    prepared[name] = attributes[name]
+        else:
+            prepared["attributes"] = attributes
+        return node_type, prepared
+
+    def validate_node(self, node_data: Dict[str, Any]) -> BaseNode:
+        key, prepared = self.prepare_node(node_data)
+        return self.node_models.get(key, BaseNode).model_validate(prepared)
+
+    def validate_relationship(self, relationship_data: Dict[str, Any]) -> Relationship:
+        return Relationship.model_validate(relationship_data)
+
+    def validate_nodes(self, nodes_data: Iterable[Any], fast: bool = False) -> List[BaseNode]:
+        nodes: List[Optional[BaseNode]] = []
+        # adapter key -> (positions in the output, validator inputs); validated as one list per type.
+        pending: Dict[Optional[str], Tuple[List[int], List[Dict[str, Any]]]] = {}
+        for node_data in nodes_data:
+            if isinstance(node_data, BaseNode):
+                if fast:
+                    nodes.append(node_data)
+                    continue
+                node_data = node_data.model_dump()
+            key, prepared = self.prepare_node(node_data)
+            positions, rows = pending.setdefault(key, ([], []))
+            positions.append(len(nodes))
+            rows.append(prepared)
+            nodes.append(None)
+
+        for key, (positions, rows) in pending.items():
+            for position, node in zip(positions, self._node_adapters[key].validate_python(rows)):
+                nodes[position] = node
+        return nodes
+
+    def validate_relationships(self, relationships_data: Iterable[Any], fast: bool = False) -> List[Relationship]:
+        relationships_data = list(relationships_data)
+        if fast and all(isinstance(rel, Relationship) for rel in relationships_data):
+            return relationships_data
+        rows = [rel.model_dump() if isinstance(rel, Relationship) and not fast else rel for rel in relationships_data]
+        return self._relationship_adapter.validate_python(rows)
+
+    def validate(self, llm_json_output: Dict[str, Any], fast: bool = False) -> KnowledgeGraphData:
+        with metrics.timer("validation_seconds"), _gc_paused():
+            nodes = self.validate_nodes(llm_json_output.get("nodes", []), fast=fast)
+            relationships = self.validate_relationships(llm_json_output.get("relationships", []), fast=fast)
+        metrics.inc("validated_nodes_total", len(nodes))
+        metrics.inc("validated_relationships_total", len(relationships))
+        # Every element was validated above, so the container doesn't need a second pass.
+        return KnowledgeGraphData.model_construct(nodes=nodes, relationships=relationships)
+
+
+_default_validator: Optional[KGValidator] = None
+
+def get_validator() -> KGValidator:
+    global _default_validator
+    if _default_validator is None:
+        _default_validator = KGValidator()
+    return _default_validator
+
+def validate_llm_output(llm_json_output: Dict[str, Any], fast: bool = False) -> KnowledgeGraphData:
+    """Validate LLM JSON output, raising pydantic.ValidationError on bad data."""
+    return get_validator().validate(llm_json_output, fast=fast)
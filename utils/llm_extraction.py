@@ -0,0 +1,323 @@
+# utils/llm_extraction.py
+# Asyncio LLM extraction: text chunks -> structured-output requests -> KnowledgeGraphData.
+#
+# Requests run concurrently under a semaphore (max in-flight requests) and a token bucket
+# (requests per second), each with a timeout and exponential-backoff retries on transient
+# errors. Small chunks can be packed into one request. Responses are parsed straight into the
+# existing pydantic models with the shared KGValidator; valid results are stored in the
+# ExtractionCache so a re-run only pays for new chunks. With skip_resolved, chunks the rule-based
+# NER (utils/domain_ner.py) fully resolves are answered from the rules without an LLM call.
+#
+# Clients only need `async complete(system, user) -> str` (the raw JSON text):
+#   OpenAIClient   the openai SDK; pass base_url to point it at any OpenAI-compatible server
+#   FakeLLMClient  canned/callable responses with configurable latency and failures, for tests
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from pydantic import ValidationError
+
+from utils import metrics
+from utils.kg_models import KnowledgeGraphData, NODE_MODELS
+from utils.kg_validation import KGValidator, get_validator
+
+DEFAULT_LLM_MODEL = "gpt-4o-mini"
+LLM_PROMPT_VERSION = "1"
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_SEC = 5.0
+DEFAULT_TIMEOUT_S = 60.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BATCH_CHARS = 0 # 0 = one chunk per request
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError"}
+CHUNK_SEPARATOR = "\n\n---\n\n"
+
+SYSTEM_PROMPT = f"""You extract a knowledge graph about the Norwegian continental shelf from text.
+Return only JSON of the form {{"nodes": [...], "relationships": [...]}}.
+Each node: {{"id": str, "type": one of {sorted(NODE_MODELS)}, "attributes": {{...}}}}.
+Each relationship: {{"source_id", "source_type", "target_id", "target_type", "relationship_type", "properties": {{...}}}}.
+Use NPD names as ids (e.g. wellbore "33/9-A-12", license "PL037"); relationship_type is UPPER_SNAKE_CASE
+(e.g. TARGETS_FORMATION, IS_IN_FIELD, DRILLED_IN_LICENSE, OPERATED_BY). Only state facts present in the text."""
+
+
+class LLMClientError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if getattr(error, "status_code", None) in RETRYABLE_STATUS:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+# --- Clients ---
+class OpenAIClient:
+    def __init__(self, model: str = DEFAULT_LLM_MODEL, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        from openai import AsyncOpenAI
+
+        self.model = model
+        # Retries are handled by LLMExtractor so they share its backoff and accounting.
+        self._client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+    async def complete(self, system: str, user: str) -> str:
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
+            response_format={"type": "json_object"},
+            temperature=0,
+        )
+        return response.choices[0].message.content or "{}"
+
+    async def close(self):
+        await self._client.close()
+
+
+class FakeLLMClient:
+    """Stand-in client: answers with `response` (a payload, or a callable of the user text) after `latency` seconds."""
+
+    def __init__(self, response: Union[Dict[str, Any], Callable[[str], Dict[str, Any]], None] = None,
+                 latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.model = "fake"
+        self.response = response if response is not None else {"nodes": [], "relationships": []}
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    async def complete(self, system: str, user: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter)))
+        if self._rng.random() < self.failure_rate:
+            raise LLMClientError("simulated overload", status_code=503)
+        payload = self.response(user) if callable(self.response) else self.response
+        return json.dumps(payload)
+
+    async def close(self):
+        pass
+
+
+# --- Rate limiting ---
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+# --- Results ---
+@dataclass
+class RequestResult:
+    chunk_ids: List[Any]
+    kg_data: Optional[KnowledgeGraphData]
+    latency: float = 0.0
+    attempts: int = 0
+    cached: bool = False
+    error: Optional[str] = None
+    rule_based: bool = False # resolved by utils/domain_ner.py, no request sent
+
+
+@dataclass
+class ExtractionStats:
+    chunks: int = 0
+    requests: int = 0
+    cached: int = 0
+    rule_resolved: int = 0 # chunks that never reached the LLM
+    failed: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def requests_per_sec(self) -> float:
+        return self.requests / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.requests} requests ({self.cached} cached, {self.failed} failed, {self.retries} retries) "
+            f"for {self.chunks} chunks in {self.seconds:.2f}s, {self.requests_per_sec:,.1f} req/s; "
+            f"latency p50 {self.percentile(50) * 1000:.0f} ms, p95 {self.percentile(95) * 1000:.0f} ms, "
+            f"p99 {self.percentile(99) * 1000:.0f} ms"
+            + (f"; {self.rule_resolved} chunks resolved by rules" if self.rule_resolved else "")
+        )
+
+
+def pack_chunks(chunks: Sequence[Any], max_chars: int = DEFAULT_BATCH_CHARS) -> List[List[Any]]:
+    """Group consecutive (text, chunk_id) pairs into requests of at most max_chars characters."""
+    if max_chars <= 0:
+        return [[chunk] for chunk in chunks]
+    groups: List[List[Any]] = []
+    size = 0
+    for chunk in chunks:
+        length = len(chunk[0]) + len(CHUNK_SEPARATOR)
+        if groups and size + length <= max_chars:
+            groups[-1].append(chunk)
+            size += length
+        else:
+            groups.append([chunk])
+            size = length
+    return groups
+
+
+def merge_kg_data(parts: Iterable[KnowledgeGraphData]) -> KnowledgeGraphData:
+    """Concatenate per-request graphs, keeping the first occurrence of each node and relationship."""
+    nodes, relationships = {}, {}
+    for part in parts:
+        for node in part.nodes:
+            nodes.setdefault((node.type, node.id), node)
+        for rel in part.relationships:
+            key = (rel.source_type, rel.source_id, rel.relationship_type, rel.target_type, rel.target_id)
+            relationships.setdefault(key, rel)
+    return KnowledgeGraphData.model_construct(nodes=list(nodes.values()), relationships=list(relationships.values()))
+
+
+# --- Engine ---
+class LLMExtractor:
+    def __init__(self, client, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 requests_per_sec: float = DEFAULT_REQUESTS_PER_SEC, timeout: float = DEFAULT_TIMEOUT_S,
+                 max_retries: int = DEFAULT_MAX_RETRIES, batch_chars: int = DEFAULT_BATCH_CHARS,
+                 cache=None, validator: Optional[KGValidator] = None, system_prompt: str = SYSTEM_PROMPT,
+                 skip_resolved: bool = False):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.requests_per_sec = requests_per_sec
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.batch_chars = batch_chars
+        self.cache = cache
+        self.validator = validator or get_validator()
+        self.system_prompt = system_prompt
+        self.skip_resolved = skip_resolved
+        self.stats = ExtractionStats()
+        self._cache_model = f"llm:{getattr(client, 'model', type(client).__name__)}"
+        self._cache_version = f"prompt-{LLM_PROMPT_VERSION}"
+
+    async def extract(self, chunks: Iterable[Union[str, Sequence[Any]]]) -> List[RequestResult]:
+        """Run every chunk (str or (text, chunk_id)) through the LLM; results come back in input order."""
+        items = [(chunk, index) if isinstance(chunk, str) else tuple(chunk) for index, chunk in enumerate(chunks)]
+        start = time.perf_counter()
+        ruled: Dict[int, RequestResult] = {} # chunk position -> rule result (later: every result)
+        if self.skip_resolved:
+            from utils.domain_ner import extract_domain
+
+            for position, extraction in enumerate(extract_domain((text for text, _ in items))):
+                if extraction.resolved:
+                    ruled[position] = RequestResult([items[position][1]], extraction.kg_data, rule_based=True)
+            self.stats.rule_resolved += len(ruled)
+        pending = [(position, item) for position, item in enumerate(items) if position not in ruled]
+        groups = pack_chunks([item for _, item in pending], self.batch_chars)
+        # Created here so they bind to the running event loop.
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        bucket = TokenBucket(self.requests_per_sec)
+        results = await asyncio.gather(*(self._run_group(group, semaphore, bucket) for group in groups))
+        self.stats.seconds += time.perf_counter() - start
+        self.stats.chunks += len(items)
+        if not ruled:
+            return list(results)
+        # Back into input order: each request sits where its first chunk was.
+        offset = 0
+        for group, result in zip(groups, results):
+            ruled[pending[offset][0]] = result
+            offset += len(group)
+        return [ruled[position] for position in sorted(ruled)]
+
+    async def _run_group(self, group: List[Any], semaphore: asyncio.Semaphore, bucket: TokenBucket) -> RequestResult:
+        text = CHUNK_SEPARATOR.join(chunk_text for chunk_text, _ in group)
+        chunk_ids = [chunk_id for _, chunk_id in group]
+        if self.cache is not None:
+            payload = self.cache.get(text, self._cache_model, self._cache_version)
+            if payload is not None:
+                self.stats.cached += 1
+                return RequestResult(chunk_ids, self.validator.validate(payload), cached=True)
+
+        last_error: Optional[BaseException] = None
+        for attempt in range(1, self.max_retries + 2):
+            async with semaphore:
+                await bucket.acquire()
+                started = time.perf_counter()
+                try:
+                    raw = await asyncio.wait_for(self.client.complete(self.system_prompt, text), self.timeout)
+                    payload = json.loads(raw)
+                    kg_data = self.validator.validate(payload)
+                except (ValidationError, ValueError) as e:
+                    # Malformed JSON or schema violations: the model may well get it right on a second try.
+                    last_error = e
+                except Exception as e:
+                    if not is_retryable(e):
+                        self.stats.requests += 1
+                        self.stats.failed += 1
+                        metrics.inc("llm_failed_requests_total")
+                        return RequestResult(chunk_ids, None, attempts=attempt, error=_describe(e))
+                    last_error = e
+                else:
+                    latency = time.perf_counter() - started
+                    self.stats.requests += 1
+                    self.stats.latencies.append(latency)
+                    metrics.observe("llm_request_seconds", latency, model=self._cache_model)
+                    if self.cache is not None:
+                        self.cache.put(text, self._cache_model, self._cache_version, payload)
+                    return RequestResult(chunk_ids, kg_data, latency=latency, attempts=attempt)
+            if attempt <= self.max_retries:
+                self.stats.retries += 1
+                metrics.inc("llm_retries_total", error=type(last_error).__name__)
+                # Exponential backoff with full jitter, outside the semaphore so others can proceed.
+                await asyncio.sleep(random.uniform(0, min(30.0, 0.5 * 2 ** (attempt - 1))))
+        self.stats.requests += 1
+        self.stats.failed += 1
+        metrics.inc("llm_failed_requests_total")
+        return RequestResult(chunk_ids, None, attempts=self.max_retries + 1, error=_describe(last_error))
+
+
+def _describe(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+
+def extract_kg(chunks: Iterable[Union[str, Sequence[Any]]], client=None, **extractor_options):
+    """Synchronous entry point: returns (merged KnowledgeGraphData, per-request results, stats)."""
+    client = client or OpenAIClient()
+
+    async def _run():
+        try:
+            return await extractor.extract(chunks)
+        finally:
+            await client.close()
+
+    extractor = LLMExtractor(client, **extractor_options)
+    results = asyncio.run(_run())
+    merged = merge_kg_data(result.kg_data for result in results if result.kg_data is not None)
+    return merged, results, extractor.stats
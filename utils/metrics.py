@@ -0,0 +1,260 @@
+# utils/metrics.py
+# Lightweight, process-wide instrumentation: counters and timers around the pipeline stages
+# (validation, Neo4j batches, spaCy pipe calls, cache lookups), optional cProfile/tracemalloc
+# capture per run, and export as Prometheus text or JSONL.
+#
+# Instrumented code calls the module-level helpers (inc, observe, timer, timed_iter); they
+# record into METRICS, which the Dashboard page reads live. KG_METRICS=0 turns recording off.
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+METRIC_PREFIX = "kg_"
+RESERVOIR_SIZE = 1024 # recent samples kept per timer for percentiles
+MAX_PROFILES = 10
+
+_LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> _LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+@dataclass
+class TimerStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    recent: Deque[float] = field(default_factory=lambda: deque(maxlen=RESERVOIR_SIZE))
+
+    def percentile(self, p: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+
+@dataclass
+class ProfileReport:
+    name: str
+    started: float
+    seconds: float
+    cpu_top: str = "" # pstats output, sorted by cumulative time
+    peak_memory_bytes: Optional[int] = None
+    memory_top: List[str] = field(default_factory=list)
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[_LabelKey, float] = {}
+        self._timers: Dict[_LabelKey, TimerStats] = {}
+        self.profiles: Deque[ProfileReport] = deque(maxlen=MAX_PROFILES)
+
+    # --- Recording ---
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, count: int = 1, **labels):
+        """Record `count` events that took `seconds` in total (count > 1 for pre-aggregated loops)."""
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            stats = self._timers.get(key)
+            if stats is None:
+                stats = self._timers[key] = TimerStats()
+            stats.count += count
+            stats.total += seconds
+            per_event = seconds / count if count else seconds
+            stats.max = max(stats.max, per_event)
+            stats.recent.append(per_event)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed_iter(self, iterable: Iterable, name: str, **labels) -> Iterator:
+        """Yield from iterable, timing only the time spent producing items (not the consumer's)."""
+        iterator = iter(iterable)
+        spent, produced = 0.0, 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    spent += time.perf_counter() - start
+                    return
+                spent += time.perf_counter() - start
+                produced += 1
+                yield item
+        finally:
+            if produced:
+                self.observe(name, spent, count=produced, **labels)
+
+    # --- Reading ---
+    def counters(self) -> Dict[_LabelKey, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def timers(self) -> Dict[_LabelKey, TimerStats]:
+        with self._lock:
+            return {key: TimerStats(s.count, s.total, s.max, deque(s.recent, maxlen=RESERVOIR_SIZE))
+                    for key, s in self._timers.items()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "timestamp": time.time(),
+            "uptime_seconds": time.time() - self.started,
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(self.counters().items())],
+            "timers": [{"name": name, "labels": dict(labels), "count": s.count, "total_seconds": s.total,
+                        "mean_seconds": s.total / s.count if s.count else 0.0, "p50_seconds": s.percentile(50),
+                        "p95_seconds": s.percentile(95), "max_seconds": s.max}
+                       for (name, labels), s in sorted(self.timers().items())],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+            self.profiles.clear()
+            self.started = time.time()
+
+    # --- Export ---
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        seen_types = set()
+
+        def header(metric: str, kind: str):
+            if metric not in seen_types:
+                seen_types.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+
+        for (name, labels), value in sorted(self.counters().items()):
+            metric = METRIC_PREFIX + name
+            header(metric, "counter")
+            lines.append(f"{metric}{_prometheus_labels(labels)} {value:g}")
+        for (name, labels), stats in sorted(self.timers().items()):
+            metric = METRIC_PREFIX + name
+            header(metric, "summary")
+            for quantile in (0.5, 0.95):
+                lines.append(f"{metric}{_prometheus_labels(labels + (('quantile', str(quantile)),))} {stats.percentile(quantile * 100):.6f}")
+            lines.append(f"{metric}_sum{_prometheus_labels(labels)} {stats.total:.6f}")
+            lines.append(f"{metric}_count{_prometheus_labels(labels)} {stats.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_jsonl(self, path: Union[str, Path]):
+        """Append one snapshot line; call it after each run (or periodically) to build a time series."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(self.snapshot()) + "\n")
+
+    # --- Profiling ---
+    @contextmanager
+    def profile(self, name: str, cpu: bool = True, memory: bool = False, top: int = 25) -> Iterator[ProfileReport]:
+        """Capture cProfile and/or tracemalloc data for the enclosed block into self.profiles."""
+        report = ProfileReport(name=name, started=time.time(), seconds=0.0)
+        profiler = cProfile.Profile() if cpu else None
+        thread_profilers: List[cProfile.Profile] = []
+        if cpu:
+            # Threads started inside the block (ingest producers, upload workers) get their own profiler.
+            def _profile_new_thread(*_):
+                thread_profiler = cProfile.Profile()
+                thread_profilers.append(thread_profiler)
+                thread_profiler.enable()
+            threading.setprofile(_profile_new_thread)
+        started_tracing = memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield report
+        finally:
+            if profiler:
+                profiler.disable()
+                threading.setprofile(None)
+            report.seconds = time.perf_counter() - start
+            if profiler:
+                out = io.StringIO()
+                stats = pstats.Stats(profiler, stream=out)
+                for thread_profiler in thread_profilers:
+                    try:
+                        stats.add(thread_profiler)
+                    except TypeError: # thread never produced any samples
+                        pass
+                stats.sort_stats("cumulative").print_stats(top)
+                report.cpu_top = out.getvalue()
+            if memory:
+                report.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+                snapshot = tracemalloc.take_snapshot()
+                report.memory_top = [str(stat) for stat in snapshot.statistics("lineno")[:top]]
+                if started_tracing:
+                    tracemalloc.stop()
+            self.profiles.append(report)
+
+
+def _prometheus_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+METRICS = MetricsRegistry(enabled=os.environ.get("KG_METRICS", "1") != "0")
+
+inc = METRICS.inc
+observe = METRICS.observe
+timer = METRICS.timer
+timed_iter = METRICS.timed_iter
+profile = METRICS.profile
+
+
+def start_metrics_server(port: int = 9464, host: str = "127.0.0.1", registry: MetricsRegistry = METRICS) -> ThreadingHTTPServer:
+    """Serve registry.to_prometheus() at http://host:port/metrics from a daemon thread."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="kg-metrics", daemon=True).start()
+    return server
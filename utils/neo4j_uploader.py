@@ -0,0 +1,506 @@
+# utils/neo4j_uploader.py
+# Neo4j loading for KnowledgeGraphData: batched UNWIND writes, parallel partitioned ingest,
+# id constraints and a shared driver registry. No Streamlit here: failures raise, results
+# come back as UploadStats, and the caller decides how to report them.
+import hashlib
+import logging
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+from neo4j import Driver, GraphDatabase, basic_auth
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+from utils import metrics
+from utils.kg_models import BaseNode, Relationship, KnowledgeGraphData, model_labels
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WORKERS = 4
+MAX_WRITE_RETRIES = 5
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired) # includes DeadlockDetected
+
+DEFAULT_POOL_SIZE = 50
+DEFAULT_LIVENESS_CHECK_S = 30.0 # pooled connections idle longer than this are pinged before reuse
+DEFAULT_DRIVER_IDLE_TIMEOUT_S = 15 * 60
+
+
+@dataclass
+class UploadStats:
+    nodes: int = 0
+    relationships: int = 0
+    nodes_seconds: float = 0.0
+    relationships_seconds: float = 0.0
+    skipped_relationships: int = 0 # sent, but an endpoint wasn't there to MATCH
+    constraints_created: List[str] = field(default_factory=list)
+
+    @property
+    def nodes_per_sec(self) -> float:
+        return _rate(self.nodes, self.nodes_seconds)
+
+    @property
+    def relationships_per_sec(self) -> float:
+        return _rate(self.relationships, self.relationships_seconds)
+
+    def add(self, other: "UploadStats"):
+        self.nodes += other.nodes
+        self.relationships += other.relationships
+        self.nodes_seconds += other.nodes_seconds
+        self.relationships_seconds += other.relationships_seconds
+        self.skipped_relationships += other.skipped_relationships
+        self.constraints_created.extend(other.constraints_created)
+
+
+def node_properties(node: BaseNode) -> Dict[str, Any]:
+    # Prepare node properties for Neo4j
+    # Start with the generic 'attributes' field
+    node_props = node.attributes.copy() if node.attributes else {}
+    # Add specific Pydantic fields to the properties, overriding if necessary
+    for field_name, field_value in node.model_dump().items():
+        if field_name not in ['id', 'type', 'attributes'] and field_value is not None:
+            node_props[field_name] = field_value
+
+    # Remove None values from final properties to avoid setting null properties explicitly
+    return {k: v for k, v in node_props.items() if v is not None}
+
+def relationship_properties(rel: Relationship) -> Dict[str, Any]:
+    return {k: v for k, v in rel.properties.items() if v is not None} # Clean None values
+
+def group_nodes_by_label(nodes: List[BaseNode]) -> Dict[str, List[Dict[str, Any]]]:
+    # Labels can't be parameterised in Cypher, so one UNWIND query is sent per label.
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for node in nodes:
+        groups.setdefault(node.type, []).append({"id": node.id, "props": node_properties(node)})
+    return groups
+
+def group_relationships_by_pattern(relationships: List[Relationship]) -> Dict[Tuple[str, str, str], List[Dict[str, Any]]]:
+    groups: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+    for rel in relationships:
+        key = (rel.source_type, rel.relationship_type, rel.target_type)
+        groups.setdefault(key, []).append(
+            {"source_id": rel.source_id, "target_id": rel.target_id, "props": relationship_properties(rel)}
+        )
+    return groups
+
+def _chunked(rows: List[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    size = max(1, size)
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else 0.0
+
+def schema_labels(kg_data: KnowledgeGraphData) -> List[str]:
+    labels = model_labels()
+    for node in kg_data.nodes:
+        if node.type not in labels:
+            labels.append(node.type)
+    return labels
+
+def partition_for(node_id: str, partitions: int) -> int:
+    # crc32 instead of hash() so the assignment is stable across processes and runs.
+    return zlib.crc32(node_id.encode("utf-8")) % partitions
+
+def partition_batches(groups: Dict[Any, List[Dict[str, Any]]], id_key: str, partitions: int, batch_size: int) -> List[List[Tuple[Any, List[Dict[str, Any]]]]]:
+    # Every row with the same id lands in the same partition, and each partition is written
+    # by exactly one worker, so two workers never MERGE the same node concurrently.
+    buckets: List[List[Tuple[Any, List[Dict[str, Any]]]]] = [[] for _ in range(partitions)]
+    for group_key, rows in groups.items():
+        split: List[List[Dict[str, Any]]] = [[] for _ in range(partitions)]
+        for row in rows:
+            split[partition_for(row[id_key], partitions)].append(row)
+        for index, partition_rows in enumerate(split):
+            buckets[index].extend((group_key, batch) for batch in _chunked(partition_rows, batch_size))
+    return [bucket for bucket in buckets if bucket]
+
+def relationship_rounds(groups: Dict[Any, List[Dict[str, Any]]], workers: int, batch_size: int) -> List[List[List[Tuple[Any, List[Dict[str, Any]]]]]]:
+    # A relationship MERGE locks both endpoints. Rows are bucketed by the (unordered) pair of node
+    # partitions their endpoints hash to, and buckets are scheduled in rounds whose pairs share no
+    # partition (round-robin pairing plus one round of same-partition buckets), so buckets written
+    # concurrently never lock the same node. Rounds run one after the other.
+    partitions = 2 * max(1, workers) # even, so every pairing round covers all partitions
+    cells: Dict[Tuple[int, int], Dict[Any, List[Dict[str, Any]]]] = {}
+    for group_key, rows in groups.items():
+        for row in rows:
+            a, b = partition_for(row["source_id"], partitions), partition_for(row["target_id"], partitions)
+            cells.setdefault((min(a, b), max(a, b)), {}).setdefault(group_key, []).append(row)
+
+    schedule = [[(i, i) for i in range(partitions)]]
+    last = partitions - 1
+    for r in range(last):
+        pairs = [(r, last)] + [((r + i) % last, (r - i) % last) for i in range(1, partitions // 2)]
+        schedule.append([(min(pair), max(pair)) for pair in pairs])
+
+    rounds = []
+    for pairs in schedule:
+        buckets = [
+            [(group_key, batch) for group_key, rows in cells[pair].items() for batch in _chunked(rows, batch_size)]
+            for pair in pairs if pair in cells
+        ]
+        if buckets:
+            rounds.append(buckets)
+    return rounds
+
+def write_with_retry(session, tx_function, *args, max_retries: int = MAX_WRITE_RETRIES, base_delay: float = 0.1):
+    # The only retry layer: an explicit transaction isn't retried by the driver (execute_write would
+    # retry transient errors itself for up to max_transaction_retry_time, on top of this backoff).
+    # Timed per transaction, labelled by tx function (e.g. merge_nodes_batch), so round trips,
+    # lock waits (time spent in attempts that end in a retryable error) and backoff show up separately.
+    tx_name = tx_function.__name__.strip("_").removesuffix("_tx")
+    for attempt in range(max_retries + 1):
+        start = time.perf_counter()
+        try:
+            with session.begin_transaction() as tx:
+                result = tx_function(tx, *args)
+                tx.commit()
+        except RETRYABLE_ERRORS as e:
+            metrics.observe("neo4j_failed_tx_seconds", time.perf_counter() - start, tx=tx_name)
+            metrics.inc("neo4j_retries_total", tx=tx_name, error=getattr(e, "code", None) or type(e).__name__)
+            if attempt == max_retries:
+                raise
+            # Exponential backoff with jitter so deadlocked workers don't retry in lockstep.
+            with metrics.timer("neo4j_backoff_seconds", tx=tx_name):
+                time.sleep(base_delay * (2 ** attempt) * (1 + random.random()))
+        else:
+            metrics.observe("neo4j_tx_seconds", time.perf_counter() - start, tx=tx_name)
+            return result
+
+
+# --- Shared Driver Registry ---
+@dataclass
+class _DriverEntry:
+    driver: Driver
+    password_fingerprint: str
+    max_pool_size: int
+    last_used: float
+    leases: int = 0 # callers currently using the driver
+    retired: bool = False # replaced in the registry; closed once the last lease is released
+
+
+class DriverLease:
+    """A driver checked out of a DriverRegistry. It stays open until release() (or the end of a with block)."""
+
+    def __init__(self, registry: "DriverRegistry", entry: _DriverEntry):
+        self._registry = registry
+        self._entry = entry
+        self._released = False
+
+    @property
+    def driver(self) -> Driver:
+        return self._entry.driver
+
+    def release(self):
+        if not self._released: # idempotent, so a job and its submitter can both call it safely
+            self._released = True
+            self._registry._release(self._entry)
+
+    def __enter__(self) -> "DriverLease":
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class DriverRegistry:
+    # One long-lived driver (and connection pool) per (uri, user), shared by every rerun and session.
+    # Drivers are handed out as leases: a driver in use is never closed, neither for being idle nor
+    # for being replaced (new password or pool size); a replaced one is closed by its last release.
+    def __init__(self, max_pool_size: int = DEFAULT_POOL_SIZE, liveness_check_timeout: float = DEFAULT_LIVENESS_CHECK_S,
+                 idle_timeout: float = DEFAULT_DRIVER_IDLE_TIMEOUT_S):
+        self.max_pool_size = max_pool_size
+        self.liveness_check_timeout = liveness_check_timeout
+        self.idle_timeout = idle_timeout
+        self._entries: Dict[Tuple[str, str], _DriverEntry] = {}
+        self._lock = threading.Lock()
+
+    def lease(self, uri: str, user: str, password: str, max_pool_size: Optional[int] = None) -> DriverLease:
+        self.close_idle()
+        key = (uri, user)
+        fingerprint = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        pool_size = max_pool_size or self.max_pool_size
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.password_fingerprint != fingerprint or entry.max_pool_size != pool_size):
+                # Credentials changed: never hand out a pool authenticated with the old password again.
+                # A new pool size also needs a new driver. Running uploads keep the old one until they release it.
+                self._entries.pop(key)
+                self._retire(entry)
+                entry = None
+            if entry is None:
+                driver = GraphDatabase.driver(
+                    uri,
+                    auth=basic_auth(user, password),
+                    max_connection_pool_size=pool_size,
+                    liveness_check_timeout=self.liveness_check_timeout,
+                )
+                try:
+                    driver.verify_connectivity() # Only paid once per pool, not per upload
+                except Exception:
+                    driver.close()
+                    raise
+                entry = _DriverEntry(driver, fingerprint, pool_size, time.monotonic())
+                self._entries[key] = entry
+            entry.leases += 1
+            entry.last_used = time.monotonic()
+            return DriverLease(self, entry)
+
+    def _retire(self, entry: _DriverEntry):
+        # Caller holds self._lock.
+        entry.retired = True
+        if entry.leases == 0:
+            entry.driver.close()
+
+    def _release(self, entry: _DriverEntry):
+        with self._lock:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            if entry.retired and entry.leases == 0:
+                entry.driver.close()
+
+    def close_idle(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.leases: # in use: idle time counts from the last release
+                    entry.last_used = now
+            idle_keys = [key for key, entry in self._entries.items() if now - entry.last_used > self.idle_timeout]
+            for key in idle_keys:
+                self._retire(self._entries.pop(key))
+        return len(idle_keys)
+
+    def close_all(self):
+        with self._lock:
+            for entry in self._entries.values():
+                entry.retired = True
+                entry.driver.close()
+            self._entries.clear()
+
+
+# --- Uploader ---
+class Neo4jUploader:
+    def __init__(self, uri, user, password, driver: Optional[Driver] = None):
+        self._schema_labels = set() # labels whose id constraint is known to exist
+        # A driver handed in by DriverRegistry is shared and must outlive this uploader.
+        self._owns_driver = driver is None
+        if driver is not None:
+            self._driver = driver
+            return
+        self._driver = GraphDatabase.driver(uri, auth=basic_auth(user, password))
+        try:
+            self._driver.verify_connectivity() # Check connection
+        except Exception:
+            self._driver.close()
+            raise
+
+    def close(self):
+        if self._driver and self._owns_driver:
+            self._driver.close()
+
+    def ensure_schema(self, labels: List[str]) -> List[str]:
+        # Uniqueness constraints give every MERGE/MATCH on {id: ...} an index lookup instead of a label scan.
+        created = []
+        with self._driver.session() as session:
+            for label in labels:
+                if label in self._schema_labels:
+                    continue
+                constraint_name = f"{label.lower()}_id_unique"
+                summary = session.execute_write(self._create_id_constraint_tx, label, constraint_name)
+                if summary.counters.constraints_added:
+                    created.append(constraint_name)
+                self._schema_labels.add(label)
+        return created
+
+    @staticmethod
+    def _create_id_constraint_tx(tx, label: str, constraint_name: str):
+        query = (
+            f"CREATE CONSTRAINT {constraint_name} IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+        )
+        return tx.run(query).consume()
+
+    def upload_kg_data(self, kg_data: KnowledgeGraphData, mode: str = "batch", batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 1,
+                       replace_properties: bool = False) -> UploadStats:
+        # replace_properties=True overwrites the stored property map (SET n = ...) instead of merging
+        # into it, so attributes dropped from the source disappear from the graph too.
+        created = self.ensure_schema(schema_labels(kg_data))
+        if created:
+            logger.info("Created Neo4j constraints: %s", ", ".join(created))
+
+        if mode == "row":
+            stats = self._upload_kg_data_per_row(kg_data, replace_properties)
+        elif workers > 1:
+            stats = self._upload_kg_data_parallel(kg_data, batch_size, workers, replace_properties)
+        else:
+            stats = self._upload_kg_data_batched(kg_data, batch_size, replace_properties)
+        stats.constraints_created = created
+        metrics.inc("neo4j_nodes_written_total", stats.nodes, mode=mode)
+        metrics.inc("neo4j_relationships_written_total", stats.relationships, mode=mode)
+        metrics.observe("neo4j_upload_seconds", stats.nodes_seconds + stats.relationships_seconds, mode=mode)
+        if stats.skipped_relationships:
+            metrics.inc("neo4j_skipped_relationships_total", stats.skipped_relationships)
+            logger.warning("%d relationships skipped: an endpoint node wasn't found (see utils/kg_integrity.py)",
+                           stats.skipped_relationships)
+        logger.info(
+            "Uploaded %d nodes (%.0f/s), %d relationships (%.0f/s)",
+            stats.nodes, stats.nodes_per_sec, stats.relationships, stats.relationships_per_sec,
+        )
+        return stats
+
+    def _upload_kg_data_batched(self, kg_data: KnowledgeGraphData, batch_size: int, replace: bool = False) -> UploadStats:
+        stats = UploadStats()
+        with self._driver.session() as session:
+            nodes_start = time.perf_counter()
+            for label, rows in group_nodes_by_label(kg_data.nodes).items():
+                for batch in _chunked(rows, batch_size):
+                    write_with_retry(session, self._merge_nodes_batch_tx, label, batch, replace)
+                    stats.nodes += len(batch)
+            stats.nodes_seconds = time.perf_counter() - nodes_start
+
+            rels_start = time.perf_counter()
+            for key, rows in group_relationships_by_pattern(kg_data.relationships).items():
+                for batch in _chunked(rows, batch_size):
+                    written = write_with_retry(session, self._merge_relationships_batch_tx, key, batch, replace)
+                    stats.relationships += written
+                    stats.skipped_relationships += len(batch) - written
+            stats.relationships_seconds = time.perf_counter() - rels_start
+        return stats
+
+    def _upload_kg_data_parallel(self, kg_data: KnowledgeGraphData, batch_size: int, workers: int, replace: bool = False) -> UploadStats:
+        node_partitions = partition_batches(group_nodes_by_label(kg_data.nodes), "id", workers, batch_size)
+        rel_rounds = relationship_rounds(group_relationships_by_pattern(kg_data.relationships), workers, batch_size)
+        stats = UploadStats()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="neo4j-ingest") as pool:
+            # All nodes must be committed before any relationship MATCHes its endpoints.
+            nodes_start = time.perf_counter()
+            stats.nodes = sum(pool.map(
+                lambda batches: self._write_partition(self._merge_nodes_batch_tx, batches, replace), node_partitions
+            ))
+            stats.nodes_seconds = time.perf_counter() - nodes_start
+
+            rels_start = time.perf_counter()
+            for rel_partitions in rel_rounds:
+                stats.relationships += sum(pool.map(
+                    lambda batches: self._write_partition(self._merge_relationships_batch_tx, batches, replace), rel_partitions
+                ))
+            stats.skipped_relationships = len(kg_data.relationships) - stats.relationships
+            stats.relationships_seconds = time.perf_counter() - rels_start
+        return stats
+
+    def _write_partition(self, tx_function, batches: List[Tuple[Any, List[Dict[str, Any]]]], replace: bool = False) -> int:
+        # Runs on a worker thread: one session per partition, sharing the driver's connection pool.
+        written = 0
+        with self._driver.session() as session:
+            for group_key, rows in batches:
+                result = write_with_retry(session, tx_function, group_key, rows, replace)
+                written += len(rows) if result is None else result # relationship txs report what they MERGEd
+        return written
+
+    def _upload_kg_data_per_row(self, kg_data: KnowledgeGraphData, replace: bool = False) -> UploadStats:
+        # One transaction per node/relationship. Slow, but handy for pinpointing a bad row.
+        stats = UploadStats()
+        with self._driver.session() as session:
+            nodes_start = time.perf_counter()
+            for node in kg_data.nodes:
+                write_with_retry(session, self._create_node_tx, node, replace)
+                stats.nodes += 1
+            stats.nodes_seconds = time.perf_counter() - nodes_start
+
+            rels_start = time.perf_counter()
+            for rel in kg_data.relationships:
+                written = write_with_retry(session, self._create_relationship_tx, rel, replace)
+                stats.relationships += written
+                stats.skipped_relationships += 1 - written
+            stats.relationships_seconds = time.perf_counter() - rels_start
+        return stats
+
+    def delete_kg_elements(self, node_keys: List[Tuple[str, str]], relationship_keys: List[Tuple[str, str, str, str, str]],
+                           batch_size: int = DEFAULT_BATCH_SIZE) -> Tuple[int, int]:
+        # node_keys: (type, id); relationship_keys: (source_type, source_id, relationship_type, target_type, target_id).
+        # Relationships go first; DETACH DELETE then removes whatever else still hangs off a deleted node.
+        rel_groups: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        for source_type, source_id, relationship_type, target_type, target_id in relationship_keys:
+            rel_groups.setdefault((source_type, relationship_type, target_type), []).append(
+                {"source_id": source_id, "target_id": target_id}
+            )
+        node_groups: Dict[str, List[str]] = {}
+        for label, node_id in node_keys:
+            node_groups.setdefault(label, []).append(node_id)
+
+        deleted_nodes = deleted_rels = 0
+        with self._driver.session() as session:
+            for key, rows in rel_groups.items():
+                for batch in _chunked(rows, batch_size):
+                    write_with_retry(session, self._delete_relationships_batch_tx, key, batch)
+                    deleted_rels += len(batch)
+            for label, ids in node_groups.items():
+                for start in range(0, len(ids), max(1, batch_size)):
+                    batch = ids[start:start + max(1, batch_size)]
+                    write_with_retry(session, self._delete_nodes_batch_tx, label, batch)
+                    deleted_nodes += len(batch)
+        return deleted_nodes, deleted_rels
+
+    @staticmethod
+    def _delete_nodes_batch_tx(tx, label: str, ids: List[str]):
+        tx.run(f"UNWIND $ids AS id MATCH (n:{label} {{id: id}}) DETACH DELETE n", ids=ids)
+
+    @staticmethod
+    def _delete_relationships_batch_tx(tx, key: Tuple[str, str, str], rows: List[Dict[str, Any]]):
+        source_type, relationship_type, target_type = key
+        query = (
+            "UNWIND $rows AS row "
+            f"MATCH (:{source_type} {{id: row.source_id}})-[r:{relationship_type}]->(:{target_type} {{id: row.target_id}}) "
+            "DELETE r"
+        )
+        tx.run(query, rows=rows)
+
+    @staticmethod
+    def _merge_nodes_batch_tx(tx, label: str, rows: List[Dict[str, Any]], replace: bool = False):
+        query = (
+            "UNWIND $rows AS row "
+            f"MERGE (n:{label} {{id: row.id}}) "
+            + ("SET n = row.props, n.id = row.id" if replace else "SET n += row.props")
+        )
+        tx.run(query, rows=rows)
+
+    @staticmethod
+    def _merge_relationships_batch_tx(tx, key: Tuple[str, str, str], rows: List[Dict[str, Any]], replace: bool = False):
+        source_type, relationship_type, target_type = key
+        query = (
+            "UNWIND $rows AS row "
+            f"MATCH (source:{source_type} {{id: row.source_id}}) "
+            f"MATCH (target:{target_type} {{id: row.target_id}}) "
+            f"MERGE (source)-[r:{relationship_type}]->(target) "
+            + ("SET r = row.props " if replace else "SET r += row.props ")
+            # Rows whose endpoints don't MATCH produce nothing, so this is what was actually written.
+            + "RETURN count(r) AS written"
+        )
+        return tx.run(query, rows=rows).single()["written"]
+
+    @staticmethod
+    def _create_node_tx(tx, node: BaseNode, replace: bool = False):
+        query = (
+            f"MERGE (n:{node.type} {{id: $id}}) "
+            + ("SET n = $node_props, n.id = $id " if replace else "SET n += $node_props ")
+        )
+
+        params = {"id": node.id, "node_props": node_properties(node)}
+        tx.run(query, **params)
+
+    @staticmethod
+    def _create_relationship_tx(tx, rel: Relationship, replace: bool = False):
+        query = (
+            f"MATCH (source:{rel.source_type} {{id: $source_id}}) "
+            f"MATCH (target:{rel.target_type} {{id: $target_id}}) "
+            f"MERGE (source)-[r:{rel.relationship_type}]->(target) "
+            + ("SET r = $properties " if replace else "SET r += $properties ")
+            + "RETURN count(r) AS written"
+        )
+        params = {
+            "source_id": rel.source_id,
+            "target_id": rel.target_id,
+            "properties": relationship_properties(rel)
+        }
+        return tx.run(query, **params).single()["written"]
@@ -1,6 +1,75 @@
-import spacy
+import hashlib
+import json
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from spacy.language import Language
 from spacy.matcher import Matcher
-nlp = spacy.load("en_core_web_sm") 
+from spacy.tokens import Doc, Span
+from utils import metrics
+from utils.domain_ner import GAZETTEER_PIPE
+
+# define the patterns according to the dependency graph tags
+DEFAULT_RELATION_PATTERNS: Dict[str, List[List[dict]]] = {
+  "relation": [[{'DEP':'ROOT'},                # verbs are often root
+                {'DEP':'prep','OP':"?"},
+                {'DEP':'attr','OP':"?"},
+                {'DEP':'det','OP':"?"},
+                {'DEP':'agent','OP':"?"}]],
+}
+
+# sentence start -> (start, end) token offsets of that sentence's relation span.
+# Plain ints so the value survives the Doc serialisation used by nlp.pipe(n_process > 1).
+Doc.set_extension("relation_offsets", default=None, force=True)
+
+
+def _sentence_relation(sent: Span) -> Optional[Span]:
+  offsets = sent.doc._.relation_offsets
+  if offsets is None or sent.start not in offsets:
+    return None
+  start, end = offsets[sent.start]
+  return sent.doc[start:end]
+
+Span.set_extension("relation", getter=_sentence_relation, force=True)
+
+
+class RelationMatcher:
+  """Pipeline component that runs the relation patterns once over the whole Doc.
+
+  Patterns are compiled when the component is created, not per sentence. For every sentence the
+  last match starting in it (clipped to the sentence end) becomes `sent._.relation`.
+  """
+
+  def __init__(self, vocab, patterns: Optional[Dict[str, List[List[dict]]]] = None):
+    self.patterns = patterns or DEFAULT_RELATION_PATTERNS
+    self.matcher = Matcher(vocab)
+    for label, label_patterns in self.patterns.items():
+      self.matcher.add(label, label_patterns)
+
+  def __call__(self, doc: Doc) -> Doc:
+    offsets = {}
+    sentences = list(doc.sents)
+    sent_index = 0
+    for _, start, end in sorted(self.matcher(doc), key=lambda match: (match[1], match[2])):
+      while sentences[sent_index].end <= start:
+        sent_index += 1
+      sent = sentences[sent_index]
+      offsets[sent.start] = (start, min(end, sent.end))
+    doc._.relation_offsets = offsets
+    return doc
+
+
+@Language.factory("relation_matcher", default_config={"patterns": None})
+def create_relation_matcher(nlp: Language, name: str, patterns: Optional[Dict[str, List[List[dict]]]]):
+  return RelationMatcher(nlp.vocab, patterns)
+
+
+# The triple rules only read token.dep_ (and the parser's sentence boundaries), so the
+# entity recognizer and lemmatizer can be skipped when processing a corpus.
+EXTRACTION_DISABLED_PIPES = ("ner", "lemmatizer")
+DEFAULT_PIPE_BATCH_SIZE = 64
+# Bump when extract_entity_pairs/extract_relation change, so cached triples are not reused.
+EXTRACTION_RULES_VERSION = "3" # 2: NPD identifiers / gazetteer names merged into single tokens; 3: shared wellbore pattern
+DEFAULT_CACHE_CHUNK_SIZE = 1024
 
 def extract_entity_pairs(sent):
   head = ''
@@ -47,22 +116,89 @@ def extract_entity_pairs(sent):
 
 
 def extract_relation(sent):
+  # Filled in by the relation_matcher component; empty if no pattern matched the sentence.
+  span = sent._.relation
+  return span.text if span is not None else ''
+
+
+class Triple(NamedTuple):
+  head: str
+  relation: str
+  tail: str
+  doc_id: object
+  sent_idx: int
+
+
+def extraction_fingerprint(nlp: Language) -> Tuple[str, str]:
+  """(model, version) identifying what produced a triple, used as part of the extraction cache key."""
+  model = f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}"
+  patterns = nlp.get_pipe("relation_matcher").patterns if "relation_matcher" in nlp.pipe_names else {}
+  # The domain gazetteer decides which names become single tokens, so it is part of the key too.
+  gazetteer = nlp.get_pipe(GAZETTEER_PIPE).patterns if GAZETTEER_PIPE in nlp.pipe_names else []
+  pattern_hash = hashlib.sha256(json.dumps([patterns, gazetteer], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+  return model, f"rules-{EXTRACTION_RULES_VERSION}/patterns-{pattern_hash}"
+
+
+def extract_triples(texts: Iterable[Union[str, Tuple[str, object]]],
+                    batch_size: int = DEFAULT_PIPE_BATCH_SIZE,
+                    n_process: int = 1,
+                    disable: Optional[Sequence[str]] = EXTRACTION_DISABLED_PIPES,
+                    skip_empty: bool = True,
+                    cache=None,
+                    cache_chunk_size: int = DEFAULT_CACHE_CHUNK_SIZE) -> Iterator[Triple]:
+  """Stream (head, relation, tail, doc_id, sent_idx) triples over a corpus with nlp.pipe.
+
+  `texts` yields either plain strings (doc_id is then the running index) or (text, doc_id) pairs.
+  Use n_process > 1 to spread parsing over several cores; output stays in input order.
+  With an ExtractionCache, texts already seen with the same model and patterns skip the parser;
+  the corpus is then read in chunks of `cache_chunk_size` texts.
+  """
+  from utils.resources import get_nlp
+
+  nlp = get_nlp()
+  disabled = [name for name in (disable or ()) if name in nlp.pipe_names]
+  items = _with_doc_ids(texts)
+  if cache is None:
+    docs = nlp.pipe(items, as_tuples=True, batch_size=batch_size, n_process=n_process, disable=disabled)
+    for doc, doc_id in metrics.timed_iter(docs, "spacy_pipe_seconds"):
+      yield from _filter_empty(_doc_triples(doc, doc_id), skip_empty)
+    return
+
+  model, version = extraction_fingerprint(nlp)
+  while True:
+    chunk = list(islice(items, cache_chunk_size))
+    if not chunk:
+      return
+    results = [cache.get(text, model, version) for text, _ in chunk]
+    misses = [(text, position) for position, (text, _) in enumerate(chunk) if results[position] is None]
+    if misses:
+      docs = nlp.pipe(misses, as_tuples=True, batch_size=batch_size,
+                      n_process=n_process if len(misses) > batch_size else 1, disable=disabled)
+      for doc, position in metrics.timed_iter(docs, "spacy_pipe_seconds"):
+        rows = [list(triple[:3]) + [triple.sent_idx] for triple in _doc_triples(doc, None)]
+        cache.put(doc.text, model, version, rows)
+        results[position] = rows
+    for (_, doc_id), rows in zip(chunk, results):
+      triples = (Triple(head, relation, tail, doc_id, sent_idx) for head, relation, tail, sent_idx in rows)
+      yield from _filter_empty(triples, skip_empty)
+
+
+def _doc_triples(doc: Doc, doc_id) -> Iterator[Triple]:
+  for sent_idx, sent in enumerate(doc.sents):
+    head, tail = extract_entity_pairs(sent)
+    yield Triple(head, extract_relation(sent), tail, doc_id, sent_idx)
+
+
+def _filter_empty(triples: Iterable[Triple], skip_empty: bool) -> Iterator[Triple]:
+  for triple in triples:
+    if skip_empty and not (triple.head and triple.tail):
+      continue
+    yield triple
 
-  # Rule-based pattern matching class
-  matcher = Matcher(nlp.vocab)
-
-  # define the patterns according to the dependency graph tags
-  pattern = [{'DEP':'ROOT'},                # verbs are often root
-            {'DEP':'prep','OP':"?"},
-            {'DEP':'attr','OP':"?"},
-            {'DEP':'det','OP':"?"},
-            {'DEP':'agent','OP':"?"}]
-
-  matcher.add("relation",[pattern])
-
-  matches = matcher(sent)
-  k = len(matches) - 1
-
-  span = sent[matches[k][1]:matches[k][2]]
 
-  return(span.text)
\ No newline at end of file
+def _with_doc_ids(texts):
+  for index, item in enumerate(texts):
+    if isinstance(item, str):
+      yield item, index
+    else:
+      yield item
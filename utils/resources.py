@@ -0,0 +1,89 @@
+# utils/resources.py
+# Process-wide, lazily initialised heavy resources (spaCy pipelines, PDF parser pool, Neo4j drivers,
+# the Parquet graph store, the background ingest-job worker).
+# Pages and utils go through these getters instead of loading models at import time, so a
+# resource is built the first time a feature needs it and then reused by every rerun.
+#
+# Inside the Streamlit app the getters are wrapped in st.cache_resource; in headless use
+# (kg-ingest, benchmarks, worker processes) a plain functools cache is used and Streamlit is
+# never imported.
+import functools
+import os
+import sys
+
+SPACY_MODEL = "en_core_web_sm"
+
+
+def _process_cache(loader):
+    streamlit = sys.modules.get("streamlit")
+    if streamlit is not None:
+        return streamlit.cache_resource(show_spinner=False)(loader)
+    return functools.lru_cache(maxsize=None)(loader)
+
+
+@_process_cache
+def get_nlp(model: str = SPACY_MODEL):
+    import spacy
+    import utils.nlp_utils # registers the relation_matcher factory
+    from utils.domain_ner import GAZETTEER_PIPE, add_domain_pipes
+
+    nlp = spacy.load(model)
+    # NPD identifiers and gazetteer names become single tokens before tagging and parsing.
+    add_domain_pipes(nlp, _gazetteer(), first=True)
+    nlp.add_pipe("merge_entities", after=GAZETTEER_PIPE)
+    nlp.add_pipe("relation_matcher", last=True)
+    return nlp
+
+
+@_process_cache
+def get_domain_nlp():
+    from utils.domain_ner import build_domain_nlp
+
+    return build_domain_nlp(_gazetteer())
+
+
+def _gazetteer():
+    from utils.domain_ner import Gazetteer
+
+    # Reference lists (fields.txt, formations.txt, companies.txt) override the built-in ones.
+    directory = os.environ.get("KG_GAZETTEER_DIR")
+    return Gazetteer.load(directory) if directory else Gazetteer()
+
+
+@_process_cache
+def get_driver_registry():
+    from utils.neo4j_uploader import DriverRegistry
+
+    # Shared by all sessions, so the connection pool survives Streamlit reruns. The pool size is
+    # passed to DriverRegistry.lease(), which replaces a driver built with a different one.
+    return DriverRegistry()
+
+
+@_process_cache
+def get_extraction_cache():
+    from utils.extraction_cache import ExtractionCache
+
+    return ExtractionCache()
+
+
+@_process_cache
+def get_document_parser():
+    from utils.documents import DocumentParser
+
+    # One process pool for all sessions; parsed text shares the extraction cache's SQLite file.
+    return DocumentParser(cache=get_extraction_cache())
+
+
+@_process_cache
+def get_graph_store():
+    from utils.graph_store import GraphStore
+
+    return GraphStore()
+
+
+@_process_cache
+def get_job_worker():
+    from utils.ingest_jobs import JobWorker
+
+    # One background worker per process: jobs keep running (and stay pollable) across sessions.
+    return JobWorker()